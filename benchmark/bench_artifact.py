@@ -0,0 +1,80 @@
+"""
+Worker startup benchmark: executing a configuration versus loading its precompiled artifact.
+
+Each sample runs in a fresh interpreter, as a newly started worker would: ``parse_config`` imports the schema
+modules and executes the configuration, ``load_artifact`` maps the artifact produced by ``properpy compile``
+and reads one item (lazy) or decodes everything (eager).
+
+Usage::
+
+    python -m benchmark.bench_artifact [--nodes N] [--runs N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmark.synthetic import Shape, schema_modules, write_config
+from properpy.artifact import compile_config
+
+PARSE = '''
+import time
+start = time.perf_counter()
+from properpy import parse_config
+config = parse_config({path!r}, {modules!r}, module_paths=["."])
+print(time.perf_counter() - start)
+'''
+
+LOAD = '''
+import time
+start = time.perf_counter()
+from properpy.artifact import load_artifact
+config = load_artifact({path!r}, lazy={lazy!r})
+config["tree0"]["children"][0]
+print(time.perf_counter() - start)
+'''
+
+
+def run(script: str, cwd: Path, runs: int) -> list[float]:
+    root = Path(__file__).resolve().parent.parent
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", script], cwd=cwd, check=True, capture_output=True, text=True,
+            env={"PYTHONPATH": str(root)},
+        ).stdout
+        samples.append(float(output.strip().splitlines()[-1]))
+    return samples
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--nodes", type=int, default=10000)
+    arg_parser.add_argument("--runs", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    shape = Shape(args.nodes)
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = Path(directory)
+        path = write_config(cwd, shape)
+        modules = schema_modules(shape)
+        artifact = compile_config(path, supported_modules=modules, module_paths=[directory])
+        print(f"{path.name}: {path.stat().st_size} bytes, artifact {os.path.getsize(artifact)} bytes")
+        # 先运行一次以写入字节码缓存，只比较执行与加载的耗时
+        run(PARSE.format(path=str(path), modules=modules), cwd, 1)
+        results = {
+            "parse_config": run(PARSE.format(path=str(path), modules=modules), cwd, args.runs),
+            "artifact lazy": run(LOAD.format(path=artifact, lazy=True), cwd, args.runs),
+            "artifact eager": run(LOAD.format(path=artifact, lazy=False), cwd, args.runs),
+        }
+
+    for name, samples in results.items():
+        print(f"{name:>14}: median {statistics.median(samples) * 1000:8.2f} ms  "
+              f"(min {min(samples) * 1000:.2f} ms, {len(samples)} runs)")
+
+
+if __name__ == "__main__":
+    main()
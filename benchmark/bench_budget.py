@@ -0,0 +1,58 @@
+"""
+Budget overhead: ``Parser.parse`` of a synthetic configuration without a budget, with time and memory budgets
+(checked by the watchdog thread and at the end of every statement), and with a call budget (counted by a profile
+function).
+
+Usage::
+
+    python -m benchmark.bench_budget [--nodes N] [--repeat N]
+"""
+import argparse
+import statistics
+import tempfile
+import time
+
+from benchmark.synthetic import Shape, schema_modules, write_config
+from properpy import Budget, Parser, parse_budget
+
+LIMIT = 3600.0
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--nodes", type=int, default=10000)
+    arg_parser.add_argument("--repeat", type=int, default=10)
+    args = arg_parser.parse_args()
+
+    shape = Shape(args.nodes)
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_config(directory, shape)
+        parser = Parser(module_paths=[directory])
+        parser.register_module(*schema_modules(shape))
+        code = parser.compile(path.read_text(), str(path))
+        parser.parse(code)  # 预热
+
+        # 预算足够大，只测量计量本身的开销
+        cases = {
+            "no budget": {},
+            "parse time+memory": dict(parse=Budget(wall_time=LIMIT, cpu_time=LIMIT, memory_blocks=10 ** 12)),
+            "statement time": dict(statement=Budget(wall_time=LIMIT, cpu_time=LIMIT)),
+            "statement calls": dict(statement=Budget(calls=10 ** 12)),
+        }
+        results = {}
+        for name, limits in cases.items():
+            samples = []
+            for _ in range(args.repeat):
+                with parse_budget(**limits):
+                    start = time.perf_counter()
+                    parser.parse(code)
+                    samples.append(time.perf_counter() - start)
+            results[name] = statistics.median(samples)
+
+    base = results["no budget"]
+    for name, median in results.items():
+        print(f"{name:>18}: median {median * 1000:8.2f} ms  ({median / base:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Component call micro-benchmarks: the former ``component``/``config_wrapper`` wrappers, which re-derive the argument
+placement on every call (and call ``inspect.signature`` on every ``config_wrapper`` call), versus the call plans
+computed once at decoration time.
+
+Trees:
+
+- deep: a chain of nested components, ``div(div(div(...)))``
+- wide: one component with many children, ``html(div(...), div(...), ...)``
+- page: sections of rows with attributes and keyword arguments, about ``--nodes`` nodes in total
+
+Usage::
+
+    python -m benchmark.bench_component [--nodes N] [--repeat N]
+"""
+import argparse
+import gc
+import time
+from functools import wraps
+from inspect import signature, Parameter
+
+from properpy import attrs, component, config_wrapper
+
+
+def former_component(func):
+    """旧实现：每次调用都重新计算参数的放置方式"""
+    func._is_component = True
+    sig = signature(func)
+    parameters = sig.parameters
+    pos_param_names = [name for name, param in parameters.items() if
+                       param.kind in (Parameter.POSITIONAL_ONLY, Parameter.POSITIONAL_OR_KEYWORD)]
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        final_args = []
+        final_kwargs = {}
+        seen_args = set()
+        arg_index = 0
+        for i, arg in enumerate(args):
+            if arg_index < len(pos_param_names):
+                name = pos_param_names[arg_index]
+                if name not in kwargs:
+                    final_args.append(arg)
+                    seen_args.add(name)
+                arg_index += 1
+        for name, value in kwargs.items():
+            if name in parameters:
+                final_kwargs[name] = value
+        func_result = func(*final_args, **final_kwargs)
+        children = []
+        attributes = {}
+        for arg in args:
+            if isinstance(arg, dict):
+                if 'tag' in arg:
+                    children.append(arg)
+                else:
+                    attributes.update(arg)
+            else:
+                children.append(arg)
+        attributes.update(kwargs)
+        result = {
+            'tag': func.__name__,
+            'children': children,
+            **attributes
+        }
+        if isinstance(func_result, dict):
+            result.update(func_result)
+        elif func_result is not None:
+            result['children'].append(func_result)
+        return result
+    return wrapper
+
+def former_config_wrapper(receiver):
+    """旧实现：每次调用都重新装饰原函数"""
+    def component_wrapper(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            result = former_component(func)(*args, **kwargs)
+            if isinstance(receiver, dict):
+                receiver.update(result)
+            elif callable(receiver):
+                receiver(result)
+            return result
+        return wrapper
+    return component_wrapper
+
+
+def components(decorate, decorate_wrapper) -> dict:
+    def html(title: str = "", class_: str = ""):
+        pass
+
+    def section(*content, id: str = None):
+        pass
+
+    def div(content=None, style: dict = None):
+        pass
+
+    def define_config(html_component, title: str):
+        pass
+
+    return {"html": decorate(html), "section": decorate(section), "div": decorate(div),
+            "define_config": decorate_wrapper({})(define_config)}
+
+def plain_dicts() -> dict:
+    """下限：直接构造结果字典，不处理参数"""
+    def make(tag: str):
+        def build(*args, **kwargs):
+            return {'tag': tag, 'children': list(args), **kwargs}
+        return build
+    return {name: make(name) for name in ("html", "section", "div", "define_config")}
+
+def deep(c: dict, nodes: int):
+    node = c["div"]("leaf")
+    for _ in range(nodes - 1):
+        node = c["div"](node)
+    return node
+
+def wide(c: dict, nodes: int):
+    div = c["div"]
+    return c["html"](*[div(i) for i in range(nodes - 1)], class_="container")
+
+def page(c: dict, nodes: int):
+    div, section = c["div"], c["section"]
+    rows = 100
+    sections = [
+        section(*[div(attrs(style={"row": j}), f"cell {i}.{j}") for j in range(rows)], id=f"section-{i}")
+        for i in range(max(1, nodes // (rows + 1)))
+    ]
+    return c["define_config"](c["html"](*sections, class_="container"), title="page")
+
+def best_of(repeat: int, function, *args) -> float:
+    """与 timeit 相同，计时期间关闭垃圾回收，避免大树触发的回收掩盖调用本身的开销"""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            function(*args)
+            best = min(best, time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--nodes", type=int, default=100_000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    former = components(former_component, former_config_wrapper)
+    planned = components(component, config_wrapper)
+    assert page(former, 1000) == page(planned, 1000)
+
+    dicts = plain_dicts()
+
+    print(f"{args.nodes} nodes, best of {args.repeat}")
+    for name, build in (("deep", deep), ("wide", wide), ("page", page)):
+        before = best_of(args.repeat, build, former, args.nodes)
+        after = best_of(args.repeat, build, planned, args.nodes)
+        floor = best_of(args.repeat, build, dicts, args.nodes)
+        print(f"{name:>5}: former {before * 1000:8.2f} ms, planned {after * 1000:8.2f} ms "
+              f"({before / after:.1f}x, {after / args.nodes * 1e9:.0f} ns/node), plain dicts {floor * 1000:8.2f} ms")
+
+    calls = max(1, args.nodes // 100)
+    before = best_of(args.repeat, lambda: [former["define_config"]("html", title="t") for _ in range(calls)])
+    after = best_of(args.repeat, lambda: [planned["define_config"]("html", title="t") for _ in range(calls)])
+    print(f"config_wrapper: former {before / calls * 1e6:.2f} us/call, planned {after / calls * 1e6:.2f} us/call "
+          f"({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
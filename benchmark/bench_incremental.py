@@ -0,0 +1,52 @@
+"""
+Incremental re-evaluation: ``Parser.parse`` of a whole generated configuration versus ``IncrementalParser.parse``
+after a one-line edit.
+
+Usage::
+
+    python -m benchmark.bench_incremental [--statements N] [--repeat N]
+"""
+import argparse
+import statistics
+import time
+
+from properpy import IncrementalParser, Parser
+
+
+def generate(statements: int, edited: int = -1) -> str:
+    lines = [f"item{i} = attrs(name='item {i}', size={i}, tags=[{i}, {i} + 1])" for i in range(statements)]
+    lines.append(f"total = attrs(first=item0, last=item{statements - 1})")
+    if edited >= 0:
+        lines[edited] = f"item{edited} = attrs(name='edited', size=-1)"
+    return "\n".join(lines)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--statements", type=int, default=5000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    parser = Parser()
+    full, incremental_times = [], []
+    for run in range(args.repeat):
+        code = generate(args.statements, edited=run % args.statements)
+        start = time.perf_counter()
+        parser.parse(code)
+        full.append(time.perf_counter() - start)
+
+        incremental = IncrementalParser(parser)
+        incremental.parse(generate(args.statements))
+        start = time.perf_counter()
+        incremental.parse(code)
+        incremental_times.append(time.perf_counter() - start)
+        evaluated = len(incremental.evaluated)
+
+    print(f"{'full':>12}: median {statistics.median(full) * 1000:8.1f} ms")
+    print(f"{'incremental':>12}: median {statistics.median(incremental_times) * 1000:8.1f} ms  "
+          f"({evaluated} of {args.statements + 1} statements evaluated)")
+    print(f"speedup: {statistics.median(full) / statistics.median(incremental_times):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Lazy evaluation: ``Parser.parse`` of a configuration with many component sections, eager versus ``lazy=True``
+followed by reading one section, and the cost of materializing the whole lazy result. Both modes parse a
+configuration compiled beforehand (see ``Parser.compile``).
+
+Usage::
+
+    python -m benchmark.bench_lazy [--sections N] [--size N] [--repeat N]
+"""
+import argparse
+import statistics
+import time
+
+from properpy import Parser, component, materialize
+
+
+@component
+def section(*children, name: str = None):
+    pass
+
+@component
+def item(text: str = None, size: int = 0, style: dict = None):
+    pass
+
+
+def generate(sections: int, size: int) -> str:
+    lines = []
+    for s in range(sections):
+        items = ", ".join(f"item(text='item {s}.{i}', size={i}, style={{'width': {i}}})" for i in range(size))
+        lines.append(f"section{s} = section({items}, name='section {s}')")
+    return "\n".join(lines)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--sections", type=int, default=200)
+    arg_parser.add_argument("--size", type=int, default=50)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    parser = Parser()
+    parser.register_var("section", section)
+    parser.register_var("item", item)
+    source = generate(args.sections, args.size)
+    code = parser.compile(source)
+    lazy_code = parser.compile(source, lazy=True)
+    eager, lazy, forced = [], [], []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        parser.parse(code)["section0"]["children"][0]["size"]
+        eager.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        result = parser.parse(lazy_code, lazy=True)
+        result["section0"]["children"][0]["size"]
+        lazy.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        materialize(result)
+        forced.append(time.perf_counter() - start)
+
+    print(f"{'eager':>20}: median {statistics.median(eager) * 1000:8.1f} ms")
+    print(f"{'lazy, one section':>20}: median {statistics.median(lazy) * 1000:8.1f} ms")
+    print(f"{'materialize rest':>20}: median {statistics.median(forced) * 1000:8.1f} ms")
+    print(f"speedup: {statistics.median(eager) / statistics.median(lazy):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Memory benchmark of component trees: the dictionary representation versus compact nodes
+(:func:`properpy.compact_nodes`), measured with ``tracemalloc``.
+
+Trees:
+
+- routes: a generated routing table, one ``route`` per entry with a few keyword attributes and no children
+- layout: a UI layout of nested containers with text leaves and a few attributes
+
+Usage::
+
+    python -m benchmark.bench_node_memory [--nodes N]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from properpy import attrs, compact_nodes, component, to_dict
+
+
+@component
+def router(*routes):
+    pass
+
+@component
+def route(path: str, handler: str = None, methods: tuple = ("GET",), auth: bool = False):
+    pass
+
+@component
+def column(*children, gap: int = 0):
+    pass
+
+@component
+def row(*children, style: dict = None):
+    pass
+
+@component
+def text(value: str):
+    pass
+
+
+def routes(nodes: int):
+    return router(*[route(path=f"/api/v1/items/{i}", handler=f"items.get_{i % 50}", auth=i % 3 == 0)
+                    for i in range(nodes - 1)])
+
+def layout(nodes: int):
+    style = {"padding": 4}
+    rows = [row(text(f"label {i}"), text(str(i)), attrs(style=style)) for i in range(nodes // 3)]
+    return column(*rows, gap=8)
+
+def measure(build, nodes: int, compact: bool) -> tuple[object, int, float]:
+    """返回构建结果、构建后仍占用的内存（字节）与构建耗时"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        with compact_nodes(compact):
+            tree = build(nodes)
+        elapsed = time.perf_counter() - start
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return tree, current, elapsed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--nodes", type=int, default=300_000)
+    args = arg_parser.parse_args()
+
+    print(f"{args.nodes} nodes (memory measured by tracemalloc, time includes tracing overhead)")
+    for name, build in (("routes", routes), ("layout", layout)):
+        plain, plain_bytes, plain_time = measure(build, args.nodes, compact=False)
+        compact, compact_bytes, compact_time = measure(build, args.nodes, compact=True)
+        assert to_dict(compact) == plain
+        del plain, compact
+        print(f"{name:>6}: dict {plain_bytes / 2**20:8.1f} MiB ({plain_time * 1000:6.0f} ms), "
+              f"compact {compact_bytes / 2**20:8.1f} MiB ({compact_time * 1000:6.0f} ms), "
+              f"{plain_bytes / compact_bytes:.1f}x smaller, "
+              f"{(plain_bytes - compact_bytes) / args.nodes:.0f} bytes/node saved")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Evaluation engine benchmark on large configurations: the former per-statement engine (``ast.literal_eval``, then
+``compile`` and ``eval`` of every non-literal statement) versus the single code object run by one ``exec``.
+
+The two are run alternately and timed in CPU time, so that load changes on the machine affect both alike; the
+minimum, the median and the number of rounds won by the single pass are reported. The per-statement stand-in does
+not load the names of the sandbox or track dependencies, and returns the same literal objects on every warm run,
+so it is slightly favoured on small configurations.
+
+Usage::
+
+    python -m benchmark.bench_parse_ast [--statements N ...] [--repeat N]
+"""
+import argparse
+import ast
+import statistics
+import time
+
+from properpy import Parser
+
+
+def generate(statements: int) -> str:
+    lines = ["from properpy import attrs"]
+    for i in range(statements):
+        if i % 3 == 0:
+            lines.append(f"literal_{i} = {{'name': 'item{i}', 'size': {i}}}")
+        elif i % 3 == 1:
+            lines.append(f"computed_{i} = str({i} * 2) + 'px'")
+        else:
+            lines.append(f"attrs(key_{i}=[{i}, {i + 1}])")
+    return "\n".join(lines)
+
+
+def per_statement_compile(code: str) -> list:
+    """旧的逐语句编译方式：先尝试 ast.literal_eval，失败后单独编译每个表达式"""
+    steps = []
+    for node in ast.parse(code).body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            # 导入语句照常执行，绑定它导入的名称
+            steps.append(("import", None, compile(ast.Module([node], []), "<string>", "exec")))
+            continue
+        if not isinstance(node, (ast.Assign, ast.Expr)):
+            continue
+        names = [target.id for target in node.targets if isinstance(target, ast.Name)] if isinstance(node, ast.Assign) else None
+        try:
+            steps.append(("literal", names, ast.literal_eval(node.value)))
+        except Exception:
+            steps.append(("code", names, compile(ast.Expression(node.value), "<string>", "eval")))
+    return steps
+
+
+def per_statement_execute(parser: Parser, steps: list) -> dict:
+    """旧的逐语句求值方式：每条语句单独 eval"""
+    namespace = parser._new_namespace()
+    children, attributes = [], {}
+    for kind, names, value in steps:
+        if kind == "import":
+            exec(value, namespace)
+            continue
+        if kind == "code":
+            try:
+                value = eval(value, namespace)
+            except Exception as e:
+                value = f"<Evaluation Error: {str(e)}>"
+        if names is not None:
+            for name in names:
+                attributes[name] = value
+        elif isinstance(value, dict):
+            if "tag" in value:
+                children.append(value)
+            else:
+                attributes.update(value)
+        elif value is not None:
+            children.append(value)
+    return {"children": children, **attributes}
+
+
+def per_statement_parse(parser: Parser, code: str) -> dict:
+    return per_statement_execute(parser, per_statement_compile(code))
+
+
+def compare(repeat: int, before, after) -> tuple[list[float], list[float]]:
+    """交替运行两种方式，各自记录 CPU 时间：机器的负载变化对两者的影响相同"""
+    times = ([], [])
+    for _ in range(repeat):
+        for func, recorded in ((before, times[0]), (after, times[1])):
+            start = time.process_time()
+            func()
+            recorded.append(time.process_time() - start)
+    return times
+
+
+def summary(before: list[float], after: list[float]) -> str:
+    """最小值与中位数（毫秒），以及逐轮比较中单遍执行更快的次数"""
+    wins = sum(b > a for b, a in zip(before, after))
+    return (f"per-statement {min(before) * 1000:8.2f} / {statistics.median(before) * 1000:8.2f} ms, "
+            f"single-pass {min(after) * 1000:8.2f} / {statistics.median(after) * 1000:8.2f} ms "
+            f"({statistics.median(before) / statistics.median(after):4.2f}x, faster in {wins}/{len(before)})")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--statements", type=int, nargs="+", default=[100, 1000, 10000])
+    arg_parser.add_argument("--repeat", type=int, default=21)
+    args = arg_parser.parse_args()
+
+    parser = Parser()
+    print("cold: compile and evaluate the source / warm: evaluate an already compiled (e.g. cached) config")
+    print("CPU time, min / median of interleaved runs")
+    for statements in args.statements:
+        code = generate(statements)
+        assert per_statement_parse(parser, code) == parser.parse(code)
+        before, after = compare(args.repeat, lambda: per_statement_parse(parser, code), lambda: parser.parse(code))
+        print(f"{statements:>7} statements cold: " + summary(before, after))
+        steps, program = per_statement_compile(code), parser.compile(code)
+        before, after = compare(args.repeat, lambda: per_statement_execute(parser, steps),
+                                lambda: parser.parse(program))
+        print(f"{statements:>7} statements warm: " + summary(before, after))
+
+if __name__ == "__main__":
+    main()
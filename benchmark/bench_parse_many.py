@@ -0,0 +1,84 @@
+"""
+Batch parsing throughput: one ``parse_config`` call after another versus ``parse_many`` with an increasing number of
+worker processes.
+
+Every sample parses ``--files`` generated configuration files sharing one schema module, with the bytecode cache
+disabled so that each file is compiled and evaluated.
+
+Usage::
+
+    python -m benchmark.bench_parse_many [--files N] [--nodes N] [--max-workers N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import textwrap
+import time
+from pathlib import Path
+
+from properpy import parse_config, parse_many
+
+SCHEMA = '''
+from properpy import component
+
+@component
+def section(title: str):
+    pass
+
+@component
+def row(label: str, value=None):
+    pass
+'''
+
+
+def generate_config(index: int, nodes: int) -> str:
+    rows = ",\n".join(f"    row('label {i}', value={index * nodes + i})" for i in range(nodes))
+    return f"from batch_schema import section, row\nname = 'config {index}'\nsection(\n{rows},\n    title=name\n)\n"
+
+
+def measure(parse) -> float:
+    start = time.perf_counter()
+    parse()
+    return time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--files", type=int, default=400)
+    arg_parser.add_argument("--nodes", type=int, default=500)
+    arg_parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        root = Path(directory)
+        (root / "batch_schema.py").write_text(textwrap.dedent(SCHEMA))
+        paths = []
+        for index in range(args.files):
+            path = root / f"config{index}.proper.py"
+            path.write_text(generate_config(index, args.nodes))
+            paths.append(str(path))
+        options = dict(supported_modules=["batch_schema"], module_paths=[directory])
+
+        def sequential():
+            for path in paths:
+                parse_config(path, bytecode_cache=False, **options)
+
+        def batch(workers: int):
+            for item in parse_many(paths, workers=workers, bytecode_cache=False, **options):
+                if item.error is not None:
+                    raise item.error
+
+        baseline = measure(sequential)
+        print(f"{'sequential':>12}: {baseline * 1000:9.1f} ms  {args.files / baseline:8.1f} files/s")
+        workers = 1
+        while workers <= args.max_workers:
+            elapsed = measure(lambda: batch(workers))
+            print(f"{f'{workers} workers':>12}: {elapsed * 1000:9.1f} ms  {args.files / elapsed:8.1f} files/s  "
+                  f"speedup {baseline / elapsed:.1f}x")
+            workers *= 2
+        sys.modules.pop("batch_schema", None)
+
+
+if __name__ == "__main__":
+    main()
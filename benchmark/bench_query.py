@@ -0,0 +1,83 @@
+"""
+Query index: finding the nodes matching ``section > item[kind=rare]`` in a generated component tree, by walking the
+whole tree on every query versus ``TreeIndex.select``, and the cost of building the index and of replacing one
+section compared with rebuilding it.
+
+Usage::
+
+    python -m benchmark.bench_query [--sections N] [--size N] [--repeat N]
+"""
+import argparse
+import statistics
+import time
+
+from properpy import TreeIndex, component
+
+
+@component
+def section(*children, name: str = None):
+    pass
+
+@component
+def item(*children, kind: str = None, size: int = 0):
+    pass
+
+@component
+def rare(*children, kind: str = None):
+    pass
+
+
+def generate(sections: int, size: int) -> dict:
+    return {f"section{s}": section(*[item(kind="rare" if i == 0 else "common", size=i) for i in range(size)],
+                                   rare(kind="rare"), name=f"section {s}") for s in range(sections)}
+
+def scan(result: dict) -> list:
+    """不使用索引：遍历整棵树，检查每个节点及其父节点"""
+    matches = []
+    stack = [(value, None) for value in result.values()]
+    while stack:
+        node, parent = stack.pop()
+        if node["tag"] == "item" and node.get("kind") == "rare" and parent is not None and parent["tag"] == "section":
+            matches.append(node)
+        stack.extend((child, node) for child in node["children"] if isinstance(child, dict))
+    return matches
+
+def measure(func, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--sections", type=int, default=500)
+    arg_parser.add_argument("--size", type=int, default=100)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    result = generate(args.sections, args.size)
+    index = TreeIndex(result)
+    assert len(list(index.select("section > item[kind=rare]"))) == len(scan(result)) == args.sections
+
+    build = measure(lambda: TreeIndex(result), args.repeat)
+    scanned = measure(lambda: scan(result), args.repeat)
+    selected = measure(lambda: list(index.select("section > item[kind=rare]")), args.repeat)
+    # 替换后恢复原值，使每次测量的树相同
+    replacement = section(*[item(kind="common") for _ in range(args.size)])
+    def replace():
+        old = index.replace(("section0",), replacement)
+        index.replace(("section0",), old)
+    replaced = measure(replace, args.repeat) / 2
+
+    print(f"{len(index)} nodes")
+    print(f"{'build index':>18}: median {build:8.2f} ms")
+    print(f"{'full scan':>18}: median {scanned:8.2f} ms")
+    print(f"{'indexed select':>18}: median {selected:8.2f} ms  ({scanned / selected:.1f}x faster)")
+    print(f"{'replace section':>18}: median {replaced:8.2f} ms  ({build / replaced:.1f}x faster than rebuilding)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Parse daemon: latency of ``parse_config`` on a synthetic configuration in a fresh interpreter, in a fresh
+interpreter asking a ``ParseServer``, and of repeated requests for the cached configuration from a running client.
+
+Usage::
+
+    python -m benchmark.bench_server [--nodes N] [--imports N] [--runs N] [--requests N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmark.synthetic import Shape, schema_modules, write_config
+from properpy import parse_config
+from properpy.server import ParseServer, close_connections
+
+SCRIPT = '''
+import sys
+from properpy import parse_config
+parse_config(sys.argv[1], sys.argv[2].split(","), module_paths=[sys.argv[3]], server=sys.argv[4] or None)
+'''
+
+
+def run_process(path: str, modules: list[str], directory: str, server: str, runs: int) -> float:
+    """每次在新的解释器中解析一次，包括解释器启动与导入 properpy 的时间"""
+    samples = []
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", SCRIPT, path, ",".join(modules), directory, server],
+                       check=True, env=environment)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--nodes", type=int, default=2000)
+    arg_parser.add_argument("--imports", type=int, default=4, help="number of schema modules")
+    arg_parser.add_argument("--runs", type=int, default=5, help="number of fresh interpreters")
+    arg_parser.add_argument("--requests", type=int, default=1000, help="number of requests of a running client")
+    args = arg_parser.parse_args()
+
+    shape = Shape(args.nodes, imports=args.imports)
+    modules = schema_modules(shape)
+    with tempfile.TemporaryDirectory() as directory:
+        path = str(write_config(directory, shape))
+        socket_path = os.path.join(directory, "properpy.sock")
+        with ParseServer(socket_path, workers=2):
+            cold = run_process(path, modules, directory, "", args.runs)
+            # 第一次请求在工作进程中解析，之后由缓存返回
+            parse_config(path, modules, module_paths=[directory], server=socket_path)
+            client = run_process(path, modules, directory, socket_path, args.runs)
+
+            samples = []
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                parse_config(path, modules, module_paths=[directory], server=socket_path)
+                samples.append(time.perf_counter() - start)
+            cached = statistics.median(samples) * 1000
+            close_connections(socket_path)
+
+            parse_config(path, modules, module_paths=[directory])  # 预热
+            samples = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                parse_config(path, modules, module_paths=[directory])
+                samples.append(time.perf_counter() - start)
+            local = statistics.median(samples) * 1000
+
+    print(f"{'fresh process, local parse':>30}: median {cold:9.3f} ms")
+    print(f"{'fresh process, server':>30}: median {client:9.3f} ms  ({cold / client:.1f}x faster)")
+    print(f"{'warm process, local parse':>30}: median {local:9.3f} ms")
+    print(f"{'warm process, cached request':>30}: median {cached:9.3f} ms  ({local / cached:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
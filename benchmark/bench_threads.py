@@ -0,0 +1,72 @@
+"""
+Thread scaling of ``Parser.parse``: parses the same generated configuration on a thread pool of increasing size,
+each thread with its own parser. On a regular CPython build the GIL serializes evaluation; on a free-threaded build
+(``python3.13t``) the throughput should grow with the number of threads.
+
+Usage::
+
+    python -m benchmark.bench_threads [--parses N] [--nodes N] [--max-threads N]
+"""
+import argparse
+import os
+import sys
+import sysconfig
+import tempfile
+import textwrap
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from properpy import Parser
+
+SCHEMA = '''
+from properpy import component
+
+@component
+def row(label: str, value=None):
+    pass
+'''
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--parses", type=int, default=64)
+    arg_parser.add_argument("--nodes", type=int, default=2000)
+    arg_parser.add_argument("--max-threads", type=int, default=os.cpu_count() or 1)
+    args = arg_parser.parse_args()
+
+    rows = ",\n".join(f"    row('label {i}', value={i})" for i in range(args.nodes))
+    code = f"from threads_schema import row\nrows = [\n{rows}\n]\n"
+    free_threaded = bool(sysconfig.get_config_var("Py_GIL_DISABLED"))
+    print(f"Python {sys.version.split()[0]}, free-threaded: {free_threaded}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        (Path(directory) / "threads_schema.py").write_text(textwrap.dedent(SCHEMA))
+        local = threading.local()
+
+        def parse(_):
+            # 每个线程使用自己的解析器，编译产物共享
+            if not hasattr(local, "parser"):
+                local.parser = Parser([directory])
+                local.parser.register_module("threads_schema")
+            return local.parser.parse(program)
+
+        program = Parser([directory]).compile(code)
+        threads = 1
+        baseline = None
+        while threads <= args.max_threads:
+            with ThreadPoolExecutor(threads) as executor:
+                list(executor.map(parse, range(threads)))  # 预热
+                start = time.perf_counter()
+                list(executor.map(parse, range(args.parses)))
+                elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{threads:>3} threads: {elapsed * 1000:9.1f} ms  {args.parses / elapsed:8.1f} parses/s  "
+                  f"speedup {baseline / elapsed:.1f}x")
+            threads *= 2
+        sys.modules.pop("threads_schema", None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Benchmark suite over synthetic configurations (see :mod:`benchmark.synthetic`), with JSON baselines.
+
+For every configuration shape it measures ``parse_config``, ``Parser.parse`` with a reused parser,
+``import_config`` and the peak memory of a parse (``tracemalloc``). It also measures the overhead of a raw
+``component`` call and the import time of ``properpy`` itself.
+
+Usage::
+
+    python -m benchmark.suite [--sizes 100 1000 10000] [--repeat N] [--output results.json]
+    python -m benchmark.suite --compare baseline.json [--threshold 0.15]
+
+With ``--compare``, every metric that is worse than the baseline by more than ``--threshold`` is reported as a
+regression and the exit code is 1.
+"""
+import argparse
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from pathlib import Path
+
+from benchmark.synthetic import Shape, schema_modules, write_config
+from properpy import Parser, component, import_config, parse_config
+
+
+def shapes(sizes: list[int]) -> list[Shape]:
+    result = []
+    for nodes in sizes:
+        result.append(Shape(nodes, style="call"))
+        result.append(Shape(nodes, style="literal"))
+        result.append(Shape(nodes, depth=8, fanout=2, style="call"))
+        result.append(Shape(nodes, depth=2, fanout=32, style="call"))
+        result.append(Shape(nodes, style="call", imports=8))
+    return result
+
+def best(func, repeat: int) -> float:
+    """多次运行取最短耗时（秒），计时期间关闭垃圾回收"""
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return min(samples)
+
+def peak_memory(func) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def measure_shape(shape: Shape, directory: Path, repeat: int) -> dict[str, float]:
+    path = write_config(directory, shape)
+    code = path.read_text()
+    modules = schema_modules(shape)
+    parser = Parser([str(directory)])
+    parser.register_module("properpy", *modules)
+    parser.parse(code)  # 预热：导入模块并加载名称
+
+    counter = [0]
+    def import_once():
+        counter[0] += 1
+        name = f"bench_config_{counter[0]}"
+        import_config(str(path), name)
+        sys.modules.pop(name, None)
+
+    return {
+        "parse_config_ms": best(lambda: parse_config(str(path), modules, module_paths=[str(directory)],
+                                                     bytecode_cache=False), repeat) * 1e3,
+        "parser_parse_ms": best(lambda: parser.parse(code), repeat) * 1e3,
+        "import_config_ms": best(import_once, repeat) * 1e3,
+        "peak_memory_kib": peak_memory(lambda: parser.parse(code)) / 1024,
+    }
+
+def component_overhead_ns(repeat: int) -> float:
+    @component
+    def node(*children, name: str = None, size: int = 0):
+        pass
+
+    number = 100_000
+    timer = timeit.Timer("node('a', node(), name='n', size=1)", globals={"node": node})
+    # 每次语句包含两次组件调用
+    return min(timer.repeat(repeat, number)) / number / 2 * 1e9
+
+def import_time_ms(repeat: int) -> float:
+    root = Path(__file__).resolve().parent.parent
+    script = "import time; start = time.perf_counter(); import properpy; print(time.perf_counter() - start)"
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", script], cwd=root, check=True, capture_output=True,
+                                text=True, env={"PYTHONPATH": str(root), "PYTHONDONTWRITEBYTECODE": "1"}).stdout
+        samples.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(samples) * 1e3
+
+def run(sizes: list[int], repeat: int) -> dict:
+    metrics = {
+        "component_call_ns": component_overhead_ns(repeat),
+        "import_properpy_ms": import_time_ms(repeat),
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        sys.path.insert(0, directory)
+        try:
+            for shape in shapes(sizes):
+                for name, value in measure_shape(shape, Path(directory), repeat).items():
+                    metrics[f"{shape.name}/{name}"] = value
+                print(f"measured {shape.name}", file=sys.stderr)
+        finally:
+            sys.path.remove(directory)
+            for module in [name for name in sys.modules if name.startswith("bench_schema_")]:
+                del sys.modules[module]
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "metrics": metrics,
+    }
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """逐项比较指标（越小越好），返回超过阈值的退化项"""
+    regressions = []
+    print(f"{'metric':<56} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, value in current["metrics"].items():
+        previous = baseline["metrics"].get(name)
+        if previous is None or previous <= 0:
+            continue
+        change = value / previous - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<56} {previous:>12.2f} {value:>12.2f} {change:>+7.1%}{flag}")
+    return regressions
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000],
+                            help="numbers of component nodes, e.g. 100 1000 10000 100000 1000000")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--output", type=Path, help="write the results to this JSON file")
+    arg_parser.add_argument("--compare", type=Path, help="compare the results with this JSON baseline")
+    arg_parser.add_argument("--threshold", type=float, default=0.15,
+                            help="relative slowdown reported as a regression (default 0.15)")
+    args = arg_parser.parse_args()
+
+    results = run(args.sizes, args.repeat)
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2))
+    if args.compare is None:
+        print(json.dumps(results, indent=2))
+        return
+    regressions = compare(results, json.loads(args.compare.read_text()), args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Synthetic configuration generators for the benchmark suite.
+
+A :class:`Shape` describes a configuration: the number of component nodes, the depth and fan-out of the component
+trees, whether it is literal-heavy (data in ``attrs``, lists and dictionaries) or call-heavy (nested component calls),
+and how many schema modules it imports. :func:`write_config` writes the configuration and its schema modules to a
+directory.
+"""
+from pathlib import Path
+from typing import NamedTuple
+
+SCHEMA = '''
+from properpy import component
+
+@component
+def node(*children, name: str = None, size: int = 0, style: dict = None):
+    pass
+
+@component
+def leaf(text: str, weight: int = 1):
+    pass
+'''
+
+
+class Shape(NamedTuple):
+    """
+    - nodes: The approximate number of component nodes.
+    - depth: The depth of every component tree.
+    - fanout: The number of children of every inner node.
+    - style: ``"call"`` for nested component calls, ``"literal"`` for literal data passed to flat components.
+    - imports: The number of schema modules imported by the configuration.
+    """
+    nodes: int
+    depth: int = 4
+    fanout: int = 4
+    style: str = "call"
+    imports: int = 1
+
+    @property
+    def name(self) -> str:
+        return f"{self.style}-n{self.nodes}-d{self.depth}-f{self.fanout}-i{self.imports}"
+
+
+def _tree(shape: Shape, depth: int, counter: list[int], module: str) -> str:
+    counter[0] += 1
+    index = counter[0]
+    if depth <= 1:
+        return f"{module}.leaf('text {index}', weight={index % 7})"
+    children = ", ".join(_tree(shape, depth - 1, counter, module) for _ in range(shape.fanout))
+    return f"{module}.node({children}, name='node {index}', size={index % 100})"
+
+def _literal(index: int, module: str) -> str:
+    return (f"{module}.node(attrs(style={{'padding': {index % 8}, 'tags': ['a{index}', 'b{index}'], "
+            f"'grid': [[{index}, {index + 1}], [{index + 2}, {index + 3}]]}}), name='item {index}', size={index})")
+
+def generate(shape: Shape) -> str:
+    """Returns the source of a configuration of the given shape."""
+    modules = [f"bench_schema_{k}" for k in range(shape.imports)]
+    lines = [f"import {module}" for module in modules]
+    lines.append("from properpy import attrs")
+    counter = [0]
+    statement = 0
+    while counter[0] < shape.nodes:
+        module = modules[statement % len(modules)]
+        if shape.style == "literal":
+            counter[0] += 1
+            lines.append(f"item{statement} = {_literal(statement, module)}")
+        else:
+            lines.append(f"tree{statement} = {_tree(shape, shape.depth, counter, module)}")
+        statement += 1
+    return "\n".join(lines) + "\n"
+
+def write_config(directory: str|Path, shape: Shape) -> Path:
+    """
+    Writes the configuration of the given shape and the schema modules it imports to ``directory``.
+
+    :return: The path of the configuration file.
+    """
+    directory = Path(directory)
+    for k in range(shape.imports):
+        (directory / f"bench_schema_{k}.py").write_text(SCHEMA)
+    path = directory / f"{shape.name}.proper.py"
+    path.write_text(generate(shape))
+    return path
+
+def schema_modules(shape: Shape) -> list[str]:
+    return [f"bench_schema_{k}" for k in range(shape.imports)]
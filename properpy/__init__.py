@@ -1,3 +1,18 @@
+__version__ = "0.1.0"
+
 from properpy.parser import Parser
 from properpy.library import component,attrs,config_wrapper,import_config,parse_config
+from properpy.library import import_config_async,parse_config_async,iter_parse_config,parse_many,BatchResult
 from properpy.module_guard import ModuleTag
+from properpy.cache import ResultCache
+from properpy.compiler import ParseEvent
+from properpy.node import Node, compact_nodes, to_dict
+from properpy.watch import ConfigWatcher, ConfigChange
+from properpy.incremental import IncrementalParser
+from properpy.profile import ParseProfile
+from properpy.artifact import write_artifact, load_artifact, compile_config
+from properpy.validation import validate_components, ComponentValidationError
+from properpy.lazy import LazyNode, materialize
+from properpy.interning import intern_nodes, InternTable, FrozenDict
+from properpy.query import TreeIndex
+from properpy.budget import Budget, BudgetExceededError, parse_budget
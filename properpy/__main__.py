@@ -0,0 +1,72 @@
+"""
+Command line interface of properpy.
+
+Usage::
+
+    properpy compile config.proper.py [-o config.proper.ppya] [-m config_schema ...] [-b NORMAL ...] [-p src ...]
+    properpy serve /tmp/properpy.sock [-w 4] [--cache-size 1024] [--cache-dir .properpy_cache]
+"""
+import argparse
+import signal
+import sys
+
+from properpy.artifact import compile_config
+from properpy.module_guard import ModuleTag
+
+
+def main(argv:list[str] = None):
+    arg_parser = argparse.ArgumentParser(prog="properpy", description="Python File as Property File.")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    compile_command = commands.add_parser("compile", help="evaluate configuration files into artifacts "
+                                                          "loaded with properpy.artifact.load_artifact")
+    compile_command.add_argument("files", nargs="+", help="configuration files")
+    compile_command.add_argument("-o", "--output", help="artifact file (only with a single configuration file), "
+                                                        "defaults to the configuration path with a .ppya suffix")
+    compile_command.add_argument("-m", "--module", dest="modules", action="append", default=[],
+                                 help="module allowed in the configuration, may be repeated")
+    compile_command.add_argument("-b", "--builtin", dest="builtins", action="append", default=[],
+                                 choices=[tag.name for tag in ModuleTag],
+                                 help="built-in module tag allowed in the configuration, may be repeated")
+    compile_command.add_argument("-p", "--module-path", dest="module_paths", action="append",
+                                 help="additional path to search for modules, may be repeated")
+    compile_command.add_argument("--compact", action="store_true", help="store components as compact nodes")
+
+    serve_command = commands.add_parser("serve", help="run a parse daemon on a Unix socket, used with "
+                                                      "parse_config(..., server=socket)")
+    serve_command.add_argument("socket", help="path of the Unix socket")
+    serve_command.add_argument("-w", "--workers", type=int, help="number of worker processes, 0 to parse in "
+                                                                "the daemon process, defaults to the number of CPUs")
+    serve_command.add_argument("--cache-size", type=int, default=1024, help="number of results kept in memory")
+    serve_command.add_argument("--cache-dir",
+                               help="directory in which results are also stored on disk, writable by trusted users only")
+    args = arg_parser.parse_args(argv)
+
+    if args.command == "serve":
+        return serve(args)
+
+    if args.output is not None and len(args.files) > 1:
+        arg_parser.error("--output requires a single configuration file")
+    for file in args.files:
+        output = compile_config(file, args.output, args.modules, [ModuleTag[name] for name in args.builtins],
+                                args.module_paths, args.compact)
+        print(output)
+
+def serve(args):
+    # 服务只在启动守护进程时导入
+    from properpy.cache import ResultCache
+    from properpy.server import ParseServer
+    cache = ResultCache(args.cache_size, directory=args.cache_dir, reload_modules=True)
+    server = ParseServer(args.socket, args.workers, cache)
+    # SIGTERM 与 Ctrl-C 一样停止服务，并删除套接字文件
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,540 @@
+import marshal
+import mmap
+import os
+import struct
+import zlib
+from collections.abc import Mapping, Sequence
+from os import PathLike
+from tempfile import NamedTemporaryFile
+from typing import Any, Iterator, NamedTuple
+
+from properpy.module_guard import ModuleTag
+from properpy.node import Node, EMPTY_CHILDREN
+
+ARTIFACT_MAGIC = b"PPYA"
+ARTIFACT_SUFFIX = ".ppya"
+# 产物格式版本，编码方式改变时递增
+ARTIFACT_FORMAT = 1
+
+# 文件头：魔数、格式版本、marshal 版本、数据区的 CRC32、字符串表位置、根值位置、数据区长度
+_HEADER = struct.Struct("<4sHHIQQQ")
+
+# 值记录的类型标记
+_NONE, _TRUE, _FALSE = b"N"[0], b"T"[0], b"F"[0]
+_INT, _BIG_INT, _FLOAT = b"I"[0], b"L"[0], b"D"[0]
+_STR, _BYTES = b"S"[0], b"B"[0]
+_LIST, _TUPLE, _DICT, _NODE = b"["[0], b"("[0], b"{"[0], b"n"[0]
+# 小容器整体以 marshal 格式保存，由 C 实现一次解码
+_BLOB = b"M"[0]
+
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+_PAIR = struct.Struct("<QQ")
+_NAMED = struct.Struct("<IQ")
+_NODE_HEAD = struct.Struct("<IQI")
+
+_SCALARS = frozenset((type(None), bool, int, float, str, bytes))
+_BLOB_TYPES = frozenset((list, tuple, dict))
+# 嵌套值的总数不超过它的容器保存为 marshal 数据，更大的容器保存为可按需解码的记录
+_BLOB_ITEMS = 256
+
+
+class ArtifactError(ValueError):
+    """Raised when a file is not a valid artifact: wrong magic number or format version, truncated or corrupted."""
+
+
+def artifact_path(file_path:str|PathLike[str])->str:
+    """
+    Returns the default artifact path of a configuration file: the final ``.py`` suffix is replaced with
+    ``.ppya``, e.g. ``config.proper.py`` -> ``config.proper.ppya``.
+    """
+    file_path = os.fspath(file_path)
+    stem = file_path[:-len(".py")] if file_path.endswith(".py") else file_path
+    return stem + ARTIFACT_SUFFIX
+
+
+class _Pending(NamedTuple):
+    """尚未写入的标量或小容器，由它的容器决定写入为记录还是并入 marshal 数据"""
+    value: Any
+    size: int
+
+
+class _Encoder:
+    """后序编码：子值先于容器写入，容器记录只保存子值的位置"""
+    def __init__(self):
+        self.data = bytearray(_HEADER.size)
+        self.strings: dict[str, int] = {}
+        self._scalars: dict[tuple, int] = {}
+
+    def string(self, value:str)->int:
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+        return index
+
+    def encode(self, root:Any)->int:
+        """写入 root 及其嵌套的值，返回 root 记录的位置；不使用递归，深层树也能编码"""
+        results: list[int|_Pending] = []
+        # (值, 是否已处理全部子值)；active 记录正在编码的容器，检测循环引用
+        stack = [(root, False)]
+        active = set()
+        while stack:
+            value, ready = stack.pop()
+            children = self._children(value)
+            if children is None:
+                if type(value) not in _SCALARS:
+                    raise TypeError(f"Cannot write a value of type {type(value).__name__} to an artifact")
+                results.append(_Pending(value, 1))
+                continue
+            if ready:
+                active.discard(id(value))
+                count = len(children)
+                items = results[len(results) - count:] if count else []
+                del results[len(results) - count:]
+                if type(value) in _BLOB_TYPES and all(type(item) is _Pending for item in items):
+                    size = 1 + sum(item.size for item in items)
+                    if size <= _BLOB_ITEMS:
+                        results.append(_Pending(value, size))
+                        continue
+                results.append(self._container(value, [self._write(item) for item in items]))
+                continue
+            if id(value) in active:
+                raise ValueError("Cannot write an artifact of a value containing itself")
+            active.add(id(value))
+            stack.append((value, True))
+            stack.extend((child, False) for child in reversed(children))
+        return self._write(results[0])
+
+    def _write(self, item:int|_Pending)->int:
+        if type(item) is not _Pending:
+            return item
+        if item.size == 1 and type(item.value) not in _BLOB_TYPES:
+            return self._scalar(item.value)
+        data = self.data
+        offset = len(data)
+        raw = marshal.dumps(item.value)
+        data.append(_BLOB)
+        data += _U32.pack(len(raw)) + raw
+        return offset
+
+    @staticmethod
+    def _children(value:Any)->list|None:
+        if isinstance(value, (list, tuple)):
+            return value
+        if isinstance(value, Node):
+            if not isinstance(value.children, (list, tuple)):
+                raise TypeError(f"Cannot write a node whose children are a {type(value.children).__name__}")
+            # 节点的子元素作为一个元组记录
+            return [value.children, *value._values]
+        if isinstance(value, dict):
+            return [item for pair in value.items() for item in pair]
+        return None
+
+    def _scalar(self, value:Any)->int:
+        kind = type(value)
+        # 浮点数按二进制表示去重，区分 0.0 与 -0.0
+        key = (kind, _F64.pack(value) if kind is float else value)
+        offset = self._scalars.get(key)
+        if offset is not None:
+            return offset
+        data = self.data
+        offset = len(data)
+        if value is None:
+            data.append(_NONE)
+        elif kind is bool:
+            data.append(_TRUE if value else _FALSE)
+        elif kind is int:
+            if -2 ** 63 <= value < 2 ** 63:
+                data.append(_INT)
+                data += _I64.pack(value)
+            else:
+                raw = value.to_bytes((value.bit_length() + 8) // 8, "little", signed=True)
+                data.append(_BIG_INT)
+                data += _U32.pack(len(raw)) + raw
+        elif kind is float:
+            data.append(_FLOAT)
+            data += _F64.pack(value)
+        elif kind is str:
+            data.append(_STR)
+            data += _U32.pack(self.string(value))
+        else:
+            data.append(_BYTES)
+            data += _U32.pack(len(value)) + value
+        self._scalars[key] = offset
+        return offset
+
+    def _container(self, value:Any, items:list[int])->int:
+        data = self.data
+        offset = len(data)
+        if isinstance(value, Node):
+            names = value._names
+            data.append(_NODE)
+            data += _NODE_HEAD.pack(self.string(value.tag), items[0], len(names))
+            for name, item in zip(names, items[1:]):
+                data += _NAMED.pack(self.string(name), item)
+        elif isinstance(value, dict):
+            data.append(_DICT)
+            data += _U32.pack(len(value))
+            for index in range(0, len(items), 2):
+                data += _PAIR.pack(items[index], items[index + 1])
+        else:
+            data.append(_TUPLE if isinstance(value, tuple) else _LIST)
+            data += _U32.pack(len(items))
+            data += struct.pack(f"<{len(items)}Q", *items)
+        return offset
+
+    def finish(self, root:int)->bytes:
+        """写入字符串表与文件头"""
+        data = self.data
+        strings = len(data)
+        data += _U32.pack(len(self.strings))
+        table = len(data)
+        data += bytes(8 * len(self.strings))
+        for index, value in enumerate(self.strings):
+            _U64.pack_into(data, table + 8 * index, len(data))
+            raw = value.encode("utf-8", "surrogatepass")
+            data += _U32.pack(len(raw)) + raw
+        payload = memoryview(data)[_HEADER.size:]
+        _HEADER.pack_into(data, 0, ARTIFACT_MAGIC, ARTIFACT_FORMAT, marshal.version, zlib.crc32(payload), strings, root,
+                          len(payload))
+        payload.release()
+        return bytes(data)
+
+def dump_artifact(value:Any)->bytes:
+    """
+    Serializes a value to the artifact format (see :func:`write_artifact`).
+
+    :param value: The value to serialize.
+    :return: The artifact.
+    """
+    encoder = _Encoder()
+    return encoder.finish(encoder.encode(value))
+
+def write_artifact(value:Any, file_path:str|PathLike[str]):
+    """
+    Writes a value, typically the result of :func:`properpy.parse_config` or the data collected by a
+    ``config_wrapper`` receiver, to an artifact file that :func:`load_artifact` reads without executing any Python.
+
+    Supported values are None, booleans, integers, floats, strings, bytes, lists, tuples, dictionaries and
+    :class:`properpy.node.Node` objects, nested to any depth. Large containers are stored as indexed records that
+    can be decoded item by item, small ones (up to 256 nested values, without nodes) in the :mod:`marshal` format,
+    decoded at once. The file is written atomically.
+
+    :param value: The value to write.
+    :param file_path: The artifact file.
+    :raises TypeError: When the value contains an object of another type.
+    """
+    data = dump_artifact(value)
+    file_path = os.fspath(file_path)
+    directory = os.path.dirname(os.path.abspath(file_path))
+    with NamedTemporaryFile("wb", dir=directory, prefix=".", suffix=ARTIFACT_SUFFIX, delete=False) as file:
+        file.write(data)
+    os.replace(file.name, file_path)
+
+
+class _Reader:
+    """
+    对产物数据的只读访问：按位置解码值记录，字符串按需解码并缓存。
+    owner 为保持 buffer 有效的对象（如共享内存段），与视图同生命周期。
+    """
+    __slots__ = ("buffer", "root", "owner", "_strings", "_table")
+
+    def __init__(self, buffer, verify:bool, owner:Any = None):
+        self.buffer = buffer
+        self.owner = owner
+        if len(buffer) < _HEADER.size:
+            raise ArtifactError("Truncated artifact")
+        magic, version, marshal_version, checksum, strings, root, length = _HEADER.unpack_from(buffer, 0)
+        if magic != ARTIFACT_MAGIC:
+            raise ArtifactError("Not a properpy artifact")
+        if version != ARTIFACT_FORMAT:
+            raise ArtifactError(f"Unsupported artifact format {version}, expected {ARTIFACT_FORMAT}")
+        if marshal_version > marshal.version:
+            raise ArtifactError(f"Artifact written with marshal version {marshal_version}, "
+                                f"this interpreter reads up to {marshal.version}")
+        if len(buffer) != _HEADER.size + length:
+            raise ArtifactError("Truncated artifact")
+        if verify:
+            with memoryview(buffer) as view:
+                if zlib.crc32(view[_HEADER.size:]) != checksum:
+                    raise ArtifactError("Artifact checksum mismatch")
+        self._table = strings + 4
+        self._strings: list[str|None] = [None] * _U32.unpack_from(buffer, strings)[0]
+        self.root = root
+
+    def string(self, index:int)->str:
+        value = self._strings[index]
+        if value is None:
+            offset = _U64.unpack_from(self.buffer, self._table + 8 * index)[0]
+            length = _U32.unpack_from(self.buffer, offset)[0]
+            value = self._strings[index] = str(self.buffer[offset + 4:offset + 4 + length], "utf-8", "surrogatepass")
+        return value
+
+    def value(self, offset:int, lazy:bool = True)->Any:
+        """解码一个值记录；lazy 时容器返回按需解码的视图"""
+        buffer = self.buffer
+        kind = buffer[offset]
+        if kind == _STR:
+            return self.string(_U32.unpack_from(buffer, offset + 1)[0])
+        if kind == _INT:
+            return _I64.unpack_from(buffer, offset + 1)[0]
+        if kind == _NONE:
+            return None
+        if kind == _TRUE:
+            return True
+        if kind == _FALSE:
+            return False
+        if kind == _FLOAT:
+            return _F64.unpack_from(buffer, offset + 1)[0]
+        if kind == _BIG_INT:
+            length = _U32.unpack_from(buffer, offset + 1)[0]
+            return int.from_bytes(buffer[offset + 5:offset + 5 + length], "little", signed=True)
+        if kind == _BYTES:
+            length = _U32.unpack_from(buffer, offset + 1)[0]
+            return bytes(buffer[offset + 5:offset + 5 + length])
+        if kind == _BLOB:
+            length = _U32.unpack_from(buffer, offset + 1)[0]
+            return marshal.loads(buffer[offset + 5:offset + 5 + length])
+        if not lazy:
+            return self.materialize(offset)
+        if kind == _LIST or kind == _TUPLE:
+            return ArtifactList(self, offset)
+        if kind == _DICT:
+            return ArtifactDict(self, offset)
+        if kind == _NODE:
+            return self._node(offset)
+        raise ArtifactError(f"Corrupted artifact record at {offset}")
+
+    def _node(self, offset:int)->Node:
+        """节点解码一层，子元素与属性值中的容器为视图；子元素保持为视图，深层或很宽的树不会一次解码"""
+        tag, children, count = _NODE_HEAD.unpack_from(self.buffer, offset + 1)
+        attributes = {}
+        position = offset + 1 + _NODE_HEAD.size
+        for _ in range(count):
+            name, item = _NAMED.unpack_from(self.buffer, position)
+            attributes[self.string(name)] = self.value(item)
+            position += _NAMED.size
+        items = self.value(children)
+        if not items:
+            items = EMPTY_CHILDREN
+        elif type(items) is list:
+            # 以 marshal 数据保存的小列表已经解码
+            items = tuple(items)
+        return Node(self.string(tag), items, attributes)
+
+    def offsets(self, offset:int, count:int)->tuple[int, ...]:
+        return struct.unpack_from(f"<{count}Q", self.buffer, offset + 5)
+
+    def _children(self, offset:int)->tuple[int, ...]|None:
+        """容器记录的子值位置，与编码顺序相同；标量与 marshal 数据返回 None"""
+        buffer = self.buffer
+        kind = buffer[offset]
+        if kind == _LIST or kind == _TUPLE:
+            return self.offsets(offset, _U32.unpack_from(buffer, offset + 1)[0])
+        if kind == _DICT:
+            count = _U32.unpack_from(buffer, offset + 1)[0]
+            return struct.unpack_from(f"<{2 * count}Q", buffer, offset + 5)
+        if kind == _NODE:
+            _, children, count = _NODE_HEAD.unpack_from(buffer, offset + 1)
+            position = offset + 1 + _NODE_HEAD.size
+            return (children, *(_NAMED.unpack_from(buffer, position + _NAMED.size * k)[1] for k in range(count)))
+        return None
+
+    def materialize(self, root:int)->Any:
+        """完整解码为普通的 list、tuple、dict 与 Node：后序解码，不使用递归"""
+        buffer = self.buffer
+        values = []
+        stack = [(root, None)]
+        while stack:
+            offset, children = stack.pop()
+            if children is None:
+                children = self._children(offset)
+                if children is None:
+                    values.append(self.value(offset))
+                else:
+                    stack.append((offset, children))
+                    stack.extend((child, None) for child in reversed(children))
+                continue
+            count = len(children)
+            items = values[len(values) - count:] if count else []
+            del values[len(values) - count:]
+            kind = buffer[offset]
+            if kind == _LIST:
+                values.append(items)
+            elif kind == _TUPLE:
+                values.append(tuple(items) if items else EMPTY_CHILDREN)
+            elif kind == _DICT:
+                values.append(dict(zip(items[0::2], items[1::2])))
+            else:
+                tag, _, _ = _NODE_HEAD.unpack_from(buffer, offset + 1)
+                position = offset + 1 + _NODE_HEAD.size
+                names = [self.string(_NAMED.unpack_from(buffer, position + _NAMED.size * k)[0])
+                         for k in range(count - 1)]
+                node_children = items[0]
+                if type(node_children) is list:
+                    node_children = tuple(node_children) if node_children else EMPTY_CHILDREN
+                values.append(Node(self.string(tag), node_children, dict(zip(names, items[1:]))))
+        return values[0]
+
+
+class ArtifactList(Sequence):
+    """
+    Read-only view of a list or tuple stored in an artifact. Items are decoded when accessed and containers in it
+    are views too. Compares equal to lists and tuples with equal items.
+    """
+    __slots__ = ("_reader", "_offset", "_count", "_items")
+
+    def __init__(self, reader:_Reader, offset:int):
+        self._reader = reader
+        self._offset = offset
+        self._count = _U32.unpack_from(reader.buffer, offset + 1)[0]
+        self._items: list|None = None
+
+    def __len__(self)->int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[k] for k in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("artifact list index out of range")
+        if self._items is None:
+            self._items = [None] * self._count
+        item = self._items[index]
+        if item is None:
+            offset = _U64.unpack_from(self._reader.buffer, self._offset + 5 + 8 * index)[0]
+            item = self._items[index] = self._reader.value(offset)
+        return item
+
+    def __eq__(self, other)->bool:
+        if isinstance(other, (list, tuple, ArtifactList)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self)->str:
+        return f"ArtifactList({list(self)!r})"
+
+    def materialize(self)->list|tuple:
+        """Decodes the whole list, and everything nested in it, to plain Python objects."""
+        return self._reader.materialize(self._offset)
+
+
+class ArtifactDict(Mapping):
+    """
+    Read-only view of a dictionary stored in an artifact. Keys are decoded on first use, values when accessed, and
+    containers in it are views too. Compares equal to dictionaries with equal items.
+    """
+    __slots__ = ("_reader", "_offset", "_index", "_values")
+
+    def __init__(self, reader:_Reader, offset:int):
+        self._reader = reader
+        self._offset = offset
+        self._index: dict|None = None  # 键 -> 值记录的位置
+        self._values: dict = {}
+
+    def _keys(self)->dict:
+        if self._index is None:
+            reader = self._reader
+            count = _U32.unpack_from(reader.buffer, self._offset + 1)[0]
+            index = {}
+            for position in range(self._offset + 5, self._offset + 5 + count * _PAIR.size, _PAIR.size):
+                key, item = _PAIR.unpack_from(reader.buffer, position)
+                index[reader.value(key, lazy=False)] = item
+            self._index = index
+        return self._index
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        value = self._values[key] = self._reader.value(self._keys()[key])
+        return value
+
+    def __contains__(self, key)->bool:
+        return key in self._keys()
+
+    def __iter__(self)->Iterator:
+        return iter(self._keys())
+
+    def __len__(self)->int:
+        return len(self._keys())
+
+    def __repr__(self)->str:
+        return f"ArtifactDict({dict(self)!r})"
+
+    def materialize(self)->dict:
+        """Decodes the whole dictionary, and everything nested in it, to plain Python objects."""
+        return self._reader.materialize(self._offset)
+
+
+def load_artifact(file_path:str|PathLike[str], lazy:bool = True, verify:bool = True)->Any:
+    """
+    Loads an artifact written by :func:`write_artifact` or ``properpy compile``, without executing any Python or
+    importing the schema modules of the configuration.
+
+    The file is memory-mapped. With ``lazy``, large lists and dictionaries are returned as read-only views
+    (:class:`ArtifactList`, :class:`ArtifactDict`) that decode their items only when they are accessed, so a worker
+    pays only for the parts of the configuration it reads, and the pages of the file are shared between processes
+    by the operating system. Small containers are decoded at once into plain objects, and the children of
+    :class:`properpy.node.Node` objects are views as well. Otherwise the whole value is decoded into plain lists,
+    tuples, dictionaries and nodes.
+
+    Example::
+
+        config = load_artifact("config.proper.ppya")
+        config["children"][0]["name"]
+
+    :param file_path: The artifact file.
+    :param lazy: Whether to decode containers on access. Defaults to True.
+    :param verify: Whether to check the checksum of the whole file first. Defaults to True.
+    :return: The stored value.
+    :raises ArtifactError: When the file is not a valid artifact.
+    """
+    with open(file_path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        # 空文件无法映射
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+    reader = _Reader(buffer, verify)
+    value = reader.value(reader.root, lazy)
+    if not lazy and isinstance(buffer, mmap.mmap):
+        buffer.close()
+    return value
+
+def loads_artifact(data:bytes, lazy:bool = True, verify:bool = True)->Any:
+    """Same as :func:`load_artifact`, from the bytes returned by :func:`dump_artifact`."""
+    reader = _Reader(data, verify)
+    return reader.value(reader.root, lazy)
+
+def compile_config(
+        file_path:str|PathLike[str],
+        output_path:str|PathLike[str] = None,
+        supported_modules:list[str] = None,
+        supported_builtin_modules:list[ModuleTag] = None,
+        module_paths:list[str] = None,
+        compact:bool = False
+)->str:
+    """
+    Parses a configuration file with :func:`properpy.parse_config` and writes the result to an artifact, typically
+    at build time, so that processes load it with :func:`load_artifact` instead of executing the configuration.
+
+    :param file_path: The configuration file.
+    :param output_path: The artifact file. Defaults to the configuration path with a ``.ppya`` suffix
+                        (see :func:`artifact_path`).
+    :param supported_modules: A list of module names to register with the parser. Defaults to None.
+    :param supported_builtin_modules: A list of built-in module tags to register with the parser. Defaults to None.
+    :param module_paths: A list of additional paths to search for modules during parsing. Defaults to None.
+    :param compact: Whether to store components as :class:`properpy.node.Node` objects. Defaults to False.
+    :return: The path of the artifact.
+    """
+    from properpy.library import parse_config
+    result = parse_config(file_path, supported_modules, supported_builtin_modules, module_paths, compact=compact)
+    output_path = os.fspath(output_path) if output_path is not None else artifact_path(file_path)
+    write_artifact(result, output_path)
+    return output_path
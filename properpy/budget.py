@@ -0,0 +1,453 @@
+import ctypes
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import NamedTuple
+
+# 预算的适用范围
+PARSE = "parse"
+STATEMENT = "statement"
+
+
+class Budget(NamedTuple):
+    """
+    Limits on the resources an evaluation may use, each one None (the default) when unlimited.
+
+    - wall_time: The elapsed time, in seconds.
+    - cpu_time: The CPU time of the parsing thread, in seconds.
+    - memory_blocks: The net number of memory blocks allocated by the interpreter (``sys.getallocatedblocks``, the
+      measure of :class:`properpy.profile.ParseProfile`). Blocks allocated by other threads are counted too.
+    - calls: The number of Python and built-in function calls. Counting them installs a profile function in the
+      parsing thread (see :func:`sys.setprofile`), which slows the evaluation down several times; the other
+      limits cost nothing while the code runs.
+    """
+    wall_time: float|None = None
+    cpu_time: float|None = None
+    memory_blocks: int|None = None
+    calls: int|None = None
+
+
+class BudgetExceededError(RuntimeError):
+    """
+    Raised when an evaluation exceeds its budget (see :func:`parse_budget`).
+
+    - resource: The exhausted resource, the name of a :class:`Budget` field.
+    - limit: The limit of the budget.
+    - used: The amount used when the evaluation was stopped.
+    - scope: ``"parse"`` for the budget of the whole parse, ``"statement"`` for the budget of each statement.
+    - filename, line, source: The top-level statement being evaluated, or None when the statement is not known
+      (e.g. in the static mode).
+    """
+    def __init__(self, resource: str, limit: float, used: float, scope: str, filename: str = None,
+                 line: int = None, source: str = None):
+        self.resource = resource
+        self.limit = limit
+        self.used = used
+        self.scope = scope
+        self.filename = filename
+        self.line = line
+        self.source = source
+        super().__init__(str(self))
+
+    def __str__(self) -> str:
+        message = f"{self.scope} budget exceeded: {self.resource} {self.used:.6g} > {self.limit:.6g}"
+        if self.line is not None:
+            message += f" in {self.filename}:{self.line}: {self.source}"
+        return message
+
+    def __reduce__(self):
+        return BudgetExceededError, (self.resource, self.limit, self.used, self.scope, self.filename, self.line,
+                                     self.source)
+
+
+class _Limits(NamedTuple):
+    parse: Budget|None
+    statement: Budget|None
+
+# 当前线程/任务中生效的预算，由 parse_budget 设置
+_limits: ContextVar[_Limits|None] = ContextVar("properpy_budget", default=None)
+
+
+@contextmanager
+def parse_budget(parse: Budget = None, statement: Budget = None):
+    """
+    Context manager. Inside it, parses stop with a :class:`BudgetExceededError` naming the exhausted resource and the
+    offending statement as soon as they exceed a budget, in the current thread or task only, so that a configuration
+    with an accidental huge loop or deep recursion cannot stall a worker shared with other parses.
+
+    The budget of the parse covers the evaluation of all the statements of a configuration, including the modules
+    they import, but not the names loaded into the sandbox before it starts; the budget of a statement applies to
+    each top-level statement on its own, and is checked against the statement being evaluated when the budget is
+    exceeded. :meth:`Parser.iter_parse` and :func:`iter_parse_config` add up the usage of their statements and do not
+    count the time spent by the caller between two events. The components of a lazy parse evaluated after it
+    returns are not limited.
+
+    Time and memory are checked by a watchdog thread every few milliseconds, which interrupts the parsing thread
+    with an asynchronous exception (CPython only), and again at the end of every statement. The interruption takes
+    effect at the next Python instruction: a single long call into C code, e.g. ``list(range(10 ** 10))``, is only
+    interrupted when it returns, and an import is only interrupted when it completes. Use a process boundary with operating system limits when the configurations are
+    not trusted.
+
+    Example::
+
+        with parse_budget(Budget(wall_time=2.0), statement=Budget(cpu_time=0.5, calls=1_000_000)):
+            try:
+                result = parse_config("config.proper.py", ["config_schema"])
+            except BudgetExceededError as e:
+                log.warning("%s:%s exceeded its %s budget", e.filename, e.line, e.resource)
+
+    :param parse: The budget of a whole parse. Defaults to None (unlimited).
+    :param statement: The budget of each top-level statement. Defaults to None (unlimited).
+    """
+    token = _limits.set(_Limits(parse, statement) if parse is not None or statement is not None else None)
+    try:
+        yield
+    finally:
+        _limits.reset(token)
+
+
+class _Interrupt(BaseException):
+    """由看门狗线程或调用计数异步抛出，在计量范围的出口转换为 BudgetExceededError（BaseException：不被沙箱代码的
+    except Exception 捕获）"""
+
+
+class _Meter:
+    """一个预算的计量：起始时的用量，以及超出的资源"""
+    __slots__ = ("budget", "scope", "thread", "clock", "start_wall", "start_cpu", "start_blocks",
+                 "start_calls", "counted", "spent", "exceeded", "interrupted", "shielded")
+
+    def __init__(self, budget: Budget, scope: str):
+        self.budget = budget
+        self.scope = scope
+        self.thread = threading.get_ident()
+        self.clock = _thread_clock(self.thread) if budget.cpu_time is not None else None
+        self.exceeded: tuple|None = None  # (资源, 上限, 用量)
+        self.interrupted = False  # 看门狗是否已中断线程
+        self.shielded = 0  # 大于 0 时不中断线程（见 uninterruptible），超出的预算在结束时抛出
+        self.start_calls = 0
+        self.counted = 0  # 此前各段计量的调用次数
+        self.spent: tuple|None = None  # 暂停时已用的时间与内存，见 suspend
+        self.reset()
+
+    def reset(self):
+        """从当前的用量重新开始计量（不含调用次数）"""
+        budget = self.budget
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.thread_time() if budget.cpu_time is not None else 0.0
+        self.start_blocks = sys.getallocatedblocks() if budget.memory_blocks is not None else 0
+
+    def suspend(self):
+        """暂停计量（逐条求值在两条语句之间）：保存已用的时间与内存，再次计量时从中继续"""
+        budget = self.budget
+        self.spent = (time.perf_counter() - self.start_wall,
+                      time.thread_time() - self.start_cpu if budget.cpu_time is not None else 0.0,
+                      sys.getallocatedblocks() - self.start_blocks if budget.memory_blocks is not None else 0)
+
+    def resume(self):
+        self.reset()
+        wall, cpu, blocks = self.spent
+        self.start_wall -= wall
+        self.start_cpu -= cpu
+        self.start_blocks -= blocks
+
+    def check(self, in_thread: bool) -> tuple|None:
+        """超出的资源，未超出时为 None；其他线程中无法读取解析线程的 CPU 时间时不检查 CPU 时间"""
+        budget = self.budget
+        if budget.wall_time is not None:
+            used = time.perf_counter() - self.start_wall
+            if used > budget.wall_time:
+                return "wall_time", budget.wall_time, used
+        if budget.cpu_time is not None and (in_thread or self.clock is not None):
+            now = time.thread_time() if in_thread else time.clock_gettime(self.clock)
+            used = now - self.start_cpu
+            if used > budget.cpu_time:
+                return "cpu_time", budget.cpu_time, used
+        if budget.memory_blocks is not None:
+            used = sys.getallocatedblocks() - self.start_blocks
+            if used > budget.memory_blocks:
+                return "memory_blocks", budget.memory_blocks, used
+        return None
+
+    def error(self) -> BudgetExceededError:
+        return BudgetExceededError(*self.exceeded, self.scope)
+
+def _thread_clock(thread: int) -> int|None:
+    try:
+        return time.pthread_getcpuclockid(thread)
+    except (AttributeError, OSError):
+        return None
+
+
+# 看门狗检查的间隔（秒）
+_INTERVAL = 0.005
+
+
+class _Watchdog:
+    """所有线程共用的看门狗线程，在计量超出时间或内存预算时中断其线程；没有计量时等待"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._meters: set[_Meter] = set()
+        self._thread = None
+
+    def watch(self, meter: _Meter):
+        with self._lock:
+            self._meters.add(meter)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="properpy-budget", daemon=True)
+                self._thread.start()
+            self._wakeup.notify()
+
+    def restart(self, meter: _Meter):
+        """重新开始计量；持有锁，使看门狗不会按旧的起点中断新的语句"""
+        with self._lock:
+            if meter.exceeded is None:
+                meter.reset()
+
+    def shield(self, meters: tuple[_Meter, ...], delta: int):
+        """持有锁，使看门狗不会在刚开始或结束不中断的区间时按旧的状态中断线程"""
+        with self._lock:
+            for meter in meters:
+                meter.shielded += delta
+
+    def unwatch(self, meter: _Meter):
+        """在计量的线程中调用：停止检查，并让可能尚未抛出的中断在此抛出"""
+        with self._lock:
+            self._meters.discard(meter)
+        if meter.interrupted:
+            # 不用 PyThreadState_SetAsyncExc(NULL) 撤销中断：CPython 3.11 撤销后不复位 eval breaker，
+            # 之后安装了 profile 函数的代码会停在函数入口。循环的每次跳转都会抛出尚未抛出的异步异常
+            try:
+                for _ in range(64):
+                    pass
+            except _Interrupt:
+                pass
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._meters:
+                    self._wakeup.wait()
+            time.sleep(_INTERVAL)
+            with self._lock:
+                for meter in self._meters:
+                    if meter.exceeded is None and not meter.shielded:
+                        meter.exceeded = meter.check(False)
+                        if meter.exceeded is not None:
+                            # 只中断一次：再次中断可能落在解析器清理状态的代码中
+                            meter.interrupted = True
+                            ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(meter.thread),
+                                                                       ctypes.py_object(_Interrupt))
+
+_watchdog = _Watchdog()
+
+def _unwatch(meter: _Meter):
+    while True:
+        try:
+            _watchdog.unwatch(meter)
+            return
+        except _Interrupt:
+            # 中断在 unwatch 的入口抛出：再次调用
+            pass
+
+
+class _Calls(threading.local):
+    """线程中的调用计数：限制调用次数的计量，以及最近的上限"""
+    def __init__(self):
+        self.count = 0
+        self.threshold = None
+        self.meters: list[_Meter] = []
+        self.previous = None  # 安装计数之前的 profile 函数
+
+_calls = _Calls()
+
+def _count_calls(frame, event, arg):
+    if event == "call" or event == "c_call":
+        calls = _calls
+        calls.count += 1
+        if calls.count > calls.threshold and not any(meter.shielded for meter in calls.meters):
+            _calls_exceeded()
+            # profile 函数抛出异常后被移除，由 _uncount 恢复
+            raise _Interrupt
+
+def _calls_exceeded():
+    calls = _calls
+    for meter in calls.meters:
+        used = calls.count - meter.start_calls
+        if used > meter.budget.calls and meter.exceeded is None:
+            meter.exceeded = ("calls", meter.budget.calls, used)
+
+def _count(meter: _Meter):
+    calls = _calls
+    meter.start_calls = calls.count - meter.counted
+    calls.meters.append(meter)
+    calls.threshold = min(other.start_calls + other.budget.calls for other in calls.meters)
+    if len(calls.meters) == 1:
+        # 先设置上限再安装计数
+        calls.previous = sys.getprofile()
+        sys.setprofile(_count_calls)
+
+def _uncount(meter: _Meter):
+    calls = _calls
+    meter.counted = calls.count - meter.start_calls
+    calls.meters.remove(meter)
+    if calls.meters:
+        calls.threshold = min(other.start_calls + other.budget.calls for other in calls.meters)
+    else:
+        sys.setprofile(calls.previous)
+        calls.previous = None
+
+# 当前线程/任务中正在计量的预算，由外到内
+_meters: ContextVar[tuple[_Meter, ...]] = ContextVar("properpy_budget_meters", default=())
+
+
+@contextmanager
+def _metered(meter: _Meter):
+    """
+    在预算的计量下执行；超出预算时抛出 BudgetExceededError。
+    同一个计量可以多次使用（见 budgeted_parse），用量从上一次结束时继续累计。
+    """
+    budget = meter.budget
+    if meter.spent is not None:
+        meter.resume()
+    token = _meters.set(_meters.get() + (meter,))
+    watched = budget.wall_time is not None or budget.cpu_time is not None or budget.memory_blocks is not None
+    if budget.calls is not None:
+        _count(meter)
+    if watched:
+        _watchdog.watch(meter)
+    try:
+        yield meter
+        if meter.exceeded is None:
+            meter.exceeded = meter.check(True)
+    except _Interrupt:
+        raise _exceeded() from None
+    finally:
+        if watched:
+            _unwatch(meter)
+        if budget.calls is not None:
+            _uncount(meter)
+        _meters.reset(token)
+        meter.suspend()
+    if meter.exceeded is not None:
+        # 在两次检查之间超出预算、未被中断的计量
+        raise meter.error()
+
+def _exceeded() -> BudgetExceededError:
+    """由中断找到超出的预算：优先内层（语句）的预算"""
+    for meter in reversed(_meters.get()):
+        if meter.exceeded is not None:
+            return meter.error()
+    raise AssertionError("budget interrupt without an exceeded budget")
+
+def _check_meters():
+    """在解析线程中检查所有正在计量的预算"""
+    if _calls.meters and _calls.count > _calls.threshold:
+        _calls_exceeded()
+    for meter in _meters.get():
+        if meter.exceeded is None:
+            meter.exceeded = meter.check(True)
+        if meter.exceeded is not None:
+            # 与看门狗相同，抛出沙箱代码不会捕获的中断
+            raise _Interrupt
+
+
+class _Runtime:
+    """
+    代替收集器的运行时对象：编译后的代码在每条赋值与表达式语句结束时报告结果（见 compile_module），此时在解析线程中检查预算
+    （长时间的 C 调用期间看门狗无法获得 GIL），并重新开始语句的计量
+    """
+    __slots__ = ("_collector", "_statement", "call", "error", "Error")
+
+    def __init__(self, collector, statement: _Meter|None):
+        self._collector = collector
+        self._statement = statement
+        self.call = collector.call
+        self.error = collector.error
+        self.Error = collector.Error
+
+    def _boundary(self):
+        _check_meters()
+        statement = self._statement
+        if statement is not None:
+            _watchdog.restart(statement)
+            if statement.budget.calls is not None:
+                _restart_calls(statement)
+
+    def assign(self, names: tuple[str, ...], value):
+        self._collector.assign(names, value)
+        self._boundary()
+
+    def __setitem__(self, names: str|tuple[str, ...], value):
+        self._collector[names] = value
+        self._boundary()
+
+    def expr(self, value):
+        self._collector.expr(value)
+        self._boundary()
+
+def _restart_calls(meter: _Meter):
+    calls = _calls
+    meter.start_calls = calls.count
+    calls.threshold = min(other.start_calls + other.budget.calls for other in calls.meters)
+
+
+def parse_meter(limits: _Limits) -> _Meter|None:
+    """逐条求值（Parser.iter_parse）在各条语句之间共用的解析预算的计量"""
+    return _Meter(limits.parse, PARSE) if limits.parse is not None else None
+
+@contextmanager
+def budgeted_parse(limits: _Limits, meter: _Meter = None):
+    """
+    在解析的预算下执行配置的语句（包括它们导入的模块）；
+    meter 为此前各条语句共用的计量（见 parse_meter），用量累计，语句之间的时间不计入
+    """
+    if limits.parse is None:
+        yield
+        return
+    with _metered(meter or _Meter(limits.parse, PARSE)):
+        yield
+
+@contextmanager
+def budgeted_statements(limits: _Limits, collector):
+    """
+    在语句的预算下执行编译后的代码：产生代替收集器绑定到运行时名称的对象，它在每条语句结束时检查所有预算，
+    并为下一条语句重新开始计量
+    """
+    if limits.statement is None:
+        yield _Runtime(collector, None)
+        return
+    with _metered(_Meter(limits.statement, STATEMENT)) as meter:
+        yield _Runtime(collector, meter)
+
+@contextmanager
+def uninterruptible():
+    """
+    在此期间不中断解析线程：导入机制与解析器共享状态的临界区被异步异常打断后可能处于不一致的状态。
+    期间超出的预算在结束时抛出（最外层结束时检查）。
+    """
+    meters = _meters.get()
+    if not meters:
+        yield
+        return
+    _watchdog.shield(meters, 1)
+    try:
+        yield
+    finally:
+        _watchdog.shield(meters, -1)
+    if not meters[-1].shielded:
+        _check_meters()
+
+def budget_error(filename: str, line: int|None, source: str|None) -> BudgetExceededError:
+    """
+    将预算的中断（_Interrupt）转换为指出语句的 BudgetExceededError
+
+    :param filename, line, source: 被中断的顶层语句；line 为 None 时不指出语句。
+    """
+    error = _exceeded()
+    if line is not None:
+        error.filename, error.line, error.source = filename, line, source
+        error.args = (str(error),)
+    return error
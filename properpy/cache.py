@@ -0,0 +1,409 @@
+import hashlib
+import importlib
+import marshal
+import os
+import pickle
+import sys
+from collections import OrderedDict
+from importlib.machinery import SourceFileLoader
+from importlib.util import MAGIC_NUMBER, decode_source
+from os import PathLike
+from tempfile import NamedTemporaryFile
+from threading import Lock, RLock
+from types import CodeType, ModuleType
+from typing import Callable, Any, NamedTuple
+
+from properpy import __version__
+from properpy.parser import Parser, CompiledConfig, PROGRAM_FORMAT, module_search_paths
+
+CACHE_MAGIC = b"PPYC"
+CACHE_SUFFIX = ".ppyc"
+
+# 缓存类型：Parser 的编译产物 / 惰性求值的编译产物 / import_config 的模块字节码
+PARSE_KIND = "parse"
+LAZY_KIND = "lazy"
+MODULE_KIND = "module"
+
+
+def cache_from_source(file_path:str|PathLike[str], kind:str = PARSE_KIND)->str:
+    """
+    Returns the path of the bytecode cache file for a configuration file, in a ``__pycache__`` directory next
+    to it.
+
+    Only the final ``.py`` suffix is replaced, so the ``.proper`` part of a ``.proper.py`` file stays in the
+    cache name and ``config.py`` and ``config.proper.py`` in the same directory never share a cache file.
+    The names never collide with the ``.pyc`` files written by the import system either.
+
+    Example::
+
+        cache_from_source("conf/config.proper.py")
+        # conf/__pycache__/config.proper.cpython-313.parse.ppyc
+
+    :param file_path: The path of the configuration file.
+    :param kind: The kind of compiled code stored in the cache, ``"parse"``, ``"lazy"`` or ``"module"``. Defaults to
+                 ``"parse"``.
+    :return: The path of the cache file.
+    """
+    directory, filename = os.path.split(os.fspath(file_path))
+    stem = filename[:-len(".py")] if filename.endswith(".py") else filename
+    return os.path.join(directory, "__pycache__", f"{stem}.{sys.implementation.cache_tag}.{kind}{CACHE_SUFFIX}")
+
+def _header(source_hash:bytes)->bytes:
+    """缓存头：魔数、解释器字节码版本、编译产物格式版本、properpy 版本、源码哈希"""
+    version = __version__.encode()
+    return (CACHE_MAGIC + MAGIC_NUMBER + PROGRAM_FORMAT.to_bytes(2, "little")
+            + len(version).to_bytes(1, "little") + version + source_hash)
+
+def _write_cache(cache_path:str, data:bytes, force:bool = False):
+    """原子写入缓存文件，目录不可写时静默跳过"""
+    if sys.dont_write_bytecode and not force:
+        return
+    try:
+        directory = os.path.dirname(cache_path)
+        os.makedirs(directory, exist_ok=True)
+        with NamedTemporaryFile("wb", dir=directory, prefix=".", suffix=CACHE_SUFFIX, delete=False) as file:
+            file.write(data)
+        os.replace(file.name, cache_path)
+    except OSError:
+        pass
+
+def _load_cached(
+        file_path:str|PathLike[str],
+        kind:str,
+        compile_source:Callable[[str, str], Any],
+        dump:Callable[[Any], Any] = lambda value: value,
+        load:Callable[[Any], Any] = lambda value: value
+)->Any:
+    """读取缓存；缓存缺失、损坏或版本不符时重新编译并写回"""
+    with open(file_path, "rb") as file:
+        source_bytes = file.read()
+    header = _header(hashlib.sha256(source_bytes).digest())
+    cache_path = cache_from_source(file_path, kind)
+    try:
+        with open(cache_path, "rb") as file:
+            data = file.read()
+        if data.startswith(header):
+            return load(marshal.loads(memoryview(data)[len(header):]))
+    except (OSError, ValueError, EOFError, TypeError):
+        # 缓存损坏，回退到重新编译
+        pass
+
+    value = compile_source(decode_source(source_bytes), os.fspath(file_path))
+    try:
+        data = marshal.dumps(dump(value))
+    except ValueError:
+        # 含有无法序列化的常量，不写缓存
+        return value
+    _write_cache(cache_path, header + data)
+    return value
+
+def load_program(file_path:str|PathLike[str], parser:Parser, lazy:bool = False)->CompiledConfig:
+    """
+    Returns the compiled form of a configuration file for :meth:`Parser.parse`, reusing the bytecode cache when
+    the source is unchanged.
+
+    The cache is keyed by the hash of the source, the interpreter bytecode version and the properpy version. A
+    missing, corrupted or mismatched cache file is ignored and rewritten.
+
+    Example::
+
+        parser = Parser()
+        result = parser.parse(load_program("config.proper.py", parser))
+
+    :param file_path: The path of the configuration file.
+    :param parser: The parser used to compile the file on a cache miss.
+    :param lazy: Whether to compile for the lazy mode of :meth:`Parser.parse`, cached in a separate file. Defaults
+                 to False.
+    :return: The compiled configuration.
+    """
+    if lazy:
+        return _load_cached(file_path, LAZY_KIND, lambda source, path: parser.compile(source, path, lazy=True),
+                            dump=tuple, load=lambda data: CompiledConfig(*data))
+    return _load_cached(file_path, PARSE_KIND, parser.compile, dump=tuple, load=lambda data: CompiledConfig(*data))
+
+def load_module_code(file_path:str|PathLike[str])->CodeType:
+    """
+    Returns the module code object of a configuration file for :func:`properpy.import_config`, reusing the
+    bytecode cache when the source is unchanged.
+
+    :param file_path: The path of the configuration file.
+    :return: The compiled module code.
+    """
+    return _load_cached(file_path, MODULE_KIND,
+                        lambda source, path: compile(source, path, "exec", dont_inherit=True))
+
+class CachedConfigLoader(SourceFileLoader):
+    """
+    Source file loader whose code objects come from the properpy bytecode cache (see :func:`load_module_code`).
+    """
+    def get_code(self, fullname):
+        return load_module_code(self.path)
+
+
+class Dependency(NamedTuple):
+    """A source file the cached result depends on, with the fingerprint it had when the result was computed."""
+    path: str
+    mtime_ns: int
+    size: int
+    digest: bytes
+
+    @classmethod
+    def of(cls, path:str)->"Dependency":
+        stat = os.stat(path)
+        with open(path, "rb") as file:
+            digest = hashlib.sha256(file.read()).digest()
+        return cls(path, stat.st_mtime_ns, stat.st_size, digest)
+
+    def changed(self)->bool:
+        """mtime 与大小不变时视为未修改，否则比较内容哈希"""
+        try:
+            stat = os.stat(self.path)
+            if stat.st_mtime_ns == self.mtime_ns and stat.st_size == self.size:
+                return False
+            with open(self.path, "rb") as file:
+                return hashlib.sha256(file.read()).digest() != self.digest
+        except OSError:
+            return True
+
+class CacheStats(NamedTuple):
+    """Statistics of a :class:`ResultCache`."""
+    hits: int
+    misses: int
+    disk_hits: int
+    evictions: int
+    invalidations: int
+    entries: int
+    bytes: int
+
+class _Entry(NamedTuple):
+    payload: bytes
+    dependencies: tuple[Dependency, ...]
+
+def result_key(source:bytes, parser:Parser, compact:bool = False, validate:str = None, intern:bool = False)->str:
+    """
+    Computes the key of a parse result: the source content, the module whitelist, the module search paths, the
+    node representation, the validation mode, the interning of results and the properpy version. Registered
+    variables are identified by name only.
+
+    :param source: The source code of the configuration.
+    :param parser: The parser that parses the configuration.
+    :param compact: Whether the result holds compact nodes (see :func:`properpy.node.compact_nodes`). Defaults to False.
+    :param validate: The validation mode of the parse (see :func:`properpy.parse_config`). Defaults to None.
+    :param intern: Whether the results are interned (see :func:`properpy.interning.intern_nodes`). Defaults to False.
+    :return: A hexadecimal key.
+    """
+    digest = hashlib.sha256(source)
+    module_paths = [os.path.abspath(path) for path in parser.module_paths]
+    parts = (__version__, sorted(parser.module_registry), module_paths, sorted(parser.function_registry), compact,
+             validate)
+    if intern:
+        # 不去重时键保持不变，已有的缓存仍然有效
+        parts += (intern,)
+    for part in parts:
+        digest.update(b"\0" + repr(part).encode())
+    return digest.hexdigest()
+
+def module_dependencies(modules:dict[str, ModuleType])->tuple[Dependency, ...]:
+    """
+    Fingerprints the source files of the given modules, skipping modules that are not backed by a file.
+
+    :param modules: A dictionary mapping module names to modules, as returned by
+                    :meth:`Parser.parse_with_dependencies`.
+    :return: A tuple of dependencies.
+    """
+    dependencies = []
+    for module in modules.values():
+        path = getattr(module, "__file__", None)
+        if path and os.path.isfile(path):
+            dependencies.append(Dependency.of(path))
+    return tuple(dependencies)
+
+# 本进程中解析用到的模块文件 -> (模块名, 首次记录时的指纹，即已加载的源码)
+_loaded_modules: dict[str, tuple[str, Dependency]] = {}
+_loaded_lock = Lock()
+
+def track_modules(modules:dict[str, ModuleType], dependencies:tuple[Dependency, ...])->tuple[Dependency, ...]:
+    """
+    Records the fingerprints of the modules a parse used, so that :func:`reload_changed_modules` can reload them
+    once their source changes.
+
+    :param modules: A dictionary mapping module names to modules, as returned by
+                    :meth:`Parser.parse_with_dependencies`.
+    :param dependencies: Their fingerprints, as returned by :func:`module_dependencies`.
+    :return: The fingerprints of the sources that were loaded, recorded when a parse first used each module. A
+             module changed on disk but not reloaded keeps its old fingerprint, so a result computed from it is
+             seen as outdated.
+    """
+    names = {getattr(module, "__file__", None): name for name, module in modules.items()}
+    with _loaded_lock:
+        return tuple(_loaded_modules.setdefault(dependency.path, (names[dependency.path], dependency))[1]
+                     for dependency in dependencies)
+
+def reload_changed_modules(module_paths)->bool:
+    """
+    Reloads the modules recorded by :func:`track_modules` whose source changed, so that a result invalidated by the
+    change is not computed again from the old module. A module that fails to reload is removed from
+    ``sys.modules`` and imported again by the next parse, which reports the error.
+
+    Reloading replaces the module in ``sys.modules`` for the whole process: classes and objects the application
+    got from the old module are no longer the ones the module defines. It is only done for a
+    :class:`ResultCache` created with ``reload_modules=True``.
+
+    :param module_paths: The additional module search paths of the parser.
+    :return: Whether a module was reloaded. Names already loaded into parsers from the old modules must then be
+             forgotten.
+    """
+    with _loaded_lock:
+        changed = [name for name, dependency in _loaded_modules.values() if dependency.changed()]
+        if not changed:
+            return False
+        with module_search_paths(module_paths or ()):
+            for name in changed:
+                module = sys.modules.get(name)
+                if module is not None:
+                    try:
+                        importlib.reload(module)
+                    except Exception:
+                        sys.modules.pop(name, None)
+        for path in [path for path, (name, _) in _loaded_modules.items() if name in changed]:
+            del _loaded_modules[path]
+        return True
+
+class ResultCache:
+    """
+    Size-bounded LRU cache of parse results, with an optional directory as a second tier shared between processes.
+
+    A cached result stays valid as long as every schema or helper module imported while computing it is unchanged
+    (see :class:`Dependency`). Results are stored pickled, so every hit returns a fresh copy that the caller may
+    modify freely, and results that cannot be pickled are not cached.
+
+    A module changed on disk stays loaded as it is, as for any import: results depending on it are parsed again
+    from the loaded module and not cached until the process restarts. With ``reload_modules``, changed modules are
+    reloaded with :func:`importlib.reload` before parsing again, which suits a process dedicated to parsing (such
+    as ``properpy serve``) but replaces the modules the rest of the application may hold references to.
+
+    Note that a hit does not execute the configuration, so receivers of ``config_wrapper`` are not called.
+
+    Example::
+
+        cache = ResultCache(maxsize=256, directory=".properpy_cache")
+        result = parse_config("config.proper.py", ["config_schema"], cache=cache)
+        result = parse_config("config.proper.py", ["config_schema"], cache=cache)  # 命中缓存
+        print(cache.stats)
+
+    :param maxsize: The maximum number of results kept in memory. Defaults to 128.
+    :param max_bytes: The maximum total size in bytes of the pickled results kept in memory. Defaults to None (no limit).
+    :param directory: A directory in which results are also stored on disk. Defaults to None (memory only). The
+                      entries are unpickled when read, and unpickling can execute arbitrary code: the directory
+                      must only be writable by trusted users.
+    :param reload_modules: Whether to reload the changed modules a result depends on before parsing it again.
+                           Defaults to False.
+    """
+    def __init__(self, maxsize:int = 128, max_bytes:int = None, directory:str|PathLike[str] = None,
+                 reload_modules:bool = False):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.directory = os.fspath(directory) if directory is not None else None
+        self.reload_modules = reload_modules
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._lock = RLock()
+        self._hits = self._misses = self._disk_hits = self._evictions = self._invalidations = 0
+
+    @property
+    def stats(self)->CacheStats:
+        with self._lock:
+            return CacheStats(self._hits, self._misses, self._disk_hits, self._evictions, self._invalidations,
+                              len(self._entries), self._bytes)
+
+    def get(self, key:str, default:Any = None)->Any:
+        """
+        Returns a copy of the cached result for ``key``, or ``default`` when it is missing or outdated.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        disk_hit = False
+        if entry is None:
+            entry = self._read_disk(key)
+            disk_hit = entry is not None
+
+        if entry is not None and any(dependency.changed() for dependency in entry.dependencies):
+            self.discard(key)
+            with self._lock:
+                self._invalidations += 1
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self._misses += 1
+                return default
+            self._hits += 1
+            if disk_hit:
+                self._disk_hits += 1
+                self._store(key, entry)
+        return pickle.loads(entry.payload)
+
+    def put(self, key:str, result:Any, dependencies:tuple[Dependency, ...] = ()):
+        """
+        Stores a result together with the dependencies it was computed from. A result whose dependencies already
+        changed, e.g. computed from a module that changed on disk but was not reloaded, is not stored.
+        """
+        if any(dependency.changed() for dependency in dependencies):
+            return
+        try:
+            payload = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            # 无法序列化的结果不缓存
+            return
+        entry = _Entry(payload, tuple(dependencies))
+        with self._lock:
+            self._store(key, entry)
+        if self.directory is not None:
+            _write_cache(self._disk_path(key), pickle.dumps(entry, pickle.HIGHEST_PROTOCOL), force=True)
+
+    def discard(self, key:str):
+        """Removes the result for ``key`` from memory and disk."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= len(entry.payload)
+        if self.directory is not None:
+            try:
+                os.remove(self._disk_path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        """Removes every result kept in memory. Results on disk are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _store(self, key:str, entry:_Entry):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old.payload)
+        self._entries[key] = entry
+        self._bytes += len(entry.payload)
+        # 按 LRU 顺序淘汰，直到满足条目数与字节数限制
+        while self._entries and (len(self._entries) > self.maxsize
+                                 or (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted.payload)
+            self._evictions += 1
+
+    def _disk_path(self, key:str)->str:
+        return os.path.join(self.directory, f"{key}.pickle")
+
+    def _read_disk(self, key:str)->_Entry|None:
+        if self.directory is None:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as file:
+                entry = pickle.load(file)
+            return entry if isinstance(entry, _Entry) else None
+        except Exception:
+            # 缺失或损坏
+            return None
@@ -0,0 +1,499 @@
+import ast
+import dis
+import gc
+from contextlib import contextmanager
+from types import CodeType
+from typing import NamedTuple, Any
+
+# 编译后代码中使用的保留名称
+RUNTIME_NAME = "__properpy__"
+_VALUE_NAME = "__properpy_value__"
+_ERROR_NAME = "__properpy_error__"
+_FUNC_NAME = "__properpy_func__"
+RESERVED_NAMES = frozenset({RUNTIME_NAME, _VALUE_NAME, _ERROR_NAME})
+
+# 读取全局名称的指令与其参数中名称序号的位移（LOAD_GLOBAL 的最低位另有用途）
+_NAME_LOADS = ((dis.opmap["LOAD_NAME"], 0), (dis.opmap["LOAD_GLOBAL"], 1))
+
+
+class Collector:
+    """
+    Runtime object of a compiled configuration. The compiled module reports the result of every top-level
+    assignment and expression to it, and it collects them into the children and attributes of the result.
+    """
+    Error = Exception
+
+    def __init__(self):
+        self.children = []
+        self.attributes = {}
+
+    def __setitem__(self, names: str|tuple[str, ...], value):
+        # 编译后的赋值语句：__properpy__[<name>] = <value>，多个目标时为名称的元组
+        self.assign((names,) if type(names) is str else names, value)
+
+    def assign(self, names: tuple[str, ...], value):
+        for name in names:
+            self.attributes[name] = value
+
+    def expr(self, value):
+        if isinstance(value, dict):
+            if 'tag' in value:
+                self.children.append(value)
+            else:
+                self.attributes.update(value)
+        elif value is not None:
+            self.children.append(value)
+
+    @staticmethod
+    def call(func, thunk):
+        """
+        惰性求值中的函数调用（见 compile_module 的 lazy 参数）：组件通过其 _defer 返回惰性节点，
+        其余函数立即调用。thunk 以被调用的函数为第一个参数，求值参数并完成调用。
+        """
+        defer = getattr(func, "_defer", None)
+        if defer is None:
+            return thunk(func)
+        return defer(thunk)
+
+    @staticmethod
+    def error(e: Exception) -> str:
+        return f"<Evaluation Error: {str(e)}>"
+
+    def result(self) -> dict:
+        return {
+            'children': self.children,
+            **self.attributes
+        }
+
+
+class ParseEvent(NamedTuple):
+    """
+    An item of the parse result, produced by :meth:`Parser.iter_parse` as soon as its statement is evaluated.
+
+    - kind: ``"assign"`` for an assignment, ``"attribute"`` for a key of a dictionary expression (e.g. ``attrs(...)``)
+      and ``"child"`` for any other expression, e.g. a component.
+    - name: The assigned name or the attribute key, None for a child.
+    - value: The value, or an ``"<Evaluation Error: ...>"`` string.
+    """
+    kind: str
+    name: str|None
+    value: Any
+
+class EventCollector(Collector):
+    """Collector that turns every value into :class:`ParseEvent` objects instead of keeping the result."""
+    def __init__(self):
+        super().__init__()
+        self.events: list[ParseEvent] = []
+
+    def assign(self, names: tuple[str, ...], value):
+        for name in names:
+            self.events.append(ParseEvent("assign", name, value))
+
+    def expr(self, value):
+        if isinstance(value, dict) and 'tag' not in value:
+            self.events.extend(ParseEvent("attribute", key, item) for key, item in value.items())
+        elif value is not None:
+            self.events.append(ParseEvent("child", None, value))
+
+    def drain(self) -> list[ParseEvent]:
+        """取出并清空已产生的事件"""
+        events, self.events = self.events, []
+        return events
+
+
+def compile_module(tree: ast.Module, filename: str, lazy: bool = False) -> CodeType:
+    """
+    Compiles the top-level statements of a configuration into a single code object.
+
+    Imports are kept as they are, the value of every assignment and expression statement is reported to the
+    :class:`Collector` bound to ``__properpy__`` (``__properpy__[<names>] = <value>`` and
+    ``__properpy__.expr(<value>)``), and other statements are dropped. Like the former per-statement
+    evaluation, assignments only report their value and bind nothing: every statement reads the names of the
+    sandbox, not the names assigned by earlier statements. Only the values are wrapped, the nodes inside them are
+    reused as they are. Evaluation is optimistic: values are not wrapped in ``try``/``except`` (which would make
+    compiling a large file several times slower), and when a value raises, :func:`resume` records the error and
+    evaluates the remaining statements in guarded form.
+
+    With ``lazy``, every call in a value (and in the arguments, lists, tuples and dictionaries of such calls, but
+    not inside lambdas or comprehensions) is compiled to ``__properpy__.call(<function>, <thunk>)``: the function
+    is evaluated at once, and the thunk, which binds the names the arguments read to their current values, calls it
+    with the arguments later. Components return a :class:`properpy.lazy.LazyNode` instead of calling the thunk
+    (see :meth:`Collector.call`).
+
+    :param tree: The parsed module.
+    :param filename: The file name used in tracebacks.
+    :param lazy: Whether to compile calls to deferred calls. Defaults to False.
+    :return: The module code object, to be executed with a :class:`Collector` in its globals.
+    """
+    with paused_gc():
+        try:
+            return _compile_statements(_Rewriter(False, lazy).rewrite(tree.body), filename)
+        except SyntaxError:
+            return compile_guarded(tree.body, filename, lazy)
+
+def compile_guarded(statements: list[ast.stmt], filename: str, lazy: bool = False) -> CodeType:
+    """
+    Compiles top-level statements so that every assignment and expression statement evaluates its value inside
+    ``try``/``except`` and reports a failing value as an ``"<Evaluation Error: ...>"`` string.
+
+    :param statements: The top-level statements.
+    :param filename: The file name used in tracebacks.
+    :param lazy: Whether to compile calls to deferred calls (see :func:`compile_module`). Defaults to False.
+    :return: The module code object, to be executed with a :class:`Collector` in its globals.
+    """
+    rewriter = _Rewriter(True, lazy)
+    groups = [_Group(node, rewriter.visit(node)) for node in statements]
+    try:
+        return _compile_groups(groups, filename)
+    except SyntaxError:
+        # 个别语句无法编译（如模块级的 yield/await），仅将这些语句替换为错误结果
+        checked = []
+        for group in groups:
+            error = _compile_error(group, filename)
+            checked.append(group if error is None else _rewrite_error(group.node, error))
+        return _compile_groups(checked, filename)
+
+def compile_statement(node: ast.stmt, filename: str, lazy: bool = False) -> CodeType:
+    """
+    Compiles a single top-level statement the same way as :func:`compile_module` compiles a whole module. When
+    its value raises, report the error with :func:`record_error`.
+
+    :param node: The top-level statement.
+    :param filename: The file name used in tracebacks.
+    :param lazy: Whether to compile calls to deferred calls (see :func:`compile_module`). Defaults to False.
+    :return: The code object, to be executed with a :class:`Collector` in its globals.
+    """
+    try:
+        return _compile_statements(_Rewriter(False, lazy).visit(node), filename)
+    except SyntaxError:
+        return compile_guarded([node], filename, lazy)
+
+def record_error(node: ast.stmt, collector: Collector, error: Exception):
+    """
+    Reports a top-level statement whose value raised ``error``: the error string is reported to the collector as
+    the value of the statement. Errors raised by imports are not recoverable and are raised again.
+
+    :param node: The failing statement.
+    :param collector: The collector of the evaluation.
+    :param error: The error raised by the statement.
+    """
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        raise error
+    message = collector.error(error)
+    if isinstance(node, ast.Assign):
+        collector.assign(_assigned_names(node), message)
+    else:
+        collector.expr(message)
+
+def loaded_names(code: CodeType) -> set[str]:
+    """
+    Collects the global names a code object compiled by :func:`compile_module` reads: the names loaded by the
+    module code and the global names loaded by the lambdas and comprehensions in it. The bytecode is scanned
+    directly, so the source does not have to be analysed again.
+
+    :param code: The code object.
+    :return: A set of names, including the names bound by imports and the reserved names of the compiled code.
+    """
+    names = set()
+    codes = [code]
+    while codes:
+        code = codes.pop()
+        codes.extend(const for const in code.co_consts if isinstance(const, CodeType))
+        # 每条指令占两个字节（操作码、参数），内联缓存的操作码为 0；参数超过 255 时由前面的 EXTENDED_ARG 补充高位
+        operations, arguments = code.co_code[::2], code.co_code[1::2]
+        for operation, shift in _NAME_LOADS:
+            index = operations.find(operation)
+            while index != -1:
+                argument, prefix = arguments[index], index - 1
+                while prefix >= 0 and operations[prefix] == dis.EXTENDED_ARG:
+                    argument |= arguments[prefix] << 8 * (index - prefix)
+                    prefix -= 1
+                names.add(code.co_names[argument >> shift])
+                index = operations.find(operation, index + 1)
+    return names
+
+@contextmanager
+def paused_gc():
+    """
+    Pauses the cyclic garbage collector while building and compiling a large syntax tree: every node created
+    triggers collections that traverse the whole tree again, which costs more than the compilation itself. Syntax
+    trees have no reference cycles, so nothing is left for the collector to reclaim.
+    """
+    if not gc.isenabled():
+        yield
+        return
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
+
+def resume(code: CodeType, source: str, filename: str, namespace: dict, collector: Collector, error: Exception,
+           lazy: bool = False):
+    """
+    Continues an optimistic evaluation of ``code`` (see :func:`compile_module`) that raised ``error``: the failing
+    statement is reported as an error and the statements after it are evaluated in guarded form. Errors raised by
+    imports are not recoverable and are raised again.
+
+    :param code: The code object that raised the error.
+    :param source: The source code it was compiled from.
+    :param filename: The file name used in tracebacks.
+    :param namespace: The namespace of the evaluation.
+    :param collector: The collector of the evaluation.
+    :param error: The error raised by the evaluation.
+    :param lazy: Whether ``code`` was compiled with deferred calls (see :func:`compile_module`). Defaults to False.
+    """
+    statements = ast.parse(source, filename).body
+    index = _failed_statement(statements, code, error.__traceback__)
+    if index is None:
+        raise error
+    record_error(statements[index], collector, error)
+    exec(compile_guarded(statements[index + 1:], filename, lazy), namespace)
+
+def _failed_statement(statements: list[ast.stmt], code: CodeType, traceback) -> int|None:
+    """根据异常发生时所执行指令的位置，找到出错的顶层语句"""
+    position = None
+    while traceback is not None:
+        if traceback.tb_frame.f_code is code:
+            for index, instruction in enumerate(code.co_positions()):
+                if index == traceback.tb_lasti // 2:
+                    position = instruction
+                    break
+        traceback = traceback.tb_next
+    if position is None or position[0] is None:
+        return None
+
+    line, _, column, _ = position
+    for index, node in enumerate(statements):
+        start = (node.lineno, node.col_offset)
+        end = (node.end_lineno, node.end_col_offset)
+        if start <= (line, column if column is not None else node.col_offset) <= end:
+            return index
+    return None
+
+
+class _Group(list):
+    """一条原始语句改写后得到的语句列表"""
+    def __init__(self, node: ast.stmt, statements: list[ast.stmt]):
+        super().__init__(statements)
+        self.node = node
+
+
+def _compile_statements(statements: list[ast.stmt], filename: str) -> CodeType:
+    return compile(ast.Module(body=statements, type_ignores=[]), filename, "exec", dont_inherit=True)
+
+def _compile_groups(groups: list[_Group], filename: str) -> CodeType:
+    return _compile_statements([statement for group in groups for statement in group], filename)
+
+def _compile_error(group: _Group, filename: str) -> SyntaxError|None:
+    try:
+        _compile_groups([group], filename)
+    except SyntaxError as e:
+        return e
+    return None
+
+
+_LOAD = ast.Load()
+_STORE = ast.Store()
+
+def _at(node_type: type, location: ast.AST, **fields) -> ast.AST:
+    """
+    创建使用 location 位置信息的新节点。
+    直接填充节点的 __dict__，比通过构造函数的关键字参数逐个设置属性快约三倍；
+    fields 须给出全部必需字段，省略的可选字段取节点类上的默认值 None。
+    """
+    position = location.__dict__
+    fields["lineno"] = position["lineno"]
+    fields["col_offset"] = position["col_offset"]
+    fields["end_lineno"] = position["end_lineno"]
+    fields["end_col_offset"] = position["end_col_offset"]
+    node = node_type.__new__(node_type)
+    node.__dict__ = fields
+    return node
+
+def _shared_nodes() -> dict[str, ast.AST]:
+    """
+    各语句改写后相同的部分只创建一次，由所有语句共享。
+    逐节点创建（或对整棵树调用 ast.fix_missing_locations）在大文件上比编译本身还慢。
+    """
+    origin = ast.Pass(lineno=1, col_offset=0, end_lineno=1, end_col_offset=0)
+    def name(id: str, ctx: ast.expr_context = _LOAD) -> ast.Name:
+        return _at(ast.Name, origin, id=id, ctx=ctx)
+    def runtime(attr: str) -> ast.Attribute:
+        return _at(ast.Attribute, origin, value=name(RUNTIME_NAME), attr=attr, ctx=_LOAD)
+
+    return {
+        "runtime": name(RUNTIME_NAME),
+        "value": name(_VALUE_NAME),
+        "value_targets": [name(_VALUE_NAME, _STORE)],
+        "expr": runtime("expr"),
+        # except __properpy__.Error as __properpy_error__:
+        #     __properpy_value__ = __properpy__.error(__properpy_error__)
+        "handlers": [_at(
+            ast.ExceptHandler, origin,
+            type=runtime("Error"),
+            name=_ERROR_NAME,
+            body=[_at(ast.Assign, origin, targets=[name(_VALUE_NAME, _STORE)], value=_at(
+                ast.Call, origin, func=runtime("error"), args=[name(_ERROR_NAME)], keywords=[]
+            ))]
+        )],
+    }
+
+_SHARED = _shared_nodes()
+
+def _guarded_value(node: ast.stmt, value: ast.expr) -> ast.Try:
+    """
+    try:
+        __properpy_value__ = <value>
+    except __properpy__.Error as __properpy_error__:
+        __properpy_value__ = __properpy__.error(__properpy_error__)
+    """
+    return _at(ast.Try, node, body=[_at(ast.Assign, value, targets=_SHARED["value_targets"], value=value)],
+               handlers=_SHARED["handlers"], orelse=[], finalbody=[])
+
+def _record(node: ast.stmt, value: ast.expr) -> ast.Expr:
+    """__properpy__.expr(<value>)"""
+    return _at(ast.Expr, node, value=_at(ast.Call, node, func=_SHARED["expr"], args=[value], keywords=[]))
+
+def _assigned_names(node: ast.Assign) -> tuple[str, ...]:
+    """赋值语句报告的名称：解包、属性、下标等目标不计入结果"""
+    return tuple(target.id for target in node.targets if isinstance(target, ast.Name))
+
+def _record_assign(node: ast.Assign, value: ast.expr) -> ast.Assign:
+    """
+    __properpy__[<name>] = <value>，多个目标时为 __properpy__[(<names>)] = <value>
+    赋值目标改为对运行时对象的下标赋值（Collector.__setitem__），比调用 __properpy__.assign 编译得更快；
+    常见的单个名称以字符串为键，比元组常量编译得更快。
+    """
+    targets = node.targets
+    if len(targets) == 1 and type(targets[0]) is ast.Name:
+        names = _at(ast.Constant, node, value=targets[0].id)
+    else:
+        names = _at(ast.Constant, node, value=_assigned_names(node))
+    return _at(ast.Assign, node, targets=[_at(ast.Subscript, node, value=_SHARED["runtime"], slice=names, ctx=_STORE)],
+               value=value)
+
+class _Rewriter(ast.NodeVisitor):
+    """
+    改写顶层语句：只把语句的值交给运行时对象，值内部的节点原样复用，既不遍历也不重建；原语句不被修改。
+    guarded 为真时，值在 try/except 中求值，出错时报告错误字符串。
+    """
+    def __init__(self, guarded: bool, lazy: bool):
+        self.guarded = guarded
+        self.lazy = lazy
+
+    def rewrite(self, statements: list[ast.stmt]) -> list[ast.stmt]:
+        return [statement for node in statements for statement in self.visit(node)]
+
+    def visit_Import(self, node: ast.Import|ast.ImportFrom) -> list[ast.stmt]:
+        return [node]
+
+    visit_ImportFrom = visit_Import
+
+    def visit_Assign(self, node: ast.Assign) -> list[ast.stmt]:
+        if not self.guarded:
+            return [_record_assign(node, self._value(node))]
+        return [_guarded_value(node, self._value(node)), _record_assign(node, _SHARED["value"])]
+
+    def visit_Expr(self, node: ast.Expr) -> list[ast.stmt]:
+        if not self.guarded:
+            return [_record(node, self._value(node))]
+        return [_guarded_value(node, self._value(node)), _record(node, _SHARED["value"])]
+
+    def generic_visit(self, node: ast.AST) -> list[ast.stmt]:
+        # 其余语句（函数、类定义、控制流等）不求值
+        return []
+
+    def _value(self, node: ast.Assign|ast.Expr) -> ast.expr:
+        return _defer_value(node.value) if self.lazy else node.value
+
+def _rewrite_error(node: ast.stmt, e: SyntaxError) -> _Group:
+    """无法编译的语句：直接报告错误结果"""
+    message = _at(ast.Constant, node, value=Collector.error(e))
+    if isinstance(node, ast.Assign):
+        return _Group(node, [_record_assign(node, message)])
+    return _Group(node, [_record(node, message)])
+
+
+# 延迟调用的参数中出现这些节点时，放入 lambda 会改变语义（绑定到 lambda 的局部变量、读取 lambda 的局部变量）
+_EAGER_NODES = (ast.NamedExpr, ast.Await, ast.Yield, ast.YieldFrom)
+_EAGER_NAMES = frozenset({"locals", "vars"})
+
+class _Deferred(NamedTuple):
+    """改写后的表达式，以及它读取与绑定（推导式变量、lambda 参数）的名称"""
+    value: ast.expr
+    loaded: frozenset[str]
+    bound: frozenset[str]
+    eager: bool  # 含有不能放入 lambda 的节点，整个值保持立即求值
+
+def _defer_value(value: ast.expr) -> ast.expr:
+    """
+    惰性求值：将值中的调用改写为 __properpy__.call(<func>, lambda __properpy_func__, <names>=<names>: ...)。
+    只改写值本身、调用参数与列表、元组、集合、字典中的调用；lambda 与推导式中的调用在外层调用求值时照常执行。
+    """
+    deferred = _defer_calls(value)
+    return value if deferred.eager else deferred.value
+
+def _defer_calls(value: ast.expr) -> _Deferred:
+    """自底向上改写，每个节点只遍历一次"""
+    if isinstance(value, ast.Call):
+        parts = [_defer_calls(argument) for argument in value.args]
+        keywords = [_defer_calls(keyword.value) for keyword in value.keywords]
+        function = _scan(value.func)
+        loaded, bound, eager = _merge(parts + keywords)
+        if eager or function.eager:
+            return _Deferred(value, loaded | function.loaded, bound | function.bound, True)
+        # 参数读取的名称作为 lambda 的默认值，在语句执行时绑定，与立即求值时读取到的值相同
+        names = sorted(loaded - bound - {RUNTIME_NAME})
+        body = _at(ast.Call, value, func=_at(ast.Name, value, id=_FUNC_NAME, ctx=_LOAD),
+                   args=[part.value for part in parts],
+                   keywords=[_at(ast.keyword, keyword, arg=keyword.arg, value=part.value)
+                             for keyword, part in zip(value.keywords, keywords)])
+        parameters = ast.arguments(posonlyargs=[], vararg=None, kwonlyargs=[], kw_defaults=[], kwarg=None,
+                                   args=[_at(ast.arg, value, arg=name) for name in (_FUNC_NAME, *names)],
+                                   defaults=[_at(ast.Name, value, id=name, ctx=_LOAD) for name in names])
+        thunk = _at(ast.Lambda, value, args=parameters, body=body)
+        call = _at(ast.Call, value, func=_at(ast.Attribute, value, value=_at(ast.Name, value, id=RUNTIME_NAME,
+                                                                             ctx=_LOAD), attr="call", ctx=_LOAD),
+                   args=[value.func, thunk], keywords=[])
+        return _Deferred(call, frozenset(names) | function.loaded, function.bound, False)
+    if isinstance(value, (ast.List, ast.Tuple, ast.Set)):
+        parts = [_defer_calls(item) for item in value.elts]
+        loaded, bound, eager = _merge(parts)
+        fields = {**dict(ast.iter_fields(value)), "elts": [part.value for part in parts]}
+        return _Deferred(value if eager else _at(type(value), value, **fields), loaded, bound, eager)
+    if isinstance(value, ast.Dict):
+        parts = [_defer_calls(item) for item in value.values]
+        keys = [_scan(key) for key in value.keys if key is not None]
+        loaded, bound, eager = _merge(parts + keys)
+        new = _at(ast.Dict, value, keys=value.keys, values=[part.value for part in parts])
+        return _Deferred(value if eager else new, loaded, bound, eager)
+    if isinstance(value, ast.Starred):
+        part = _defer_calls(value.value)
+        new = _at(ast.Starred, value, value=part.value, ctx=value.ctx)
+        return part._replace(value=value if part.eager else new)
+    return _scan(value)
+
+def _scan(value: ast.expr) -> _Deferred:
+    """不改写的表达式：遍历得到它读取与绑定的名称"""
+    loaded, bound = set(), set()
+    eager = False
+    for child in ast.walk(value):
+        if isinstance(child, ast.Name):
+            if isinstance(child.ctx, ast.Load):
+                loaded.add(child.id)
+                eager = eager or child.id in _EAGER_NAMES
+            else:
+                bound.add(child.id)
+        elif isinstance(child, ast.arg):
+            bound.add(child.arg)
+        elif isinstance(child, _EAGER_NODES):
+            eager = True
+    return _Deferred(value, frozenset(loaded), frozenset(bound), eager)
+
+def _merge(parts: list[_Deferred]) -> tuple[frozenset[str], frozenset[str], bool]:
+    loaded, bound = set(), set()
+    for part in parts:
+        loaded |= part.loaded
+        bound |= part.bound
+    return frozenset(loaded), frozenset(bound), any(part.eager for part in parts)
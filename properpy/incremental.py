@@ -0,0 +1,156 @@
+import ast
+from difflib import SequenceMatcher
+from typing import Any, NamedTuple
+
+from properpy.compiler import EventCollector, ParseEvent, RUNTIME_NAME
+from properpy.parser import Parser, ParseContext, _DYNAMIC_NAMES
+
+
+class _Statement(NamedTuple):
+    """一条顶层语句上次求值的结果：读取与绑定的名称、绑定的值、产生的事件"""
+    key: str
+    reads: frozenset[str]
+    late_reads: frozenset[str]  # lambda、生成器表达式中读取的名称，在之后被调用时才读取
+    writes: frozenset[str]
+    bindings: dict[str, Any]
+    events: list[ParseEvent]
+
+def _key(node: ast.stmt, lines: list[str]) -> str:
+    """语句所在的源码行与列范围：源码相同的语句才被视为未改变（比 ast.dump 快得多）"""
+    return f"{node.col_offset}:{node.end_col_offset}:" + "".join(lines[node.lineno - 1:node.end_lineno])
+
+def _scan(node: ast.stmt) -> tuple[frozenset[str], frozenset[str], frozenset[str]]:
+    """静态得到语句读取的名称、延迟读取的名称与绑定的名称（顶层赋值不绑定名称，见 compile_module）"""
+    reads, late_reads, writes = set(), set(), set()
+    for child in ast.walk(node.value if isinstance(node, ast.Assign) else node):
+        if isinstance(child, ast.Name):
+            (reads if isinstance(child.ctx, ast.Load) else writes).add(child.id)
+        elif isinstance(child, (ast.Lambda, ast.GeneratorExp)):
+            late_reads.update(name.id for name in ast.walk(child)
+                              if isinstance(name, ast.Name) and isinstance(name.ctx, ast.Load))
+        elif isinstance(child, (ast.Import, ast.ImportFrom)):
+            # 导入绑定的名称：import a.b 绑定 a
+            writes.update(alias.asname or alias.name.split(".")[0] for alias in child.names)
+    return frozenset(reads), frozenset(late_reads), frozenset(writes)
+
+
+class IncrementalParser:
+    """
+    Parses successive versions of a configuration, re-evaluating only the top-level statements that changed and
+    the statements that depend on them.
+
+    Statements are matched in order with the previous version by their source, so inserting lines above a
+    statement does not change it. A statement is evaluated again when it is new or changed, or when it reads a name
+    bound by a statement evaluated again before it or by a statement that was removed; the other statements reuse
+    the values they bound and the items they added to the result last time. Imports are always executed again. When a re-evaluated statement binds a name
+    read inside a lambda or generator expression, or when the code uses ``globals()``, ``eval()`` and the like or
+    ``from ... import *``, every statement is evaluated again.
+
+    Reused values are shared with the previous result, so statements should not mutate values bound by other
+    statements, and receivers of ``config_wrapper`` are only called for the statements evaluated again.
+
+    Example::
+
+        incremental = IncrementalParser(parser)
+        result = incremental.parse(code)
+        result = incremental.parse(edited_code)  # only evaluates what the edit affects
+        print(incremental.evaluated)
+
+    :param parser: The parser evaluating the statements. Defaults to a new :class:`Parser`.
+    """
+    def __init__(self, parser: Parser = None):
+        self.parser = parser or Parser()
+        self.evaluated: list[int] = []  # 上次解析中重新求值的语句序号
+        self._statements: list[_Statement] = []
+        # 各版本共用同一个命名空间对象：沿用的 lambda 以它为全局命名空间
+        self._namespace: dict = {}
+
+    def reset(self):
+        """Forgets the previous version, so that the next parse evaluates every statement."""
+        self._statements = []
+
+    def parse(self, code: str, filename: str = "<string>") -> dict:
+        """
+        Parses a new version of the configuration, with the same result as :meth:`Parser.parse`.
+
+        :param code: The Python code string to be parsed.
+        :param filename: The file name used in tracebacks of evaluation errors. Defaults to "<string>".
+        :return: A dictionary representing the parsed structure of the code.
+        """
+        nodes = ast.parse(code, filename).body
+        lines = code.splitlines(keepends=True)
+        keys = [_key(node, lines) for node in nodes]
+        previous, removed = self._reusable(keys)
+        scans = [(reused.reads, reused.late_reads, reused.writes) if reused is not None else _scan(node)
+                 for node, reused in zip(nodes, previous)]
+        if any(_DYNAMIC_NAMES & reads or "*" in writes for reads, _, writes in scans):
+            previous = [None] * len(nodes)
+
+        statements, evaluated = self._evaluate(nodes, keys, scans, previous, removed, filename)
+        late_reads = frozenset().union(*(late for _, late, _ in scans))
+        if len(evaluated) < len(nodes) and (late_reads & removed
+                                            or any(late_reads & statements[index].writes for index in evaluated)):
+            # 延迟读取的名称被重新绑定：无法静态得知哪些语句依赖它，全部重新求值
+            statements, evaluated = self._evaluate(nodes, keys, scans, [None] * len(nodes), set(), filename)
+
+        self._statements = statements
+        self.evaluated = evaluated
+        collector = EventCollector()
+        for statement in statements:
+            for kind, name, value in statement.events:
+                if kind == "child":
+                    collector.children.append(value)
+                else:
+                    collector.attributes[name] = value
+        return collector.result()
+
+    def _reusable(self, keys: list[str]) -> tuple[list[_Statement|None], set[str]]:
+        """
+        将新版本的语句与上一版本中语法树相同的语句按顺序对应起来，
+        并返回上一版本中未被对应（删除或修改）的语句绑定的名称。
+        """
+        previous: list[_Statement|None] = [None] * len(keys)
+        matched = set()
+        old_keys = [statement.key for statement in self._statements]
+        matcher = SequenceMatcher(None, old_keys, keys, autojunk=False)
+        for old_start, new_start, size in matcher.get_matching_blocks():
+            for offset in range(size):
+                previous[new_start + offset] = self._statements[old_start + offset]
+                matched.add(old_start + offset)
+        removed = set()
+        for index, statement in enumerate(self._statements):
+            if index not in matched:
+                removed |= statement.writes
+        return previous, removed
+
+    def _evaluate(self, nodes, keys, scans, previous, removed, filename) -> tuple[list[_Statement], list[int]]:
+        namespace = self._namespace
+        namespace.clear()
+        namespace.update(self.parser._new_namespace())
+        collector = EventCollector()
+        namespace[RUNTIME_NAME] = collector
+        context = ParseContext()
+        dirty = set(removed)  # 被重新求值或删除的语句绑定的名称
+        statements = []
+        evaluated = []
+        for index, node in enumerate(nodes):
+            reads, late_reads, writes = scans[index]
+            reused = previous[index]
+            is_import = isinstance(node, (ast.Import, ast.ImportFrom))
+            if reused is not None and not is_import and dirty.isdisjoint(reads):
+                namespace.update(reused.bindings)
+                dirty -= writes
+                statements.append(reused)
+                continue
+
+            # 按需加载：只加载重新求值的语句引用的名称
+            names = reads | late_reads
+            base = self.parser._warm_names(names)
+            namespace.update((name, base[name]) for name in names - namespace.keys() if name in base)
+            self.parser._execute_statement(node, filename, namespace, collector, context)
+            if reused is None or not is_import:
+                evaluated.append(index)
+                dirty |= writes
+            bindings = {name: namespace[name] for name in writes if name in namespace}
+            statements.append(_Statement(keys[index], reads, late_reads, writes, bindings, collector.drain()))
+        return statements, evaluated
@@ -0,0 +1,252 @@
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, NamedTuple
+
+from properpy.node import Node
+
+# 组件与 attrs 的结果所使用的去重表，由 intern_nodes 设置
+_interning: ContextVar["InternTable|None"] = ContextVar("properpy_interning", default=None)
+
+
+class FrozenDict(dict):
+    """
+    Read-only dictionary, returned instead of a dictionary by ``attrs`` and components inside :func:`intern_nodes`
+    so that identical attribute dictionaries can be shared. It is a :class:`dict`, so components still recognise it
+    as attributes and it serializes like a dictionary; every method modifying it raises :class:`TypeError`, and
+    :meth:`copy` returns a plain, modifiable dictionary.
+    """
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is read-only, use copy() to get a modifiable dictionary")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __hash__(self) -> int:
+        return hash(tuple(self.items()))
+
+    def __repr__(self) -> str:
+        return f"FrozenDict({dict.__repr__(self)})"
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+class InternStats(NamedTuple):
+    """
+    Statistics of an :class:`InternTable`.
+
+    - values: The number of strings and containers interned.
+    - distinct: The number of distinct canonical instances kept.
+    - bytes_saved: The shallow size of the duplicates replaced by a canonical instance (``sys.getsizeof``), an
+      estimate of the memory saved.
+    """
+    values: int
+    distinct: int
+    bytes_saved: int
+
+    @property
+    def ratio(self) -> float:
+        """The deduplication ratio: the number of values per distinct instance (1.0 without any duplicate)."""
+        return self.values / self.distinct if self.distinct else 1.0
+
+    def __str__(self) -> str:
+        return (f"{self.values} values, {self.distinct} distinct (dedup ratio {self.ratio:.2f}), "
+                f"~{self.bytes_saved / 1024:.1f} KiB saved")
+
+
+# 不可变的标量，按类型与值比较，本身不需要去重
+_SCALARS = frozenset((type(None), bool, int, float, complex, bytes))
+
+
+class InternTable:
+    """
+    Hash-consing table sharing structurally identical values: every distinct string, tuple, attribute dictionary and
+    component node is kept once, and :meth:`intern` returns the kept instance for any value equal to it.
+
+    Values are made immutable on the way: dictionaries become :class:`FrozenDict` objects, lists (including the
+    ``children`` of dictionary components) become tuples, and dictionary keys and node tags are interned with
+    :func:`sys.intern`. Values are compared by structure and type, so ``1``, ``1.0`` and ``True`` stay distinct;
+    other objects (e.g. sets or instances of user classes) are compared by identity and kept as they are.
+
+    A table is used by :func:`intern_nodes` for the results of components and ``attrs``, and can also be used on its
+    own, e.g. to share the identical parts of results that are kept together. Canonical instances are kept until
+    :meth:`clear` is called or the table is released.
+
+    Example::
+
+        table = InternTable()
+        first = table.intern({"style": {"color": "red"}, "tags": ["a"]})
+        second = table.intern({"style": {"color": "red"}, "tags": ["a"]})
+        first is second  # True
+        print(table.stats)
+
+    """
+    def __init__(self):
+        self._table: dict[tuple, Any] = {}  # 结构键 -> 规范实例
+        self._members: dict[int, Any] = {}  # 规范实例的 id -> 实例，用于判断值是否已经去重
+        self._strings: dict[str, str] = {}
+        self._values = 0
+        self._bytes_saved = 0
+
+    @property
+    def stats(self) -> InternStats:
+        """The statistics of the table."""
+        return InternStats(self._values, len(self._table) + len(self._strings), self._bytes_saved)
+
+    def clear(self):
+        """Forgets every canonical instance. Values already returned keep sharing their parts."""
+        self._table.clear()
+        self._members.clear()
+        self._strings.clear()
+
+    def intern(self, value: Any) -> Any:
+        """
+        Returns the canonical instance of a value, made immutable (see :class:`InternTable`). Nested values are
+        interned first, and values that are already canonical are returned at once. Deep values are interned
+        without recursion.
+
+        :param value: The value to intern.
+        :return: The canonical instance.
+        """
+        return self._part(value, 0)
+
+    def _part(self, value: Any, depth: int) -> Any:
+        kind = type(value)
+        if kind is str:
+            return self._string(value)
+        if kind in _SCALARS or self._members.get(id(value)) is value:
+            return value
+        if not (kind is Node or kind is list or kind is tuple or isinstance(value, dict)):
+            # 无法去重的对象原样保留
+            return value
+        if depth >= _MAX_DEPTH:
+            return self._intern_deep(value)
+        depth += 1
+        return self._canonical(value, lambda part: self._part(part, depth))
+
+    def _intern_deep(self, value: Any) -> Any:
+        """深层的值：以显式栈自底向上去重，避免递归"""
+        done: dict[int, Any] = {}  # 本次调用中已去重的值的 id -> 规范实例
+        def resolve(part):
+            canonical = done.get(id(part))
+            if canonical is not None:
+                return canonical
+            return self._string(part) if type(part) is str else part
+
+        stack = [value]
+        while stack:
+            item = stack[-1]
+            if id(item) in done:
+                stack.pop()
+                continue
+            pending = [part for part in _parts(item) if _is_container(part) and id(part) not in done
+                       and self._members.get(id(part)) is not part]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            done[id(item)] = self._canonical(item, resolve)
+        return done[id(value)]
+
+    def _string(self, value: str) -> str:
+        self._values += 1
+        canonical = self._strings.setdefault(value, value)
+        if canonical is not value:
+            self._bytes_saved += sys.getsizeof(value)
+        return canonical
+
+    def _canonical(self, item: Any, resolve: Callable[[Any], Any]) -> Any:
+        """容器的规范实例，各部分由 resolve 去重"""
+        if type(item) is Node:
+            children = resolve(item.children)
+            values = tuple([resolve(value) for value in item._values])
+            key = (Node, item.tag, _identity(children), item._names,
+                   *[value if type(value) is str else _identity(value) for value in values])
+        elif isinstance(item, dict):
+            items = [(sys.intern(name) if type(name) is str else name, resolve(value)) for name, value in item.items()]
+            key = (FrozenDict, *[(name if type(name) is str else _identity(name),
+                                  value if type(value) is str else _identity(value)) for name, value in items])
+        else:
+            values = tuple([resolve(value) for value in item])
+            key = (tuple, *[value if type(value) is str else _identity(value) for value in values])
+
+        self._values += 1
+        canonical = self._table.get(key)
+        if canonical is not None:
+            self._bytes_saved += sys.getsizeof(item)
+            return canonical
+
+        # 新的值：不可变且各部分未改变时直接保留，否则创建不可变的副本
+        if type(item) is Node:
+            if children is not item.children or any(new is not old for new, old in zip(values, item._values)):
+                item = Node(item.tag, children, dict(zip(item._names, values)))
+        elif isinstance(item, dict):
+            if type(item) is not FrozenDict or any(value is not item[name] for name, value in items):
+                item = FrozenDict(items)
+        elif type(item) is not tuple or any(new is not old for new, old in zip(values, item)):
+            item = values
+        self._table[key] = item
+        self._members[id(item)] = item
+        return item
+
+
+# 超过该深度的值改为以显式栈去重
+_MAX_DEPTH = 64
+
+def _is_container(value: Any) -> bool:
+    """去重的容器：节点、字典、列表与元组（不含 NamedTuple 等子类）"""
+    kind = type(value)
+    return kind is Node or kind is list or kind is tuple or isinstance(value, dict)
+
+def _parts(value: Any) -> Iterator[Any]:
+    """容器中需要先去重的部分"""
+    if type(value) is Node:
+        yield value.children
+        yield from value._values
+    elif isinstance(value, dict):
+        yield from value.values()
+    else:
+        yield from value
+
+def _identity(value: Any) -> Any:
+    """
+    规范实例在结构键中的表示：字符串按值，标量按类型与值（区分 1、1.0 与 True，以及 0.0 与 -0.0），
+    其余值（规范容器与无法去重的对象）按 id，它们由表中的规范实例保持存活。
+    """
+    kind = type(value)
+    if kind is str:
+        return value
+    if kind is float:
+        return float, value.hex()
+    if kind in _SCALARS:
+        return kind, value
+    return id(value)
+
+
+@contextmanager
+def intern_nodes(enabled: bool = True, table: InternTable = None):
+    """
+    Context manager. Inside it, the results of components and ``attrs`` are interned in an :class:`InternTable`
+    in the current thread or task only: identical attribute dictionaries, leaf components and whole subtrees are
+    shared instead of being allocated again, which cuts the memory of configurations repeating the same values
+    in proportion to the duplication. Results are immutable (see :class:`InternTable`).
+
+    Example::
+
+        with intern_nodes() as table:
+            result = parser.parse(code)
+        print(table.stats)  # e.g. "40000 values, 1200 distinct (dedup ratio 33.33), ~2400.0 KiB saved"
+
+    :param enabled: Whether to intern the results. Defaults to True.
+    :param table: The table to use, e.g. to share values between several parses. Defaults to a new table.
+    :return: The table, or None when ``enabled`` is False.
+    """
+    table = (table if table is not None else InternTable()) if enabled else None
+    token = _interning.set(table)
+    try:
+        yield table
+    finally:
+        _interning.reset(token)
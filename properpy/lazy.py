@@ -0,0 +1,165 @@
+from collections.abc import Mapping
+from contextvars import copy_context
+from typing import Any, Callable, Iterator
+
+from properpy.interning import FrozenDict
+from properpy.node import Node
+
+# 尚未求值的惰性节点的 _value
+_PENDING = object()
+
+
+class LazyNode(Mapping):
+    """
+    A component call whose arguments have not been evaluated yet, returned by components when a configuration is
+    parsed with ``lazy=True`` (see :meth:`Parser.parse`).
+
+    The first access to one of its keys evaluates the arguments in the sandbox and calls the component, and the
+    result (a dictionary, or a :class:`properpy.node.Node` inside :func:`properpy.node.compact_nodes`) is kept, so
+    later accesses cost one lookup. The call runs in a copy of the context variables of the parse (compact nodes,
+    profiling, component validation), so it returns what the eager parse would have returned. Children that are
+    components are lazy nodes themselves, and are only evaluated when they are accessed in turn. When the call
+    raises, the error is raised by the access and the next access calls the component again. Threads accessing a
+    node for the first time at once may both call the component, and the node keeps one of the results.
+
+    Use :func:`materialize` to evaluate a whole tree, e.g. before writing it to an artifact or sending it to
+    another process. Pickling a lazy node pickles its materialized value.
+
+    Example::
+
+        result = parser.parse(code, lazy=True)
+        result["database"]["host"]  # only evaluates the database component
+        materialize(result)         # evaluates every other component
+
+    :param thunk: A function calling the component it receives with the arguments of the call.
+    :param component: The component.
+    """
+    __slots__ = ("_thunk", "_component", "_context", "_value")
+
+    def __init__(self, thunk:Callable[[Callable], Any], component:Callable):
+        self._thunk = thunk
+        self._component = component
+        self._context = copy_context()
+        self._value = _PENDING
+
+    @property
+    def tag(self) -> str:
+        """The name of the component, available without evaluating the call."""
+        plan = getattr(self._component, "_call_plan", None)
+        return plan.tag if plan is not None else self._component.__name__
+
+    @property
+    def materialized(self) -> bool:
+        """Whether the call has been evaluated."""
+        return self._value is not _PENDING
+
+    def materialize(self) -> Any:
+        """
+        Evaluates the call if it has not been evaluated yet. Nested lazy nodes are not evaluated (see
+        :func:`materialize` for that).
+
+        :return: The result of the component.
+        """
+        value = self._value
+        if value is _PENDING:
+            thunk, component, context = self._thunk, self._component, self._context
+            if context is None:
+                # 另一个线程刚刚完成求值
+                return self._value
+            # 上下文的副本：同一个上下文不能在多个线程中同时进入
+            value = context.copy().run(thunk, component)
+            # 求值后不再需要参数与上下文，释放它们引用的对象
+            self._value = value
+            self._thunk = self._component = self._context = None
+        return value
+
+    def __getitem__(self, key):
+        return self.materialize()[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self.materialize()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.materialize())
+
+    def __len__(self) -> int:
+        return len(self.materialize())
+
+    def __repr__(self) -> str:
+        if self._value is _PENDING:
+            return f"LazyNode(tag={self.tag!r}, pending)"
+        return f"LazyNode({self._value!r})"
+
+    def __reduce__(self):
+        return _materialized, (materialize(self),)
+
+def _materialized(value:Any) -> Any:
+    return value
+
+
+def materialize(value:Any) -> Any:
+    """
+    Evaluates every :class:`LazyNode` in a value, e.g. the result of a lazy parse, and replaces it by its result
+    in the children, attributes, lists and dictionaries containing it. Components that have already been evaluated
+    are not evaluated again, and deep trees are evaluated without recursion.
+
+    Dictionaries and lists are updated in place, so the result of a lazy node shares its evaluated children with
+    the value returned. Tuples (and the children and attributes of compact nodes) containing lazy nodes are replaced
+    by new tuples. Read-only dictionaries of interned results (see :func:`properpy.interning.intern_nodes`) are
+    left as they are.
+
+    :param value: The value to evaluate.
+    :return: The value without lazy nodes: ``value`` itself, or the result of the component when it is a lazy node.
+    """
+    root = _resolved(value)
+    stack = [root]
+    visited = set()
+    while stack:
+        item = stack.pop()
+        if id(item) in visited:
+            continue
+        visited.add(id(item))
+        if type(item) is Node:
+            # 节点只读，只有 materialize 替换其中的惰性节点
+            item.children = _resolved(item.children)
+            item._values = _resolved(item._values)
+            stack.append(item.children)
+            stack.extend(item._values)
+        elif isinstance(item, list):
+            for index, child in enumerate(item):
+                kind = type(child)
+                if kind in _SCALARS:
+                    continue
+                if kind is LazyNode or kind is tuple:
+                    resolved = _resolved(child)
+                    if resolved is not child:
+                        child = item[index] = resolved
+                stack.append(child)
+        elif isinstance(item, dict):
+            # 只读的 FrozenDict（intern_nodes 的结果）不含惰性节点，也不能修改
+            writable = type(item) is not FrozenDict
+            for key, child in item.items():
+                kind = type(child)
+                if kind in _SCALARS:
+                    continue
+                if writable and (kind is LazyNode or kind is tuple):
+                    resolved = _resolved(child)
+                    if resolved is not child:
+                        child = item[key] = resolved
+                stack.append(child)
+        elif isinstance(item, tuple):
+            stack.extend(item)
+    return root
+
+# 不含惰性节点的常见类型，遍历时直接跳过
+_SCALARS = frozenset((type(None), bool, int, float, str, bytes))
+
+def _resolved(value:Any) -> Any:
+    """惰性节点替换为求值结果；元组中有惰性节点时返回新的元组"""
+    while type(value) is LazyNode:
+        value = value.materialize()
+    if type(value) is tuple and value:
+        items = tuple(_resolved(item) for item in value)
+        if any(new is not old for new, old in zip(items, value)):
+            return items
+    return value
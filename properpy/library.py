@@ -1,16 +1,47 @@
 import sys
-from functools import wraps
+from functools import wraps, lru_cache, partial
 from importlib.util import module_from_spec, spec_from_file_location
 from inspect import signature, Parameter
-from os import PathLike
+from os import PathLike, cpu_count, fspath
 from os.path import isfile
 from re import sub, search
 from types import ModuleType
-from typing import Union, Callable, Any
+from typing import Union, Callable, Any, NamedTuple, Iterator, Iterable, TYPE_CHECKING
 
+from properpy.compiler import ParseEvent
+from properpy.cache import (CachedConfigLoader, Dependency, ResultCache, load_program, module_dependencies,
+                            reload_changed_modules, result_key, track_modules)
 from properpy.parser import Parser
 from properpy.module_guard import ModuleTag
+from properpy.interning import _interning, intern_nodes
+from properpy.lazy import LazyNode
+from properpy.node import _compact, build_node, compact_nodes
+from properpy.profile import _profile
+from properpy.validation import DEFERRED, EAGER, _validation, validate_components
 
+if TYPE_CHECKING:
+    import asyncio
+    from concurrent.futures import Executor
+
+
+class CallPlan(NamedTuple):
+    """
+    How a component handles its arguments, computed once when the component is decorated.
+
+    - tag: The name of the component.
+    - positional: The names of the parameters that can be passed positionally, in order.
+    - parameters: The names of all parameters; other keyword arguments are not passed to the function.
+    """
+    tag: str
+    positional: tuple[str, ...]
+    parameters: frozenset[str]
+
+    @classmethod
+    def of(cls, func:Callable)->"CallPlan":
+        parameters = signature(func).parameters
+        positional = tuple(name for name, param in parameters.items()
+                           if param.kind in (Parameter.POSITIONAL_ONLY, Parameter.POSITIONAL_OR_KEYWORD))
+        return cls(sys.intern(func.__name__), positional, frozenset(parameters))
 
 def component(func:Callable):
     """
@@ -43,7 +74,7 @@ def component(func:Callable):
     :return: Returns a wrapped function that returns a dictionary representing the component structure.
     """
     """
-        1. 获取被装饰函数的参数签名，并提取位置参数名称列表。
+        1. 在装饰时一次性计算调用计划：位置参数名称列表、全部参数名称（见 CallPlan）。
         2. 包装函数中，处理传入的位置参数和关键字参数：
            - 如果位置参数与关键字参数冲突，优先使用关键字参数。
            - 筛选合法参数并调用原函数。
@@ -55,72 +86,78 @@ def component(func:Callable):
            - 如果返回值不是字典且不为 None，则将其作为子元素添加。
     """
     func._is_component = True
-
-    # 获取原函数的参数签名
-    sig = signature(func)
-    parameters = sig.parameters
-
-    # 获取位置参数名称列表
-    pos_param_names = [name for name, param in parameters.items() if
-                       param.kind in (Parameter.POSITIONAL_ONLY, Parameter.POSITIONAL_OR_KEYWORD)]
+    plan = CallPlan.of(func)
+    tag = plan.tag
+    pos_param_names = plan.positional
+    positional = frozenset(pos_param_names)
+    parameters = plan.parameters
+    count = len(pos_param_names)
 
     @wraps(func)
     def wrapper(*args, **kwargs):
+        profile = _profile.get()
+        if profile is not None and profile.outside(wrapper):
+            # 性能分析（见 properpy.profile.ParseProfile）
+            return profile.call_component(wrapper, tag, args, kwargs)
+
+        # 筛选合法参数并调用原函数
+        if not kwargs:
+            func_result = func(*args) if len(args) <= count else func(*args[:count])
+        else:
+            if positional.isdisjoint(kwargs):
+                final_args = args if len(args) <= count else args[:count]
+            else:
+                # 如果位置参数和关键字参数冲突，忽略位置参数
+                final_args = [arg for name, arg in zip(pos_param_names, args) if name not in kwargs]
+            if kwargs.keys() <= parameters:
+                func_result = func(*final_args, **kwargs)
+            else:
+                # 如果原函数没有 **kwargs，忽略剩余的关键字参数
+                func_result = func(*final_args, **{name: value for name, value in kwargs.items() if name in parameters})
 
-        # 初始化最终的位置参数和关键字参数
-        final_args = []
-        final_kwargs = {}
-
-        # 处理位置参数
-        seen_args = set()
-        arg_index = 0
-        for i, arg in enumerate(args):
-            if arg_index < len(pos_param_names):
-                name = pos_param_names[arg_index]
-                if name not in kwargs:
-                    final_args.append(arg)
-                    seen_args.add(name)
-                else:
-                    # 如果位置参数和关键字参数冲突，忽略位置参数
-                    pass
-                arg_index += 1
-
-        # 处理关键字参数
-        for name, value in kwargs.items():
-            if name in parameters:
-                final_kwargs[name] = value
-        # 如果原函数没有 **kwargs，忽略剩余的关键字参数
-        func_result = func(*final_args, **final_kwargs)
-        # 处理所有位置参数和关键字参数生成组件结构
+        # 处理位置参数：子组件与属性字典
         children = []
-        attributes = {}
-
-        # 处理位置参数
+        attributes = None
         for arg in args:
-            if isinstance(arg, dict):
-                if 'tag' in arg:
-                    children.append(arg)
+            if isinstance(arg, dict) and 'tag' not in arg:
+                if attributes is None:
+                    attributes = arg.copy()
                 else:
                     attributes.update(arg)
             else:
                 children.append(arg)
 
-        # 处理关键字参数
-        attributes.update(kwargs)
-        # 构建结果字典
-        result = {
-            'tag': func.__name__,
-            'children': children,
-            **attributes
-        }
+        if _compact.get():
+            # 紧凑节点（见 properpy.node.compact_nodes）
+            result = build_node(tag, children, attributes, kwargs, func_result)
+        else:
+            # 构建结果字典，关键字参数覆盖同名属性
+            if attributes is None:
+                result = {'tag': tag, 'children': children, **kwargs}
+            else:
+                result = {'tag': tag, 'children': children, **attributes, **kwargs}
 
-        # 合并原函数的结果
-        if isinstance(func_result,dict):
-            result.update(func_result)
-        elif func_result is not None:
-            result['children'].append(func_result)
+            # 合并原函数的结果
+            if func_result is not None:
+                if isinstance(func_result, dict):
+                    result.update(func_result)
+                else:
+                    result['children'].append(func_result)
+
+        validation = _validation.get()
+        if validation is not None:
+            # 按参数注解校验属性，以及绑定到参数的位置参数（见 properpy.validation.validate_components）
+            passed = args if not kwargs or positional.isdisjoint(kwargs) else final_args
+            validation.add(func, result, dict(zip(pos_param_names, passed)) if passed and count else None)
+        interning = _interning.get()
+        if interning is not None:
+            # 共享结构相同的结果（见 properpy.interning.intern_nodes）
+            result = interning.intern(result)
         return result
 
+    wrapper._call_plan = plan
+    # 惰性求值时返回惰性节点，而不是调用组件（见 properpy.compiler.Collector.call）
+    wrapper._defer = partial(LazyNode, component=wrapper)
     return wrapper
 
 def config_wrapper(receiver:Union[dict,Callable[[dict],Any]]):
@@ -134,6 +171,10 @@ def config_wrapper(receiver:Union[dict,Callable[[dict],Any]]):
         - 'children': A list of sub-components of the component (positional arguments passed in).
         - ...attribute: Keyword arguments passed in.
 
+    In a lazy parse (see :meth:`Parser.parse`), the receiver gets a :class:`properpy.lazy.LazyNode` as soon as the
+    component is called, and the arguments are only evaluated when the receiver (or anything it hands the node to)
+    reads it. A dictionary receiver reads it at once.
+
     Example 1: Using a dictionary as the receiver::
 
         data = {}
@@ -163,18 +204,30 @@ def config_wrapper(receiver:Union[dict,Callable[[dict],Any]]):
     :return: Returns a wrapped function that returns a dictionary representing the component structure.
     """
     def component_wrapper(func):
+        # 调用计划在装饰时计算一次
+        first_func = component(func)
 
         @wraps(func)
         def wrapper(*args, **kwargs):
-            first_func = component(func)
             result = first_func(*args,**kwargs)
-            # 根据 receiver 类型执行不同操作
-            if isinstance(receiver, dict):
-                receiver.update(result)  # 如果是字典，更新字典
-            elif callable(receiver):  # 如果是函数，调用函数并传入 result
-                receiver(result)
+            _deliver(result)
+            return result
+
+        def defer(thunk):
+            # 惰性求值：接收者立即收到惰性节点，在读取时才求值
+            result = LazyNode(thunk, first_func)
+            _deliver(result)
             return result
+
+        wrapper._defer = defer
         return wrapper
+
+    def _deliver(result):
+        # 根据 receiver 类型执行不同操作
+        if isinstance(receiver, dict):
+            receiver.update(result)  # 如果是字典，更新字典
+        elif callable(receiver):  # 如果是函数，调用函数并传入 result
+            receiver(result)
     return component_wrapper
 
 def attrs(*args, **kwargs):
@@ -209,6 +262,9 @@ def attrs(*args, **kwargs):
         result.update(arg)
     # 合并关键字参数（覆盖同名键）
     result.update(kwargs)
+    interning = _interning.get()
+    if interning is not None:
+        return interning.intern(result)
     return result
 
 def to_valid_module_name(module_name:str,default_name:str = "config_file")->str:
@@ -277,8 +333,8 @@ def import_config(file_path:str,module_name:str="config_file")->ModuleType:
     :return: The dynamically loaded Python module object.
     """
     module_name = to_valid_module_name(module_name)
-    # 动态加载模块
-    spec = spec_from_file_location(module_name, file_path)
+    # 动态加载模块，字节码来自 properpy 的缓存
+    spec = spec_from_file_location(module_name, file_path, loader=CachedConfigLoader(module_name, file_path))
     module = module_from_spec(spec)
     # 注册到 sys.modules
     sys.modules[module_name] = module
@@ -286,11 +342,31 @@ def import_config(file_path:str,module_name:str="config_file")->ModuleType:
 
     return module  # 返回模块对象
 
+@lru_cache(maxsize=32)
+def _warm_parser(
+        supported_modules:tuple[str, ...],
+        supported_builtin_modules:tuple[ModuleTag, ...],
+        module_paths:tuple[str, ...]|None
+)->Parser:
+    """按白名单配置复用已预热的解析器，每次解析在隔离的命名空间中进行"""
+    parser = Parser(list(module_paths) if module_paths is not None else None)
+    parser.register_module(*supported_modules)
+    parser.register_builtin_module(*supported_builtin_modules)
+    return parser
+
 def parse_config(
         file_path_or_code:str|PathLike[str]|PathLike[bytes],
         supported_modules:list[str] = None,
         supported_builtin_modules:list[ModuleTag] = None,
-        module_paths:list[str] = None
+        module_paths:list[str] = None,
+        bytecode_cache:bool = True,
+        cache:ResultCache = None,
+        static:bool = False,
+        compact:bool = False,
+        validate:str = None,
+        lazy:bool = False,
+        intern:bool = False,
+        server:str|PathLike[str] = None
                  )->dict:
     """
     Parses a configuration file or code string and extracts relevant information using a parser.
@@ -324,16 +400,392 @@ def parse_config(
                                       modules are predefined and available for use during parsing. Defaults
                                       to None.
     :param module_paths: A list of additional paths to search for modules during parsing. Defaults to None.
+    :param bytecode_cache: Whether to reuse the compiled code of an unchanged configuration file from its
+                           ``__pycache__`` directory (see :func:`properpy.cache.load_program`). Defaults to True.
+    :param cache: A result cache. When given, a configuration whose source, whitelist, module paths and imported
+                  modules are all unchanged is not executed again, and a copy of the cached result is returned
+                  instead (see :class:`properpy.cache.ResultCache`). Defaults to None.
+    :param static: Whether to evaluate the configuration from its syntax tree where possible, without executing
+                   it or importing the modules that define its components (see :meth:`Parser.parse`). With
+                   ``validate``, the modules are imported, so that components are checked against their real
+                   annotations. Defaults to False.
+    :param compact: Whether components return compact, read-only :class:`properpy.node.Node` objects instead of
+                    dictionaries, which use much less memory for large configurations. Use
+                    :func:`properpy.node.to_dict` to convert the result. Defaults to False.
+    :param validate: Whether to check the attributes of every component against the annotations of the component
+                     function (see :func:`properpy.validation.validate_components`). ``"eager"`` checks every
+                     component call and reports an invalid one as an evaluation error of its statement;
+                     ``"deferred"`` checks every component in one batched pass after parsing and raises
+                     :class:`properpy.validation.ComponentValidationError` listing every issue. Defaults to None
+                     (no validation).
+    :param lazy: Whether component calls return :class:`properpy.lazy.LazyNode` objects that evaluate their
+                 arguments and call the component only when they are read (see :meth:`Parser.parse`). It cannot be
+                 combined with ``cache``, ``static``, ``validate`` or ``intern``. Defaults to False.
+    :param intern: Whether structurally identical results of components and ``attrs`` are shared, and made
+                   immutable, to save memory on configurations repeating the same values (see
+                   :func:`properpy.interning.intern_nodes`). Defaults to False.
+    :param server: The Unix socket of a ``properpy serve`` daemon (see :class:`properpy.server.ParseServer`). When
+                   given, the configuration is parsed by the daemon, which keeps warm parsers, compiled code and
+                   results between requests, instead of in the current process. It cannot be combined with
+                   ``cache`` or ``lazy``. Defaults to None.
     :return: A dictionary containing the parsed configuration data.
     """
-    parser = Parser(module_paths)
-    if supported_modules is not None:
-        parser.register_module(*supported_modules)
-    if supported_builtin_modules is not None:
-        parser.register_builtin_module(*supported_builtin_modules)
-    if (isinstance(file_path_or_code, str) or isinstance(file_path_or_code,PathLike))and isfile(file_path_or_code):
+    _check_options(cache, static, validate, lazy, intern, server)
+    if server is not None:
+        # 客户端只在使用服务时导入
+        from properpy.server import parse_on_server
+        return parse_on_server(server, file_path_or_code, supported_modules, supported_builtin_modules, module_paths,
+                               static, compact, validate, intern)
+    options = (tuple(supported_modules or ()), tuple(supported_builtin_modules or ()),
+               tuple(module_paths) if module_paths is not None else None)
+    is_file = (isinstance(file_path_or_code, str) or isinstance(file_path_or_code,PathLike))and isfile(file_path_or_code)
+    if cache is None:
+        return _parse_source(_warm_parser(*options), file_path_or_code, is_file, bytecode_cache, static, compact,
+                             validate, lazy, intern)[0]
+
+    # 结果缓存：源码、白名单与依赖模块均未改变时直接返回缓存结果的副本
+    key, result = _cached_result(cache, file_path_or_code, options, compact, validate, intern)
+    if result is None:
+        result, dependencies = _parse_tracked(file_path_or_code, *options, bytecode_cache, static, compact, validate,
+                                              intern, cache.reload_modules)
+        cache.put(key, result, dependencies)
+    return result
+
+def _check_options(cache:ResultCache|None, static:bool, validate:str|None, lazy:bool, intern:bool,
+                   server:str|PathLike[str]|None):
+    if validate not in (None, EAGER, DEFERRED):
+        raise ValueError(f"validate must be None, {EAGER!r} or {DEFERRED!r}, not {validate!r}")
+    if lazy and (cache is not None or static or validate is not None or intern):
+        # 缓存结果需要序列化整棵树；校验、静态求值与去重都在解析期间完成，惰性节点在解析之后才求值
+        raise ValueError("lazy cannot be combined with cache, static, validate or intern")
+    if server is not None and (cache is not None or lazy):
+        # 服务进程有自己的结果缓存；惰性节点不能传回
+        raise ValueError("server cannot be combined with cache or lazy")
+
+def _cached_result(cache:ResultCache, file_path_or_code, options:tuple, compact:bool, validate:str|None,
+                   intern:bool)->tuple[str, dict|None]:
+    """结果缓存的键与缓存的结果（未命中时为 None）"""
+    is_file = (isinstance(file_path_or_code, str) or isinstance(file_path_or_code,PathLike))and isfile(file_path_or_code)
+    key = _result_key(file_path_or_code, is_file, _warm_parser(*options), compact, validate, intern)
+    return key, cache.get(key)
+
+def _result_key(file_path_or_code, is_file:bool, parser:Parser, compact:bool, validate:str|None, intern:bool)->str:
+    if is_file:
+        with open(file_path_or_code, 'rb') as file:
+            source = file.read()
+    else:
+        source = file_path_or_code.encode()
+    return result_key(source, parser, compact, validate, intern)
+
+def _parse_source(parser:Parser, file_path_or_code, is_file:bool, bytecode_cache:bool, static:bool, compact:bool,
+                  validate:str|None, lazy:bool = False, intern:bool = False)->tuple[dict, dict[str, ModuleType]]:
+    if is_file and bytecode_cache:
+        code = load_program(file_path_or_code, parser, lazy)
+    elif is_file:
+        with open(file_path_or_code, 'r') as file:
+            code = file.read()
+    else:
+        code = file_path_or_code
+
+    if validate is not None:
+        with validate_components(deferred=validate == DEFERRED):
+            return _parse_compact(parser, code, static, compact, intern=intern)
+    return _parse_compact(parser, code, static, compact, lazy, intern)
+
+def _parse_tracked(
+        file_path_or_code,
+        supported_modules:tuple[str, ...],
+        supported_builtin_modules:tuple[ModuleTag, ...],
+        module_paths:tuple[str, ...]|None,
+        bytecode_cache:bool,
+        static:bool,
+        compact:bool,
+        validate:str|None,
+        intern:bool = False,
+        reload_modules:bool = False
+)->tuple[dict, tuple[Dependency, ...]]:
+    """
+    解析结果将放入结果缓存：返回结果与所用模块的指纹（已加载的源码，见 track_modules）。
+    可以在其他进程中执行（参数与返回值都可以序列化），结果缓存本身留在调用方的进程中。
+    reload_modules 为真时先重新加载已改变的模块（见 ResultCache）。
+    """
+    if reload_modules and reload_changed_modules(module_paths):
+        # 依赖的模块已改变：丢弃从旧模块加载了名称的解析器，结果按新的模块重新计算
+        _warm_parser.cache_clear()
+    parser = _warm_parser(supported_modules, supported_builtin_modules, module_paths)
+    is_file = (isinstance(file_path_or_code, str) or isinstance(file_path_or_code,PathLike))and isfile(file_path_or_code)
+    result, modules = _parse_source(parser, file_path_or_code, is_file, bytecode_cache, static, compact, validate,
+                                    intern=intern)
+    return result, track_modules(modules, module_dependencies(modules))
+
+def _parse_compact(parser:Parser, code, static:bool, compact:bool, lazy:bool = False,
+                   intern:bool = False)->tuple[dict, dict[str, ModuleType]]:
+    with compact_nodes(compact), intern_nodes(intern):
+        return parser.parse_with_dependencies(code, static, lazy)
+
+def iter_parse_config(
+        file_path_or_code:str|PathLike[str]|PathLike[bytes],
+        supported_modules:list[str] = None,
+        supported_builtin_modules:list[ModuleTag] = None,
+        module_paths:list[str] = None,
+        bytecode_cache:bool = True,
+        compact:bool = False
+                 )->Iterator[ParseEvent]:
+    """
+    Same as :func:`parse_config`, but yields the items of the result as soon as their top-level statement is
+    evaluated instead of returning the whole dictionary (see :meth:`Parser.iter_parse`).
+
+    Example::
+
+        for kind, name, value in iter_parse_config("config.proper.py", ["config_schema"]):
+            if kind == "assign":
+                print(name, value)
+
+    :param file_path_or_code: The configuration file path (as a string or path-like object) or the code
+                              string to be parsed.
+    :param supported_modules: A list of module names to register with the parser. Defaults to None.
+    :param supported_builtin_modules: A list of built-in module tags to register with the parser. Defaults to None.
+    :param module_paths: A list of additional paths to search for modules during parsing. Defaults to None.
+    :param bytecode_cache: Whether to reuse the compiled code of an unchanged configuration file from its
+                           ``__pycache__`` directory. Defaults to True.
+    :param compact: Whether components return compact :class:`properpy.node.Node` objects instead of
+                    dictionaries. Defaults to False.
+    :return: An iterator of :class:`properpy.compiler.ParseEvent` tuples ``(kind, name, value)``.
+    """
+    parser = _warm_parser(
+        tuple(supported_modules or ()),
+        tuple(supported_builtin_modules or ()),
+        tuple(module_paths) if module_paths is not None else None
+    )
+    is_file = (isinstance(file_path_or_code, str) or isinstance(file_path_or_code,PathLike))and isfile(file_path_or_code)
+    if is_file and bytecode_cache:
+        code = load_program(file_path_or_code, parser)
+    elif is_file:
         with open(file_path_or_code, 'r') as file:
-            test_code = file.read()
+            code = file.read()
     else:
-        test_code = file_path_or_code
-    return parser.parse(test_code)
+        code = file_path_or_code
+
+    events = parser.iter_parse(code)
+    while True:
+        # 节点表示只在求值期间设置，不跨越 yield
+        with compact_nodes(compact):
+            event = next(events, None)
+        if event is None:
+            return
+        yield event
+
+class BatchResult(NamedTuple):
+    """
+    The outcome of parsing one file with :func:`parse_many`.
+
+    - index: The position of the file in the input.
+    - path: The file path.
+    - result: The parsed configuration, None when parsing failed.
+    - error: The exception raised while parsing, None on success.
+    """
+    index: int
+    path: str|PathLike[str]
+    result: dict|None
+    error: BaseException|None
+
+def _init_batch_worker(
+        supported_modules:tuple[str, ...],
+        supported_builtin_modules:tuple[ModuleTag, ...],
+        module_paths:tuple[str, ...]|None
+):
+    """工作进程启动时预热解析器，并导入显式注册的模块（内置模块仍按需加载）"""
+    parser = _warm_parser(supported_modules, supported_builtin_modules, module_paths)
+    for name in supported_modules:
+        parser._load_module(name)
+
+def _parse_batch_item(
+        file_path:str|PathLike[str],
+        supported_modules:tuple[str, ...],
+        supported_builtin_modules:tuple[ModuleTag, ...],
+        module_paths:tuple[str, ...]|None,
+        bytecode_cache:bool,
+        compact:bool
+)->dict:
+    if not isfile(file_path):
+        raise FileNotFoundError(f"No such configuration file: {file_path!r}")
+    return parse_config(file_path, list(supported_modules), list(supported_builtin_modules),
+                        list(module_paths) if module_paths is not None else None,
+                        bytecode_cache=bytecode_cache, compact=compact)
+
+def parse_many(
+        file_paths:Iterable[str|PathLike[str]],
+        supported_modules:list[str] = None,
+        supported_builtin_modules:list[ModuleTag] = None,
+        module_paths:list[str] = None,
+        workers:int = None,
+        ordered:bool = True,
+        bytecode_cache:bool = True,
+        compact:bool = False
+                 )->Iterator[BatchResult]:
+    """
+    Parses many configuration files with :func:`parse_config` across a pool of worker processes.
+
+    Every worker builds one parser with the given whitelist when it starts, imports ``supported_modules`` once,
+    and reuses the parser for every file it receives. An error raised while parsing a file does not stop the
+    batch: it is returned in the :class:`BatchResult` of that file. Stopping the iteration early cancels the files
+    that have not started yet.
+
+    Results are pickled back from the workers, so receivers of ``config_wrapper`` are called in the worker
+    processes, not in the current one.
+
+    Example::
+
+        for item in parse_many(glob("configs/*.proper.py"), ["config_schema"], workers=8):
+            if item.error is not None:
+                print(item.path, item.error)
+
+    :param file_paths: The paths of the configuration files.
+    :param supported_modules: A list of module names to register with the parsers. Defaults to None.
+    :param supported_builtin_modules: A list of built-in module tags to register with the parsers. Defaults to None.
+    :param module_paths: A list of additional paths to search for modules during parsing. Defaults to None.
+    :param workers: The number of worker processes. Defaults to None (the number of CPUs). With 1, the files are
+                    parsed one after another in the current process.
+    :param ordered: Whether results are returned in input order, otherwise as they complete. Defaults to True.
+    :param bytecode_cache: Whether to reuse the compiled code of unchanged files (see :func:`parse_config`).
+                           Defaults to True.
+    :param compact: Whether components return compact :class:`properpy.node.Node` objects. Defaults to False.
+    :return: An iterator of :class:`BatchResult`, one per file.
+    """
+    file_paths = list(file_paths)
+    options = (
+        tuple(supported_modules or ()),
+        tuple(supported_builtin_modules or ()),
+        tuple(module_paths) if module_paths is not None else None
+    )
+    if workers == 1 or len(file_paths) <= 1:
+        for index, path in enumerate(file_paths):
+            try:
+                yield BatchResult(index, path, _parse_batch_item(path, *options, bytecode_cache, compact), None)
+            except Exception as e:
+                yield BatchResult(index, path, None, e)
+        return
+
+    # 进程池只在批量解析时导入，不拖慢单个配置的加载
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    executor = ProcessPoolExecutor(min(workers or cpu_count() or 1, len(file_paths)),
+                                   initializer=_init_batch_worker, initargs=options)
+    try:
+        futures = {
+            executor.submit(_parse_batch_item, path, *options, bytecode_cache, compact): index
+            for index, path in enumerate(file_paths)
+        }
+        for future in (futures if ordered else as_completed(futures)):
+            index = futures[future]
+            error = future.exception()
+            yield BatchResult(index, file_paths[index], future.result() if error is None else None, error)
+    finally:
+        # 提前停止迭代时不再解析剩余的文件
+        executor.shutdown(cancel_futures=True)
+
+# 正在进行的异步解析：(事件循环, 解析参数) -> 共享的 Future
+_in_flight: dict[tuple, "asyncio.Future"] = {}
+
+async def parse_config_async(
+        file_path_or_code:str|PathLike[str]|PathLike[bytes],
+        supported_modules:list[str] = None,
+        supported_builtin_modules:list[ModuleTag] = None,
+        module_paths:list[str] = None,
+        bytecode_cache:bool = True,
+        cache:ResultCache = None,
+        static:bool = False,
+        compact:bool = False,
+        validate:str = None,
+        lazy:bool = False,
+        intern:bool = False,
+        server:str|PathLike[str] = None,
+        executor:"Executor" = None,
+        timeout:float = None
+                 )->dict:
+    """
+    Same as :func:`parse_config`, but reads and evaluates the configuration in ``executor`` so that the event
+    loop is not blocked.
+
+    Concurrent calls with the same arguments share one parse: the configuration is read and evaluated once and
+    every caller receives the same result object. Cancelling a call or reaching its timeout only stops that caller
+    from waiting, and the shared parse keeps running for the other callers.
+
+    Example::
+
+        result = await parse_config_async("config.proper.py", ["config_schema"], timeout=5)
+
+    :param file_path_or_code: The configuration file path (as a string or path-like object) or the code
+                              string to be parsed.
+    :param supported_modules: A list of module names to register with the parser. Defaults to None.
+    :param supported_builtin_modules: A list of built-in module tags to register with the parser. Defaults to None.
+    :param module_paths: A list of additional paths to search for modules during parsing. Defaults to None.
+    :param bytecode_cache: Whether to reuse the compiled code of an unchanged configuration file. Defaults to True.
+    :param cache: A result cache (see :func:`parse_config`). It is looked up and filled in the calling process, in
+                  the default executor of the loop, and only the parse itself runs in ``executor``, so it can be
+                  combined with a ``ProcessPoolExecutor``. Defaults to None.
+    :param static: Whether to use the static mode (see :func:`parse_config`). Defaults to False.
+    :param compact: Whether components return compact :class:`properpy.node.Node` objects. Defaults to False.
+    :param validate: The validation mode (see :func:`parse_config`). Defaults to None.
+    :param lazy: Whether to use the lazy mode (see :func:`parse_config`). The components are evaluated when they are
+                 read, in the reading thread, so it needs a thread executor. Defaults to False.
+    :param intern: Whether identical results are shared (see :func:`parse_config`). Defaults to False.
+    :param server: The Unix socket of a ``properpy serve`` daemon (see :func:`parse_config`). Defaults to None.
+    :param executor: The executor running :func:`parse_config`, e.g. a ``ThreadPoolExecutor`` or a
+                     ``ProcessPoolExecutor``. Defaults to None (the default executor of the loop).
+    :param timeout: The number of seconds to wait for the result. Defaults to None (no limit).
+    :return: A dictionary containing the parsed configuration data.
+    :raises TimeoutError: If the result is not available within ``timeout`` seconds.
+    """
+    import asyncio
+    _check_options(cache, static, validate, lazy, intern, server)
+    loop = asyncio.get_running_loop()
+    source = fspath(file_path_or_code) if isinstance(file_path_or_code, PathLike) else file_path_or_code
+    key = (loop, source, tuple(supported_modules or ()), tuple(supported_builtin_modules or ()),
+           tuple(module_paths) if module_paths is not None else None, bytecode_cache, id(cache), static, compact, validate,
+           lazy, intern, server)
+    future = _in_flight.get(key)
+    if future is None:
+        if cache is None:
+            future = loop.run_in_executor(executor, partial(
+                parse_config, file_path_or_code, supported_modules, supported_builtin_modules, module_paths,
+                bytecode_cache, None, static, compact, validate, lazy, intern, server
+            ))
+        else:
+            # 结果缓存持有锁、不能序列化：在本进程中查找与写入，执行器只负责解析
+            options = (tuple(supported_modules or ()), tuple(supported_builtin_modules or ()),
+                       tuple(module_paths) if module_paths is not None else None)
+            future = asyncio.ensure_future(_parse_into_cache(
+                loop, executor, cache,
+                partial(_cached_result, cache, file_path_or_code, options, compact, validate, intern),
+                partial(_parse_tracked, file_path_or_code, *options, bytecode_cache, static, compact, validate, intern,
+                        cache.reload_modules)
+            ))
+        _in_flight[key] = future
+        future.add_done_callback(lambda _: _in_flight.pop(key, None))
+    # shield：单个调用方取消或超时不会取消共享的解析
+    return await asyncio.wait_for(asyncio.shield(future), timeout)
+
+async def _parse_into_cache(loop, executor:"Executor", cache:ResultCache, lookup:partial, parse:partial)->dict:
+    # 计算键会读取并哈希源码，查找与写入会（反）序列化结果、读写磁盘：在默认执行器的线程中进行，不阻塞事件循环
+    key, result = await loop.run_in_executor(None, lookup)
+    if result is None:
+        result, dependencies = await loop.run_in_executor(executor, parse)
+        await loop.run_in_executor(None, cache.put, key, result, dependencies)
+    return result
+
+async def import_config_async(file_path:str, module_name:str="config_file", executor:"Executor" = None,
+                              timeout:float = None)->ModuleType:
+    """
+    Same as :func:`import_config`, but reads and executes the configuration file in ``executor`` so that the event
+    loop is not blocked.
+
+    :param file_path: The absolute or relative path to the Python configuration file to be imported.
+    :param module_name: The name under which the module will be registered. Defaults to "config_file".
+    :param executor: The executor running :func:`import_config`. Defaults to None (the default executor of the loop).
+    :param timeout: The number of seconds to wait for the module. Defaults to None (no limit).
+    :return: The dynamically loaded Python module object.
+    :raises TimeoutError: If the module is not loaded within ``timeout`` seconds.
+    """
+    import asyncio
+    loop = asyncio.get_running_loop()
+    return await asyncio.wait_for(loop.run_in_executor(executor, import_config, file_path, module_name), timeout)
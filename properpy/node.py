@@ -0,0 +1,201 @@
+import sys
+from collections.abc import Mapping, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+# 没有子元素的节点共享同一个空元组
+EMPTY_CHILDREN = ()
+
+# 组件是否返回紧凑节点，由 compact_nodes 设置
+_compact: ContextVar[bool] = ContextVar("properpy_compact_nodes", default=False)
+
+
+class Node(Mapping):
+    """
+    Compact, read-only representation of a component structure, returned by components instead of a dictionary
+    inside :func:`compact_nodes`.
+
+    A node keeps the tag (interned), the children (a tuple, shared when empty) and the attribute values (a tuple)
+    in ``__slots__``. The attribute names are a tuple shared by every node with the same names, so a node takes
+    a fraction of the memory of the equivalent dictionary and ``children`` list. It is a
+    :class:`~collections.abc.Mapping` with the same keys as the dictionary, so code reading ``node['tag']``,
+    ``node['children']`` or an attribute keeps working, and :meth:`to_dict` returns the dictionary itself.
+
+    Example::
+
+        with compact_nodes():
+            node = div(attrs(style={"color": "red"}), "text")
+
+        node["tag"]       # 'div'
+        node["children"]  # ('text',)
+        node.to_dict()    # {'tag': 'div', 'children': ['text'], 'style': {'color': 'red'}}
+
+    :param tag: The name of the component.
+    :param children: The children of the component. Defaults to an empty tuple.
+    :param attributes: The attributes of the component. Defaults to None (no attributes).
+    """
+    __slots__ = ("tag", "children", "_names", "_values")
+
+    def __init__(self, tag:str, children:tuple = EMPTY_CHILDREN, attributes:dict = None):
+        self.tag = sys.intern(tag) if type(tag) is str else tag
+        self.children = children
+        if attributes:
+            names = tuple(attributes)
+            self._names = _shapes.setdefault(names, names)
+            self._values = tuple(attributes.values())
+        else:
+            self._names = self._values = EMPTY_CHILDREN
+
+    @classmethod
+    def from_dict(cls, value:dict) -> "Node":
+        """
+        Creates a node from the dictionary representation of a component. Nested dictionaries are kept as they are.
+
+        :param value: A dictionary with the 'tag' and 'children' keys.
+        :return: The node.
+        """
+        attributes = dict(value)
+        tag = attributes.pop('tag')
+        children = attributes.pop('children', EMPTY_CHILDREN)
+        if type(children) is list:
+            children = tuple(children) if children else EMPTY_CHILDREN
+        return cls(tag, children, attributes)
+
+    @property
+    def attributes(self) -> dict:
+        """A new dictionary of the attributes."""
+        return dict(zip(self._names, self._values))
+
+    def __getitem__(self, key):
+        if key == 'tag':
+            return self.tag
+        if key == 'children':
+            return self.children
+        try:
+            return self._values[self._names.index(key)]
+        except ValueError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key) -> bool:
+        return key == 'tag' or key == 'children' or key in self._names
+
+    def __iter__(self) -> Iterator[str]:
+        yield 'tag'
+        yield 'children'
+        yield from self._names
+
+    def __len__(self) -> int:
+        return 2 + len(self._names)
+
+    def __repr__(self) -> str:
+        attributes = "".join(f", {key}={value!r}" for key, value in zip(self._names, self._values))
+        return f"Node(tag={self.tag!r}, children={self.children!r}{attributes})"
+
+    def to_dict(self) -> dict:
+        """
+        Converts the node and every node nested in it (in children, attributes, lists and dictionaries) to the
+        dictionary representation returned by components outside :func:`compact_nodes`.
+
+        :return: A dictionary with the 'tag' and 'children' keys and the attributes.
+        """
+        return to_dict(self)
+
+# 属性名称元组 -> 共享的同一个元组，属性名称相同的节点共用
+_shapes: dict[tuple[str, ...], tuple[str, ...]] = {}
+
+
+def to_dict(value:Any) -> Any:
+    """
+    Converts every :class:`Node` in a value, e.g. the result of :meth:`Parser.parse` inside :func:`compact_nodes`,
+    to its dictionary representation. Lists and dictionaries are copied; other values are kept as they are. Deep
+    trees are converted without recursion.
+
+    :param value: The value to convert.
+    :return: The converted value.
+    """
+    root = _shell(value)
+    if root is value:
+        return value
+    # 先创建空容器，再依次填充，避免深层树的递归
+    stack = [(value, root)]
+    while stack:
+        source, target = stack.pop()
+        if isinstance(source, Node):
+            target['tag'] = source.tag
+            children = source.children
+            if isinstance(children, Sequence) and not isinstance(children, (str, bytes)):
+                # 元组，或从产物中加载的子元素视图（properpy.artifact.ArtifactList）
+                target['children'] = _fill_list(children, [], stack)
+            else:
+                target['children'] = _converted(children, stack)
+            for key, item in zip(source._names, source._values):
+                target[key] = _converted(item, stack)
+        elif isinstance(source, list):
+            _fill_list(source, target, stack)
+        else:
+            _fill_dict(source, target, stack)
+    return root
+
+def _shell(value: Any) -> Any:
+    """需要转换的值对应的空容器，其余值原样返回"""
+    if isinstance(value, (Node, dict)):
+        return {}
+    if isinstance(value, list):
+        return []
+    return value
+
+def _converted(value: Any, stack: list) -> Any:
+    if isinstance(value, tuple):
+        # 元组不可变，只能递归转换（元组嵌套通常很浅）
+        return tuple(to_dict(item) for item in value)
+    target = _shell(value)
+    if target is not value:
+        stack.append((value, target))
+    return target
+
+def _fill_list(source, target: list, stack: list) -> list:
+    target.extend(_converted(item, stack) for item in source)
+    return target
+
+def _fill_dict(source: Mapping, target: dict, stack: list):
+    for key, item in source.items():
+        target[key] = _converted(item, stack)
+
+
+@contextmanager
+def compact_nodes(enabled:bool = True):
+    """
+    Context manager. Inside it, components return :class:`Node` objects instead of dictionaries, in the current
+    thread or task only.
+
+    Example::
+
+        with compact_nodes():
+            result = parser.parse(code)
+        plain = to_dict(result)
+
+    :param enabled: Whether components return nodes. Defaults to True.
+    """
+    token = _compact.set(enabled)
+    try:
+        yield
+    finally:
+        _compact.reset(token)
+
+def build_node(tag:str, children:list, attributes:dict|None, kwargs:dict, func_result:Any) -> Node:
+    """按与字典结果相同的规则（关键字参数覆盖属性，合并原函数的返回值）创建节点"""
+    if func_result is None and 'tag' not in kwargs and 'children' not in kwargs:
+        if attributes is None:
+            attributes = kwargs
+        elif kwargs:
+            attributes.update(kwargs)
+        return Node(tag, tuple(children) if children else EMPTY_CHILDREN, attributes)
+
+    # 少见的情况：属性覆盖了 tag/children，或原函数有返回值
+    result = {'tag': tag, 'children': children, **(attributes or {}), **kwargs}
+    if isinstance(func_result, (dict, Node)):
+        result.update(func_result)
+    elif func_result is not None:
+        result['children'].append(func_result)
+    return Node.from_dict(result)
@@ -1,11 +1,53 @@
 import ast
+import builtins
 import importlib
+import symtable
 import sys
+import threading
 from contextlib import contextmanager
-from types import ModuleType
+from contextvars import ContextVar
+from functools import lru_cache
+from time import perf_counter_ns
+from importlib.machinery import ExtensionFileLoader, PathFinder
+from types import ModuleType, CodeType
+from typing import NamedTuple, Any, Iterator, TYPE_CHECKING
 
+from properpy.compiler import (Collector, EventCollector, ParseEvent, RESERVED_NAMES, RUNTIME_NAME, compile_module,
+                               compile_statement, loaded_names, paused_gc, record_error, resume)
+from properpy.budget import (_Interrupt, _Limits, _limits, budget_error, budgeted_parse, budgeted_statements,
+                             parse_meter, uninterruptible)
 from properpy.module_guard import get_module_by_level, ModuleTag
+from properpy.profile import ParseProfile, _profile
 
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+
+# 编译产物格式版本，编译方式改变时递增，使旧的字节码缓存失效
+PROGRAM_FORMAT = 3
+
+class CompiledConfig(NamedTuple):
+    """
+    The compiled form of a configuration, independent of any parser state, so it can be cached and reused.
+
+    - names: The free names the code references, used to load modules and symbols on demand.
+    - code: A single code object evaluating every top-level statement (see :func:`properpy.compiler.compile_module`).
+    - source: The source code, only needed again to recover from an evaluation error.
+    - filename: The file name used in tracebacks.
+    - lazy: Whether the code defers component calls (see :meth:`Parser.parse`).
+    """
+    names: tuple[str, ...]
+    code: CodeType
+    source: str
+    filename: str
+    lazy: bool = False
+
+class ParseContext:
+    """单次解析的状态，解析期间通过 _current_context 访问"""
+    def __init__(self):
+        self.modules: dict[str, ModuleType] = {}  # 本次解析通过沙箱导入的模块
+
+_current_context: ContextVar[ParseContext|None] = ContextVar("properpy_parse_context", default=None)
 
 class Parser:
     def __init__(self, module_paths:list[str]=None):
@@ -13,47 +55,172 @@ class Parser:
         :param module_paths: A list of additional paths to search for modules during parsing. Defaults to None.
         """
         self.module_paths = module_paths or ["."]  # 添加模块搜索路径
-        self.sandbox = ModuleType("__sandbox__")  # 安全沙箱环境
+        self.sandbox = ModuleType("__sandbox__")  # 安全沙箱环境（基础命名空间，解析过程中只读）
         self.function_registry = {}  # 存储普通函数的注册信息
         self.module_registry = set()  # 白名单
         self.module_registry.add("properpy")
         self.module_registry.add("pydantic")
+        self._named_modules = set()  # 按名称注册（而非通过内置模块标签注册）的模块
+        self._warmed_names = {}  # 已按需加载进基础命名空间的名称 -> 提供该名称的模块名
+        # 保护基础命名空间与已加载的名称：同一个预热的解析器被多个线程共用（见 library._warm_parser）
+        self._lock = threading.RLock()
+        self._generation = 0  # 每次丢弃已加载的名称时递增
+        self._setup_import_hook()
 
-    def _preload_modules(self):
-        """预加载必要模块"""
-        for mod in self.module_registry:
-            try:
-                module = importlib.import_module(mod)
-                self.sandbox.__dict__.update(module.__dict__)
-            except ImportError:
-                pass
+    def _warm_names(self, names) -> dict:
+        """
+        按需加载：只解析代码实际引用（由 AST 静态扫描得到）、且沙箱中尚不存在的名称。
+        名称若是已注册的模块则绑定模块本身，否则在已注册模块中查找同名符号（探查范围见 _probe_order）。
+        找不到的名称保持未定义，求值时按通常的方式报告错误。
+        导入模块时不持有锁（被导入的模块可能在其他线程中使用同一个解析器），只在写入基础命名空间时持有锁；
+        期间白名单改变时重新查找。返回此时为单次解析创建的命名空间（见 _new_namespace），
+        使其他线程丢弃已加载的名称时，本次解析仍能看到它引用的名称。
+        预算的中断推迟到加载结束（见 properpy.budget.uninterruptible），不落在导入机制或持有锁的代码中。
+        """
+        with uninterruptible():
+            return self._load_names(names)
+
+    def _load_names(self, names) -> dict:
+        namespace = self.sandbox.__dict__
+        while True:
+            generation = self._generation
+            pending = {name for name in names if name not in namespace and not hasattr(builtins, name)}
+            pending -= _RESERVED_NAMES
+
+            warmed = {}  # 名称 -> (值, 提供该名称的模块名)
+            if pending:
+                # 引用了已注册模块的名称：直接绑定模块
+                for name in pending & self.module_registry:
+                    module = self._load_module(name)
+                    if module is not None:
+                        warmed[name] = (module, name)
+                pending -= self.module_registry
+
+                # 引用了模块中的符号：依次探查已注册模块，找到即停止
+                for module in self._iter_registered_modules():
+                    if not pending:
+                        break
+                    found = {name for name in pending if name in module.__dict__}
+                    for name in found:
+                        warmed[name] = (module.__dict__[name], module.__name__)
+                    pending -= found
+
+            with self._lock:
+                if generation != self._generation:
+                    continue
+                for name, (value, source) in warmed.items():
+                    if name not in namespace:
+                        namespace[name] = value
+                        self._warmed_names[name] = source
+                return self._new_namespace()
+
+    def _forget_warmed_names(self):
+        """白名单变化后，已加载的名称可能解析到不同的模块，需要重新加载"""
+        with self._lock:
+            self._generation += 1
+            for name in self._warmed_names:
+                self.sandbox.__dict__.pop(name, None)
+            self._warmed_names.clear()
+
+    def _probe_order(self) -> list[str]:
+        """
+        已注册模块的探查顺序：properpy 优先，其次已导入的模块，最后才是尚未加载的模块。
+        尚未加载的模块只探查按名称注册的模块，以及内置模块标签中没有 Python 源码、导入开销很小的模块（如 math）：
+        未定义的名称（拼写错误、参数名等）不会导入内置模块标签中的上百个模块。
+        """
+        with self._lock:
+            registry = list(self.module_registry)
+            named = set(self._named_modules)
+        loaded = sorted(mod for mod in registry if mod in sys.modules and mod != "properpy")
+        unloaded = sorted(mod for mod in registry if mod not in sys.modules and mod != "properpy"
+                          and (mod in named or _is_compiled_module(mod)))
+        return ["properpy", *loaded, *unloaded]
+
+    def _iter_registered_modules(self):
+        """按探查顺序遍历已注册模块，尚未加载的模块在遍历到时才导入"""
+        for mod in self._probe_order():
+            module = self._load_module(mod)
+            if module is not None:
+                yield module
+
+    def _load_module(self, name: str):
+        """导入白名单中的模块，导入失败时返回 None"""
+        try:
+            with module_search_paths(self.module_paths):
+                return importlib.import_module(name)
+        except ImportError:
+            return None
 
     def _setup_import_hook(self):
         """自定义导入处理"""
-        """准备安全沙箱环境"""
+        """准备安全沙箱环境，builtins 表只构建一次"""
         # 阻止访问危险属性，置为None
-        blocked = {k: None for k in dir(__builtins__) if not k.islower() }
-        builtins = {
+        blocked = {k: None for k in dir(builtins) if not k.islower() }
+        self._builtins = {
+            **builtins.__dict__,
             '__import__': self._safe_importer,
             **blocked,
         }
-        self.sandbox.__dict__["__builtins__"].update(builtins)
+        # 使用副本，避免修改全局的 builtins
+        self.sandbox.__dict__["__builtins__"] = self._builtins
+
+    def _new_namespace(self) -> dict:
+        """为单次解析创建隔离的命名空间：基础命名空间的浅拷贝，解析中的赋值与导入不会写回基础命名空间"""
+        namespace = self.sandbox.__dict__.copy()
+        namespace["__builtins__"] = self._builtins.copy()
+        return namespace
 
     def _safe_importer(self, name, globals=None, locals=None, fromlist=(), level=0):
-        """安全导入处理器"""
+        """
+        安全导入处理器，与内置 __import__ 的约定相同：解释器只绑定 import 语句请求的名称
+        （import x / import x as y 绑定模块，from x import a, b 从返回的模块中取出 a、b）。
+        """
         if name not in self.module_registry:
             raise ImportError(f"Module {name} is not allowed")
 
-        # 使用上下文管理器确保路径安全
-        with temporary_sys_path(self.module_paths):
-            module = importlib.import_module(name)
-            # 仅注入白名单中的符号
-            # allowed_symbols = {'safe_function', 'safe_class'}
-            # for symbol in allowed_symbols:
-            #     if hasattr(module, symbol):
-            #         self.sandbox.__dict__[symbol] = getattr(module, symbol)
-            self.sandbox.__dict__.update(module.__dict__)
+        # 使用上下文管理器确保路径安全；预算的中断推迟到导入结束
+        with uninterruptible(), module_search_paths(self.module_paths):
+            module = self._import(name)
+            if fromlist and hasattr(module, "__path__"):
+                self._import_submodules(module, name, fromlist)
+        if fromlist or "." not in name:
             return module
+        # import a.b 绑定顶层包 a
+        return sys.modules[name.partition(".")[0]]
+
+    def _import(self, name:str)->ModuleType:
+        profile = _profile.get()
+        if profile is None:
+            module = importlib.import_module(name)
+        else:
+            blocks = sys.getallocatedblocks()
+            start = perf_counter_ns()
+            module = importlib.import_module(name)
+            profile.imported(name, perf_counter_ns() - start, sys.getallocatedblocks() - blocks)
+        context = _current_context.get()
+        if context is not None:
+            context.modules[name] = module
+        return module
+
+    def _import_submodules(self, package:ModuleType, name:str, fromlist):
+        """
+        from a import b：b 不是包 a 的属性时作为子模块导入（同 importlib._bootstrap._handle_fromlist）。
+        子模块同样须在白名单中，否则不导入，由解释器报告无法导入该名称。
+        """
+        for item in fromlist:
+            if item == "*":
+                # from a import *：导入 __all__ 中列出的子模块
+                submodules = [item for item in getattr(package, "__all__", ()) if item != "*"]
+                self._import_submodules(package, name, submodules)
+                continue
+            submodule = f"{name}.{item}"
+            if not hasattr(package, item) and submodule in self.module_registry:
+                try:
+                    self._import(submodule)
+                except ModuleNotFoundError as e:
+                    # 不存在的子模块：由解释器报告无法导入该名称；子模块内部的导入错误照常抛出
+                    if e.name != submodule:
+                        raise
 
 
     def register_var(self, name, func):
@@ -63,9 +230,11 @@ class Parser:
         :param name: The name under which the function or variable will be registered in the sandbox.
         :param func: The callable object (function) or variable to be registered.
         """
-        setattr(self.sandbox, name, func)
-        if callable(func):
-            self.function_registry[name] = func
+        with self._lock:
+            setattr(self.sandbox, name, func)
+            self._warmed_names.pop(name, None)
+            if callable(func):
+                self.function_registry[name] = func
 
     def register_module(self, *name:str):
         """
@@ -74,8 +243,11 @@ class Parser:
         :param name: Variable-length argument list of module names to be registered.
         :type name: str
         """
-        for _name in name:
-            self.module_registry.add(_name)
+        with self._lock:
+            for _name in name:
+                self.module_registry.add(_name)
+                self._named_modules.add(_name)
+            self._forget_warmed_names()
 
 
     def register_builtin_module(self,*tag:ModuleTag):
@@ -84,84 +256,365 @@ class Parser:
 
         :param tag: Variable-length argument list of `ModuleTag` values representing built-in modules.
         """
-        for tag_ in tag:
-            self.module_registry.update(get_module_by_level(tag_))
+        with self._lock:
+            for tag_ in tag:
+                self.module_registry.update(get_module_by_level(tag_))
+            self._forget_warmed_names()
 
 
-    def parse(self, code: str) -> dict:
+    def parse(self, code: str|CompiledConfig, static: bool = False, profile: ParseProfile = None,
+              lazy: bool = False) -> dict:
         """
         Parses the provided Python code string into a structured dictionary representation in the sandbox.
 
-        :param code: The Python code string to be parsed.
+        The parser can be reused: registered modules and symbols are loaded into a shared base namespace once,
+        and every call evaluates the code in its own isolated copy of that namespace, so assignments and
+        imports of one call never leak into the next.
+
+        In static mode, literals, ``attrs(...)`` and calls of components with an empty body are evaluated from the
+        syntax tree without executing the code or importing the modules defining the components, and only the
+        other subtrees are evaluated in the sandbox (see :class:`properpy.static.StaticEvaluator`). The result is
+        the same.
+
+        In lazy mode, component calls return :class:`properpy.lazy.LazyNode` objects instead of being called: the
+        arguments of a component are evaluated in the sandbox, and the component called, only when a key of its
+        node is read, so reading one section of a large configuration only evaluates that section. Names read by
+        the arguments are bound when their statement runs, as in the eager parse; other calls, imports and
+        assignments of other values are evaluated at once. Errors raised by a component are raised by the access
+        instead of becoming an ``"<Evaluation Error: ...>"`` string. Use :func:`properpy.lazy.materialize` to
+        evaluate the whole result.
+
+        :param code: The Python code string to be parsed, or the result of :meth:`compile`.
+        :param static: Whether to use the static mode. Defaults to False.
+        :param profile: A profile recording the time spent in every statement, import and component during this
+                        call (see :class:`properpy.profile.ParseProfile`). Defaults to None.
+        :param lazy: Whether to use the lazy mode. It cannot be combined with the static mode. Defaults to False.
         :return: A dictionary representing the parsed structure of the code.
         """
-        # 预处理：加载依赖模块
-        self._preload_modules()
-        self._setup_import_hook()
+        if profile is not None:
+            with profile:
+                return self.parse_with_dependencies(code, static, lazy)[0]
+        return self.parse_with_dependencies(code, static, lazy)[0]
 
-        # 注册函数
-        self._prepare_sandbox()
+    def parse_with_dependencies(self, code: str|CompiledConfig, static: bool = False,
+                                lazy: bool = False) -> tuple[dict, dict[str, ModuleType]]:
+        """
+        Same as :meth:`parse`, but also returns the modules the code depends on: the modules imported through the
+        sandbox and the modules providing the names loaded on demand. Used to invalidate caches of the result.
+
+        :param code: The Python code string to be parsed, or the result of :meth:`compile`.
+        :param static: Whether to use the static mode. Defaults to False.
+        :param lazy: Whether to use the lazy mode. Defaults to False.
+        :return: A tuple of the parsed dictionary and a dictionary mapping module names to modules.
+        """
+        if static and lazy:
+            raise ValueError("The static and lazy modes cannot be combined")
+        if static and not isinstance(code, CompiledConfig):
+            # 静态模式不需要编译整个模块
+            names = tuple(sorted(free_names(code)))
+            program, source, filename = None, code, "<string>"
+        else:
+            if not isinstance(code, CompiledConfig):
+                program = self.compile(code, lazy=lazy)
+            elif code.lazy != lazy:
+                # 编译产物与求值方式不符，从源码重新编译
+                program = self.compile(code.source, code.filename, lazy)
+            else:
+                program = code
+            names, source, filename = program.names, program.source, program.filename
+
+        context = ParseContext()
+        limits = _limits.get()
+        token = _current_context.set(context)
+        try:
+            result = self._evaluate(program, names, source, filename, static, limits)
+        finally:
+            _current_context.reset(token)
 
+        for name in names:
+            source = self._warmed_names.get(name)
+            if source is not None and source in sys.modules:
+                context.modules.setdefault(source, sys.modules[source])
+        return result, context.modules
+
+    def _evaluate(self, program: CompiledConfig|None, names: tuple[str, ...], source: str, filename: str,
+                  static: bool, limits: _Limits|None) -> dict:
+        """解析的预算（见 properpy.budget）只在执行配置的语句时计量，不包括预先加载的名称"""
+        if static:
+            # 延迟导入，避免与 properpy.library 循环导入
+            from properpy.static import StaticEvaluator
+            evaluator = StaticEvaluator(self, source, names, filename)
+            if limits is None:
+                return evaluator.evaluate()
+            with budgeted_parse(limits):
+                return evaluator.evaluate()
+        # 预处理：按需加载代码引用的模块与符号
+        namespace = self._warm_names(names)
         # 解析组件结构
-        return self._parse_ast(ast.parse(code))
-
-
-    def _prepare_sandbox(self):
-        self.sandbox.__dict__.update({
-            **self.function_registry
-        })
-
-    def _parse_ast(self, tree: ast.AST) -> dict:
-        """解析AST结构"""
-        children = []
-        attributes = {}
-
-        for node in tree.body:
-            if isinstance(node, (ast.Import, ast.ImportFrom)):
-                self._safe_importer(node.module)
-            elif isinstance(node, ast.Assign):
-                parsed = self._parse_value(node.value)
-                for target in node.targets:
-                    if isinstance(target, ast.Name):
-                        var_name = target.id
-                        attributes[var_name] = parsed
-            elif isinstance(node, ast.Expr):
-                parsed = self._parse_value(node.value)
-                if isinstance(parsed,dict):
-                    if 'tag' in parsed:
-                        children.append(parsed)
-                    else:
-                        attributes.update(parsed)
-                elif parsed is not None:
-                    children.append(parsed)
-
-        result = {
-            'children': children,
-            **attributes
-        }
-        return result
+        if limits is None:
+            return self._execute(program, namespace)
+        with budgeted_parse(limits):
+            return self._execute(program, namespace)
+
+    async def parse_async(self, code: str|CompiledConfig, static: bool = False, executor: "Executor" = None,
+                          timeout: float = None) -> dict:
+        """
+        Same as :meth:`parse`, but evaluates the code in ``executor`` so that the event loop is not blocked.
+
+        Cancelling the call or reaching the timeout stops waiting for the result, but an evaluation that has
+        already started in the executor runs to completion.
+
+        :param code: The Python code string to be parsed, or the result of :meth:`compile`.
+        :param static: Whether to use the static mode. Defaults to False.
+        :param executor: The executor evaluating the code. Defaults to None (the default executor of the loop).
+        :param timeout: The number of seconds to wait for the result. Defaults to None (no limit).
+        :return: A dictionary representing the parsed structure of the code.
+        :raises TimeoutError: If the result is not available within ``timeout`` seconds.
+        """
+        # asyncio 只在异步解析时导入，不拖慢同步使用者的导入
+        import asyncio
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(executor, self.parse, code, static), timeout)
+
+    def iter_parse(self, code: str|CompiledConfig) -> Iterator[ParseEvent]:
+        """
+        Parses the provided Python code string like :meth:`parse`, but evaluates it one top-level statement at a time
+        and yields the items of the result as soon as their statement is evaluated, as
+        :class:`~properpy.compiler.ParseEvent` tuples ``(kind, name, value)``:
 
-    def _parse_value(self, node) -> any:
-        """解析值节点"""
+        - ``("assign", name, value)`` for an assignment,
+        - ``("attribute", key, value)`` for each key of a dictionary expression such as ``attrs(...)``,
+        - ``("child", None, value)`` for any other expression, e.g. a component.
+
+        The result is not kept and assignments bind nothing (see :func:`properpy.compiler.compile_module`), so the
+        memory used stays bounded by the largest single statement. The remaining statements are not evaluated when
+        the iteration stops early.
+
+        Example::
+
+            for kind, name, value in parser.iter_parse(code):
+                if kind == "child" and value["tag"] == "route":
+                    register(value)
+
+        :param code: The Python code string to be parsed, or the result of :meth:`compile`.
+        :return: An iterator of parse events.
+        """
+        if isinstance(code, CompiledConfig):
+            names, source, filename = code.names, code.source, code.filename
+        else:
+            names, source, filename = tuple(sorted(free_names(code))), code, "<string>"
+        statements = ast.parse(source, filename).body
+
+        namespace = self._warm_names(names)
+        collector = EventCollector()
+        namespace[RUNTIME_NAME] = collector
+        context = ParseContext()
+        lines = source.splitlines()
+        limits = _limits.get()
+        # 解析的预算由各条语句共用，只在执行语句时计量，不包括 yield 之后调用者的处理
+        meter = parse_meter(limits) if limits is not None else None
+        for index, node in enumerate(statements):
+            # 上下文只在执行语句期间设置，不跨越 yield
+            if limits is None:
+                self._execute_statement(node, filename, namespace, collector, context)
+            else:
+                with budgeted_parse(limits, meter), budgeted_statements(limits, collector) as runtime:
+                    namespace[RUNTIME_NAME] = runtime
+                    try:
+                        self._execute_statement(node, filename, namespace, collector, context)
+                    except _Interrupt:
+                        raise budget_error(filename, node.lineno, lines[node.lineno - 1].strip()) from None
+            yield from collector.drain()
+
+    def compile(self, code: str, filename: str = "<string>", lazy: bool = False) -> CompiledConfig:
+        """
+        Compiles the provided Python code string without evaluating it. The result only depends on the code,
+        so it can be cached (see :mod:`properpy.cache`) and passed to :meth:`parse` later.
+
+        :param code: The Python code string to be compiled.
+        :param filename: The file name used in tracebacks of evaluation errors. Defaults to "<string>".
+        :param lazy: Whether to compile for the lazy mode of :meth:`parse`. A configuration compiled for the other
+                     mode is compiled again by :meth:`parse`. Defaults to False.
+        :return: The compiled configuration.
+        """
+        with paused_gc():
+            tree = ast.parse(code, filename)
+            module = compile_module(tree, filename, lazy)
+            imported = _imported_names(tree.body)
+            # 恢复垃圾回收之前释放语法树，之后的回收不必再遍历它
+            del tree
+        # 由字节码得到引用的名称（与 free_names 相同），不必再次分析源码
+        names = loaded_names(module) - imported - RESERVED_NAMES
+        return CompiledConfig(tuple(sorted(names)), module, code, filename, lazy)
+
+    def _execute_statement(self, node: ast.stmt, filename: str, namespace: dict, collector: Collector,
+                           context: ParseContext):
+        """单独编译并执行一条顶层语句，求值失败时记录错误"""
+        statement = compile_statement(node, filename)
+        token = _current_context.set(context)
         try:
-            return ast.literal_eval(node)
+            exec(statement, namespace)
         except Exception as e:
-            """直接求值方案"""
+            record_error(node, collector, e)
+        finally:
+            _current_context.reset(token)
+
+    def _execute(self, program: CompiledConfig, namespace: dict) -> dict:
+        """一次执行整个编译产物，由收集器生成组件结构"""
+        collector = Collector()
+        limits = _limits.get()
+        if limits is None:
+            namespace[RUNTIME_NAME] = collector
+            return self._execute_collected(program, namespace, collector)
+        # 预算（见 properpy.budget）：运行时对象在每条语句结束时检查预算，超出预算时由回溯找到被中断的语句
+        with budgeted_statements(limits, collector) as runtime:
+            namespace[RUNTIME_NAME] = runtime
             try:
-                # 编译为表达式
-                expr = ast.Expression(node)
-                code = compile(expr, '<string>', 'eval')
+                return self._execute_collected(program, namespace, collector)
+            except _Interrupt as e:
+                raise budget_error(program.filename, *_interrupted_statement(program, e.__traceback__)) from None
+
+    def _execute_collected(self, program: CompiledConfig, namespace: dict, collector: Collector) -> dict:
+        profile = _profile.get()
+        if profile is not None:
+            return self._execute_profiled(program, namespace, collector, profile)
+        try:
+            exec(program.code, namespace)
+        except Exception as e:
+            # 某条语句求值失败：记录错误，其余语句以逐条捕获异常的方式继续执行
+            resume(program.code, program.source, program.filename, namespace, collector, e, program.lazy)
+        return collector.result()
 
-                # 在沙箱中执行
-                return eval(code, self.sandbox.__dict__)
+    def _execute_profiled(self, program: CompiledConfig, namespace: dict, collector: Collector,
+                          profile: ParseProfile) -> dict:
+        """性能分析：逐条编译并执行顶层语句，分别记录每条语句的执行耗时"""
+        lines = program.source.splitlines()
+        for node in ast.parse(program.source, program.filename).body:
+            statement = compile_statement(node, program.filename, program.lazy)
+            blocks = sys.getallocatedblocks()
+            start = perf_counter_ns()
+            try:
+                exec(statement, namespace)
             except Exception as e:
-                return f"<Evaluation Error: {str(e)}>"
+                record_error(node, collector, e)
+            profile.statement(program.filename, node.lineno, lines[node.lineno - 1].strip(),
+                              perf_counter_ns() - start, sys.getallocatedblocks() - blocks)
+        return collector.result()
+
+def _interrupted_statement(program: CompiledConfig, traceback) -> tuple[int|None, str|None]:
+    """
+    被预算中断的顶层语句的行号与源码，不在顶层语句中时为 (None, None)。
+    出错后继续执行的代码（见 resume）与原代码不是同一个代码对象，因此按文件名找到最内层的模块代码帧。
+    """
+    line = None
+    while traceback is not None:
+        code = traceback.tb_frame.f_code
+        if code.co_filename == program.filename and code.co_name == "<module>":
+            line = traceback.tb_lineno
+        traceback = traceback.tb_next
+    if line is None:
+        return None, None
+    for node in ast.parse(program.source, program.filename).body:
+        if node.lineno <= line <= node.end_lineno:
+            return node.lineno, program.source.splitlines()[node.lineno - 1].strip()
+    return None, None
+
+@lru_cache(maxsize=None)
+def _is_compiled_module(name: str) -> bool:
+    """模块是否是内建或扩展模块：没有 Python 源码，导入时不会级联导入其他模块"""
+    if name in sys.builtin_module_names:
+        return True
+    if "." in name:
+        # 子模块需要先导入其所在的包
+        return False
+    try:
+        spec = PathFinder.find_spec(name)
+    except (ImportError, ValueError):
+        return False
+    return spec is not None and isinstance(spec.loader, ExtensionFileLoader)
+
+# 沙箱自身使用的名称，不参与按需加载
+_RESERVED_NAMES = {"__builtins__", RUNTIME_NAME}
+
+# 引用这些名称的代码可以动态读取任意变量，无法静态得知它依赖哪些语句
+_DYNAMIC_NAMES = frozenset({"globals", "locals", "vars", "eval", "exec"})
+
+def _imported_names(statements: list[ast.stmt]) -> set[str]:
+    """顶层导入绑定的名称：import a.b 绑定 a"""
+    names = set()
+    for node in statements:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            names.update((alias.asname or alias.name).partition(".")[0] for alias in node.names)
+    return names
+
+def free_names(code: str, filename: str = "<string>") -> set[str]:
+    """
+    Statically collects the names that the code reads but never binds itself, i.e. the names that must be
+    provided by the sandbox (registered variables, registered modules or their symbols, builtins). Top-level
+    assignments bind nothing (see :func:`properpy.compiler.compile_module`), so only imports bind names.
+
+    :param code: The Python code string.
+    :param filename: The file name used in syntax errors. Defaults to "<string>".
+    :return: A set of free names.
+    """
+    # 使用 symtable（C 实现）而不是遍历 AST，大文件上快数倍
+    module_table = symtable.symtable(code, filename, "exec")
+    loaded = set()
+    bound = set()
+    tables = [module_table]
+    while tables:
+        table = tables.pop()
+        tables.extend(table.get_children())
+        for symbol in table.get_symbols():
+            name = symbol.get_name()
+            if table is module_table:
+                # Python 3.12 起模块级推导式内联，其循环变量也会计入（多出的名称不影响求值）
+                if symbol.is_imported():
+                    bound.add(name)
+                if symbol.is_referenced():
+                    loaded.add(name)
+            elif symbol.is_global():
+                # 函数、lambda、推导式中引用的全局名称
+                if symbol.is_referenced():
+                    loaded.add(name)
+                if symbol.is_declared_global() and symbol.is_assigned():
+                    bound.add(name)
+    return loaded - bound
+
+# 当前线程/任务中正在解析的 Parser 的模块搜索路径
+_module_paths: ContextVar[tuple[str, ...]] = ContextVar("properpy_module_paths", default=())
+
+class ModulePathFinder:
+    """
+    Meta path finder resolving top-level modules from the ``module_paths`` of the parser that is importing them,
+    set by :func:`module_search_paths`. It comes after the standard finders, so the paths are searched after
+    ``sys.path``, and it only sees the paths of the current thread or task: ``sys.path`` is never modified, and
+    parsers with different paths can import concurrently.
+    """
+    def find_spec(self, fullname, path=None, target=None):
+        paths = _module_paths.get()
+        if path is not None or not paths:
+            # 子模块由父包的 __path__ 解析
+            return None
+        return PathFinder.find_spec(fullname, list(paths), target)
+
+_finder = ModulePathFinder()
+
+def _install_finder():
+    if _finder not in sys.meta_path:
+        sys.meta_path.append(_finder)
 
 @contextmanager
-def temporary_sys_path(paths):
-    original_sys_path = sys.path.copy()
-    sys.path.extend(paths)
+def module_search_paths(paths):
+    """
+    Context manager. Inside it, imports in the current thread or task also search ``paths`` after ``sys.path``
+    (see :class:`ModulePathFinder`).
+
+    :param paths: The additional module search paths.
+    """
+    _install_finder()
+    token = _module_paths.set(tuple(paths))
     try:
         yield
     finally:
-        sys.path = original_sys_path
\ No newline at end of file
+        _module_paths.reset(token)
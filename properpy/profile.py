@@ -0,0 +1,136 @@
+import json
+import marshal
+import sys
+from contextvars import ContextVar, Token
+from time import perf_counter_ns
+from typing import Any
+
+# 当前线程/任务中启用的性能分析，未启用时为 None
+_profile: ContextVar["ParseProfile|None"] = ContextVar("properpy_profile", default=None)
+
+
+class _Timing:
+    """一类被测对象的汇总：调用次数、总耗时、自身耗时（不含嵌套的组件调用）、净分配的内存块数"""
+    __slots__ = ("calls", "total_ns", "self_ns", "blocks", "file", "line")
+
+    def __init__(self, file: str = "~", line: int = 0):
+        self.calls = 0
+        self.total_ns = 0
+        self.self_ns = 0
+        self.blocks = 0
+        self.file = file
+        self.line = line
+
+    def add(self, total_ns: int, self_ns: int, blocks: int):
+        self.calls += 1
+        self.total_ns += total_ns
+        self.self_ns += self_ns
+        self.blocks += blocks
+
+    def to_dict(self) -> dict:
+        return {"calls": self.calls, "total_ms": self.total_ns / 1e6, "self_ms": self.self_ns / 1e6,
+                "blocks": self.blocks}
+
+
+class ParseProfile:
+    """
+    Opt-in profiling of parses: wall time and allocations of every top-level statement, every sandboxed import,
+    and every component call aggregated by tag, with call counts and self/total time.
+
+    Allocations are counted as the net number of memory blocks allocated by the interpreter
+    (``sys.getallocatedblocks``). While a profile is active, top-level statements are evaluated one at a time so
+    that each can be measured. Nothing is measured outside of a profile, so profiling costs nothing when disabled.
+
+    Use it as a context manager around any parse, or pass it to :meth:`Parser.parse`::
+
+        with ParseProfile() as profile:
+            parse_config("config.proper.py", ["config_schema"])
+        print(profile.to_json())
+        profile.dump_stats("parse.prof")  # python -m pstats parse.prof
+
+    The profile only covers the current thread or task.
+    """
+    def __init__(self):
+        self.statements: list[dict] = []
+        self.imports: dict[str, _Timing] = {}
+        self.components: dict[str, _Timing] = {}
+        self._tokens: list[Token] = []
+        self._stack: list[int] = []  # 正在执行的组件已用去的嵌套组件耗时
+        self._entering = None  # 即将由 call_component 执行、不需再次计时的组件
+
+    def __enter__(self) -> "ParseProfile":
+        self._tokens.append(_profile.set(self))
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _profile.reset(self._tokens.pop())
+
+    def statement(self, filename: str, line: int, source: str, elapsed_ns: int, blocks: int):
+        self.statements.append({"file": filename, "line": line, "source": source,
+                                "ms": elapsed_ns / 1e6, "blocks": blocks})
+
+    def imported(self, name: str, elapsed_ns: int, blocks: int):
+        timing = self.imports.get(name)
+        if timing is None:
+            timing = self.imports[name] = _Timing(file="<import>")
+        timing.add(elapsed_ns, elapsed_ns, blocks)
+
+    def outside(self, wrapper) -> bool:
+        """组件包装函数是否需要通过 call_component 计时（call_component 再次调用它时不需要）"""
+        if self._entering is wrapper:
+            self._entering = None
+            return False
+        return True
+
+    def call_component(self, wrapper, tag: str, args: tuple, kwargs: dict) -> Any:
+        """调用组件并记录耗时；嵌套在组件函数内的组件调用不计入外层的自身耗时"""
+        self._stack.append(0)
+        blocks = sys.getallocatedblocks()
+        start = perf_counter_ns()
+        try:
+            self._entering = wrapper
+            return wrapper(*args, **kwargs)
+        finally:
+            elapsed = perf_counter_ns() - start
+            nested = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            timing = self.components.get(tag)
+            if timing is None:
+                code = getattr(getattr(wrapper, "__wrapped__", wrapper), "__code__", None)
+                timing = self.components[tag] = _Timing(code.co_filename, code.co_firstlineno) if code else _Timing()
+            timing.add(elapsed, elapsed - nested, sys.getallocatedblocks() - blocks)
+
+    def to_dict(self) -> dict:
+        """The profile as plain data: ``statements``, ``imports`` and ``components`` (by tag)."""
+        return {
+            "statements": list(self.statements),
+            "imports": {name: timing.to_dict() for name, timing in self.imports.items()},
+            "components": {tag: timing.to_dict() for tag, timing in self.components.items()},
+        }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def dump_stats(self, file_path: str):
+        """
+        Writes the profile in the format of :mod:`pstats`, readable with ``pstats.Stats(file_path)``. Statements are
+        named ``<statement>`` at their line, imports ``<import>:<module name>``, components by their tag.
+
+        :param file_path: The output file.
+        """
+        stats = {}
+        for item in self.statements:
+            seconds = item["ms"] / 1e3
+            key = (item["file"], item["line"], "<statement>")
+            cc, nc, tt, ct, callers = stats.get(key, (0, 0, 0.0, 0.0, {}))
+            stats[key] = (cc + 1, nc + 1, tt + seconds, ct + seconds, callers)
+        for name, timing in self.imports.items():
+            stats[(timing.file, timing.line, f"<import>:{name}")] = _stats_entry(timing)
+        for tag, timing in self.components.items():
+            stats[(timing.file, timing.line, tag)] = _stats_entry(timing)
+        with open(file_path, "wb") as file:
+            marshal.dump(stats, file)
+
+def _stats_entry(timing: _Timing) -> tuple:
+    return timing.calls, timing.calls, timing.self_ns / 1e9, timing.total_ns / 1e9, {}
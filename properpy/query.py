@@ -0,0 +1,388 @@
+import ast
+import re
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any, Iterator, NamedTuple
+
+from properpy.lazy import LazyNode
+from properpy.node import Node
+
+Path = tuple  # 从根到值的键与索引，例如 ("app", "children", 0)
+
+
+class _Step(NamedTuple):
+    """选择器中的一个复合选择器"""
+    combinator: str|None  # 与前一步的关系：" "（后代）、">"（子节点），第一步为 None
+    tag: str|None  # None 表示任意标签
+    filters: tuple  # (属性名, 值) 元组，值为 _PRESENT 时只要求属性存在
+
+# 属性过滤只要求属性存在
+_PRESENT = object()
+
+_NAME = r"[\w.:-]+"
+_VALUE = r"\"[^\"]*\"|'[^']*'|[^\]'\"]*"
+_FILTER = re.compile(rf"\[\s*({_NAME})\s*(?:=\s*({_VALUE}))?\s*\]")
+_COMPOUND = re.compile(rf"(\*|{_NAME})?((?:\[\s*{_NAME}\s*(?:=\s*(?:{_VALUE}))?\s*\])*)")
+_COMBINATOR = re.compile(r"\s*>\s*|\s+")
+
+
+@lru_cache(maxsize=256)
+def _parse_selector(selector: str) -> tuple[_Step, ...]:
+    text = selector.strip()
+    steps = []
+    combinator = None
+    pos = 0
+    while True:
+        match = _COMPOUND.match(text, pos)
+        tag, filters = match.group(1), match.group(2)
+        if not tag and not filters:
+            raise ValueError(f"Invalid selector {selector!r} at position {pos}")
+        steps.append(_Step(combinator, None if tag in (None, "*") else tag,
+                           tuple((match.group(1), _literal(match.group(2))) for match in _FILTER.finditer(filters))))
+        pos = match.end()
+        if pos == len(text):
+            return tuple(steps)
+        match = _COMBINATOR.match(text, pos)
+        if match is None:
+            raise ValueError(f"Invalid selector {selector!r} at position {pos}")
+        combinator = ">" if ">" in match.group() else " "
+        pos = match.end()
+
+def _literal(value: str|None) -> Any:
+    """属性值：带引号的为字符串，其余按 Python 字面量解析（数字、True、None），无法解析时为字符串"""
+    if value is None:
+        return _PRESENT
+    value = value.strip()
+    if value[:1] in ("'", '"'):
+        return value[1:-1]
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
+
+
+class TreeIndex:
+    """
+    Index over the result of a parse (e.g. of :func:`parse_config` or :meth:`Parser.parse`, in the dictionary or
+    the compact representation), built once so that components can be looked up without walking the whole tree.
+
+    Every component node (a mapping with the 'tag' and 'children' keys) nested in the result, in variables,
+    children, attributes, lists and dictionaries, is indexed by its path (the keys and indexes leading to it from
+    the root, e.g. ``("app", "children", 0)``), by its tag, and by the path of its parent node. A node shared by
+    several paths (e.g. inside :func:`properpy.interning.intern_nodes`) is indexed at each of them. Lazy nodes (see
+    :class:`properpy.lazy.LazyNode`) are evaluated as they are indexed.
+
+    :meth:`select` finds nodes with a small selector language, a subset of CSS selectors:
+
+    - ``div`` matches the nodes with the tag "div", ``*`` matches every node.
+    - ``div[class_=container]`` also requires the attribute ``class_`` to equal "container", and ``div[class_]``
+      requires it to exist. Quoted values are strings; other values are Python literals (``[size=3]``,
+      ``[hidden=True]``), or strings when they are not.
+    - ``html div`` matches the "div" nodes nested at any depth in an "html" node, ``html > div`` the "div"
+      children of an "html" node.
+
+    Matches are found from the nodes with the tag and the first attribute value of the last compound selector,
+    checked against the rest of the selector through their ancestors, so a query costs time in proportion to those
+    nodes (every node for ``*``) and not to the size of the tree. The nodes are looked up by attribute value in an
+    index of the tag and the attribute, created by the first query using them.
+
+    :meth:`replace` replaces a value in the tree and updates the index for the replaced subtree only.
+
+    Example::
+
+        index = TreeIndex(parse_config("config.proper.py", ["config_schema"]))
+        for node in index.select("html > div[class_=container]"):
+            print(index.path_of(node), index.parent(node)["tag"])
+        index.replace(("app", "children", 0), new_div)
+
+    :param root: The result to index.
+    """
+    def __init__(self, root: Any):
+        self.root = root
+        self._nodes: dict[Path, Mapping] = {}  # 路径 -> 节点
+        self._parents: dict[Path, Path|None] = {}  # 路径 -> 父节点的路径
+        self._children: dict[Path|None, list[Path]] = {None: []}  # 父节点的路径 -> 子节点的路径
+        self._tags: dict[str, dict[Path, None]] = {}  # 标签 -> 有序的路径集合
+        self._paths: dict[int, dict[Path, None]] = {}  # 节点的 id -> 路径
+        # 标签 -> 属性名 -> 属性值 -> 路径，首次按该属性值查询时创建
+        self._values: dict[str, dict[str, dict[Any, dict[Path, None]]]] = {}
+        self._index(root, (), None)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def get(self, path: Path) -> Mapping:
+        """
+        :param path: The path of a node.
+        :return: The node at the path.
+        :raise KeyError: When there is no node at the path.
+        """
+        return self._nodes[tuple(path)]
+
+    def path_of(self, node: Mapping) -> Path:
+        """
+        :param node: An indexed node.
+        :return: The path of the node (the first one in the order of the index when it has several).
+        :raise KeyError: When the node is not in the index.
+        """
+        paths = self._paths.get(id(node))
+        if not paths:
+            raise KeyError(f"{node!r} is not indexed")
+        return next(iter(paths))
+
+    def parent(self, node: Mapping|Path) -> Mapping|None:
+        """
+        :param node: An indexed node, or its path.
+        :return: The node containing it, or None for the top-level nodes.
+        """
+        path = self._path(node)
+        parent = self._parents[path]
+        return None if parent is None else self._nodes[parent]
+
+    def children(self, node: Mapping|Path = None) -> Iterator[Mapping]:
+        """
+        :param node: An indexed node, or its path. Defaults to None (the top-level nodes).
+        :return: The nodes directly nested in the node, in its children or attributes.
+        """
+        path = None if node is None else self._path(node)
+        return (self._nodes[child] for child in list(self._children.get(path, ())))
+
+    def by_tag(self, tag: str) -> Iterator[Mapping]:
+        """
+        :param tag: A tag.
+        :return: The nodes with the tag.
+        """
+        return (self._nodes[path] for path in list(self._tags.get(tag, ())))
+
+    def select(self, selector: str) -> Iterator[Mapping]:
+        """
+        Finds the nodes matching a selector (see :class:`TreeIndex`), in the order of the index: the order of the
+        tree, followed by the nodes of replaced subtrees.
+
+        :param selector: The selector, e.g. ``"html > div[class_=container]"``.
+        :return: An iterator of the matching nodes.
+        :raise ValueError: When the selector is invalid.
+        """
+        return (self._nodes[path] for path in self.select_paths(selector))
+
+    def select_paths(self, selector: str) -> Iterator[Path]:
+        """
+        Same as :meth:`select`, but returns the paths of the matching nodes.
+
+        :param selector: The selector.
+        :return: An iterator of the paths of the matching nodes.
+        :raise ValueError: When the selector is invalid.
+        """
+        steps = _parse_selector(selector)
+        # 先解析选择器，再返回生成器，使无效的选择器立即报错
+        return self._matching(list(self._candidates(steps[-1])), steps)
+
+    def replace(self, path: Path, value: Any) -> Any:
+        """
+        Replaces the value at a path of the tree (a node, a list of children, an attribute or a top-level variable)
+        and updates the index: the nodes of the old value are removed and the nodes of the new value are added,
+        other entries are kept as they are.
+
+        Lists and dictionaries containing the value are updated in place; tuples (e.g. the children of compact
+        nodes) are replaced by new tuples in turn. Values shared by several paths must not be replaced, e.g. the
+        read-only results of :func:`properpy.interning.intern_nodes`.
+
+        :param path: The path of the value to replace, ``()`` for the root.
+        :param value: The new value.
+        :return: The old value.
+        """
+        path = tuple(path)
+        old = self._lookup(path)
+        # 替换节点的标签或属性时，节点按新的值重新索引
+        owner = self._nodes.get(path[:-1]) if path else None
+        if owner is not None:
+            self._remove_keys(owner, path[:-1])
+        try:
+            if path:
+                self._assign(path, value)
+            else:
+                self.root = value
+        finally:
+            if owner is not None:
+                self._add_keys(owner, path[:-1])
+        parent = self._enclosing(path)
+        self._unindex(path, parent)
+        self._index(value, path, parent)
+        return old
+
+    def _path(self, node: Mapping|Path) -> Path:
+        return node if type(node) is tuple else self.path_of(node)
+
+    def _candidates(self, step: _Step):
+        """可能与步骤匹配的节点的路径：标签相同且第一个属性值相同的节点"""
+        if step.tag is None:
+            return self._nodes
+        for name, value in step.filters:
+            if value is not _PRESENT and _hashable(value):
+                return self._attribute(step.tag, name).get(value, ())
+        return self._tags.get(step.tag, ())
+
+    def _attribute(self, tag: str, name: str) -> dict[Any, dict[Path, None]]:
+        names = self._values.setdefault(tag, {})
+        values = names.get(name)
+        if values is None:
+            values = names[name] = {}
+            for path in self._tags.get(tag, ()):
+                node = self._nodes[path]
+                if name in node and _hashable(node[name]):
+                    values.setdefault(node[name], {})[path] = None
+        return values
+
+    def _matching(self, candidates: list, steps: tuple[_Step, ...]) -> Iterator[Path]:
+        last = len(steps) - 1
+        for path in candidates:
+            # 迭代期间替换的子树中的节点不再返回
+            if path in self._nodes and self._step_matches(path, steps[last]) and self._ancestors_match(path, steps, last):
+                yield path
+
+    def _step_matches(self, path: Path, step: _Step) -> bool:
+        node = self._nodes[path]
+        if step.tag is not None and node['tag'] != step.tag:
+            return False
+        for name, value in step.filters:
+            if name not in node or value is not _PRESENT and node[name] != value:
+                return False
+        return True
+
+    def _ancestors_match(self, path: Path, steps: tuple[_Step, ...], index: int) -> bool:
+        """路径上的节点与 steps[index] 匹配时，检查其祖先是否与之前的步骤匹配（带回溯）"""
+        if index == 0:
+            return True
+        child = steps[index].combinator == ">"
+        parent = self._parents[path]
+        while parent is not None:
+            if self._step_matches(parent, steps[index - 1]) and self._ancestors_match(parent, steps, index - 1):
+                return True
+            if child:
+                return False
+            parent = self._parents[parent]
+        return False
+
+    def _lookup(self, path: Path) -> Any:
+        value = self.root
+        for key in path:
+            value = value[key]
+        return value
+
+    def _assign(self, path: Path, value: Any):
+        container = self._lookup(path[:-1])
+        if type(container) is LazyNode:
+            container = container.materialize()
+        key = path[-1]
+        if type(container) is Node:
+            # 节点只读，由索引直接替换其中的值
+            if key == 'children':
+                container.children = value
+            elif key == 'tag':
+                container.tag = value
+            else:
+                try:
+                    position = container._names.index(key)
+                except ValueError:
+                    raise KeyError(key) from None
+                container._values = container._values[:position] + (value,) + container._values[position + 1:]
+        elif type(container) is tuple:
+            self._assign(path[:-1], container[:key] + (value,) + container[key + 1:])
+        else:
+            container[key] = value
+
+    def _enclosing(self, path: Path) -> Path|None:
+        """包含路径的最近的节点的路径"""
+        for length in range(len(path) - 1, -1, -1):
+            if path[:length] in self._nodes:
+                return path[:length]
+        return None
+
+    def _index(self, value: Any, path: Path, parent: Path|None):
+        """以显式栈按树的顺序索引值中的节点"""
+        stack = [(value, path, parent)]
+        push = stack.append
+        while stack:
+            item, path, parent = stack.pop()
+            kind = type(item)
+            if kind is LazyNode:
+                item = item.materialize()
+                kind = type(item)
+            if kind is Node:
+                self._add(item, path, parent)
+                items = [('children', item.children), *zip(item._names, item._values)]
+                parent = path
+            elif kind is list or kind is tuple:
+                items = enumerate(item)
+            elif isinstance(item, Mapping):
+                items = item.items()
+                if 'tag' in item and 'children' in item:
+                    self._add(item, path, parent)
+                    items = [(key, part) for key, part in items if key != 'tag']
+                    parent = path
+            else:
+                continue
+            # 倒序入栈，使节点按树的顺序出栈
+            for key, part in reversed(list(items)):
+                if type(part) not in _LEAVES:
+                    push((part, path + (key,), parent))
+
+    def _add(self, node: Mapping, path: Path, parent: Path|None):
+        self._nodes[path] = node
+        self._parents[path] = parent
+        self._children.setdefault(parent, []).append(path)
+        self._paths.setdefault(id(node), {})[path] = None
+        self._add_keys(node, path)
+
+    def _add_keys(self, node: Mapping, path: Path):
+        """按标签与属性值索引节点"""
+        self._tags.setdefault(node['tag'], {})[path] = None
+        names = self._values.get(node['tag'])
+        if names:
+            for name, values in names.items():
+                if name in node and _hashable(node[name]):
+                    values.setdefault(node[name], {})[path] = None
+
+    def _remove_keys(self, node: Mapping, path: Path):
+        tagged = self._tags[node['tag']]
+        del tagged[path]
+        if not tagged:
+            del self._tags[node['tag']]
+        names = self._values.get(node['tag'])
+        if names:
+            for name, values in names.items():
+                if name in node and _hashable(node[name]):
+                    bucket = values[node[name]]
+                    del bucket[path]
+                    if not bucket:
+                        del values[node[name]]
+
+    def _unindex(self, path: Path, parent: Path|None):
+        """移除路径下的所有节点：路径本身是节点时为该节点，否则为父节点中以该路径开头的子节点"""
+        siblings = self._children.get(parent, [])
+        size = len(path)
+        removed = [child for child in siblings if child[:size] == path]
+        if not removed:
+            return
+        self._children[parent] = [child for child in siblings if child[:size] != path]
+        while removed:
+            path = removed.pop()
+            node = self._nodes.pop(path)
+            del self._parents[path]
+            removed.extend(self._children.pop(path, ()))
+            self._remove_keys(node, path)
+            paths = self._paths[id(node)]
+            del paths[path]
+            if not paths:
+                del self._paths[id(node)]
+
+
+# 不含节点的常见类型，索引时直接跳过
+_LEAVES = frozenset((type(None), bool, int, float, str, bytes))
+
+def _hashable(value: Any) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
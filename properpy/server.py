@@ -0,0 +1,382 @@
+import errno
+import marshal
+import os
+import pickle
+import socket
+import socketserver
+import struct
+import threading
+from os import PathLike
+from os.path import isfile
+from typing import BinaryIO, TYPE_CHECKING
+
+from properpy.artifact import dump_artifact, loads_artifact
+from properpy.cache import (Dependency, ResultCache, load_program, module_dependencies, reload_changed_modules,
+                            result_key, track_modules)
+from properpy.library import _parse_compact, _warm_parser
+from properpy.module_guard import ModuleTag
+from properpy.validation import DEFERRED, EAGER, validate_components
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+# 请求格式版本，请求的字段改变时递增
+PROTOCOL = 1
+
+# 请求：长度 + marshal 编码的请求元组；响应：状态、长度 + 产物编码的结果或 pickle 编码的异常
+_LENGTH = struct.Struct("<I")
+_RESPONSE = struct.Struct("<BI")
+_OK = 0
+_ERROR = 1
+
+
+def _read_exactly(stream, size: int) -> bytes|None:
+    """读取 size 个字节；连接在消息开始之前关闭时返回 None"""
+    data = stream.read(size)
+    if len(data) == size:
+        return data
+    if not data:
+        return None
+    chunks = [data]
+    size -= len(data)
+    while size:
+        chunk = stream.read(size)
+        if not chunk:
+            raise ConnectionError("connection closed in the middle of a message")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _evaluate(
+        file_path: str|None,
+        source: str|None,
+        supported_modules: tuple[str, ...],
+        supported_builtin_modules: tuple[ModuleTag, ...],
+        module_paths: tuple[str, ...],
+        static: bool,
+        compact: bool,
+        validate: str|None,
+        intern: bool,
+        reload_modules: bool
+) -> tuple[bytes, tuple[Dependency, ...]]:
+    """在工作进程（或服务进程的线程）中解析配置，返回产物编码的结果与其依赖的模块（见 library._parse_tracked）"""
+    if reload_modules and reload_changed_modules(module_paths):
+        # 已预热的解析器中加载了旧模块的名称
+        _warm_parser.cache_clear()
+    parser = _warm_parser(supported_modules, supported_builtin_modules, module_paths)
+    code = load_program(file_path, parser) if file_path is not None else source
+    if validate is not None:
+        with validate_components(deferred=validate == DEFERRED):
+            result, modules = _parse_compact(parser, code, static, compact, intern=intern)
+    else:
+        result, modules = _parse_compact(parser, code, static, compact, intern=intern)
+    return dump_artifact(result), track_modules(modules, module_dependencies(modules))
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """一个客户端连接：依次处理连接上的请求，直到客户端关闭连接"""
+    def setup(self):
+        super().setup()
+        with self.server.connections_lock:
+            self.server.connections.add(self.request)
+
+    def finish(self):
+        with self.server.connections_lock:
+            self.server.connections.discard(self.request)
+        super().finish()
+
+    def handle(self):
+        while True:
+            header = _read_exactly(self.rfile, _LENGTH.size)
+            if header is None:
+                return
+            data = _read_exactly(self.rfile, _LENGTH.unpack(header)[0])
+            try:
+                status, payload = _OK, self.server.parse_server._respond(data)
+            except Exception as e:
+                status, payload = _ERROR, _dump_error(e)
+            self.wfile.write(_RESPONSE.pack(status, len(payload)) + payload)
+
+def _dump_error(error: Exception) -> bytes:
+    try:
+        return pickle.dumps(error, pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        # 无法序列化的异常：只传递类型与消息
+        return pickle.dumps(RuntimeError(f"{type(error).__name__}: {error}"), pickle.HIGHEST_PROTOCOL)
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    parse_server: "ParseServer"
+
+    def __init__(self, path: str):
+        super().__init__(path, _Handler)
+        self.connections: set[socket.socket] = set()  # 打开的客户端连接
+        self.connections_lock = threading.Lock()
+
+    def close_connections(self):
+        """关闭所有客户端连接，正在处理的请求完成后其线程退出"""
+        with self.connections_lock:
+            connections = list(self.connections)
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class ParseServer:
+    """
+    A long-running parse daemon listening on a Unix socket, so that short-lived processes get parse results without
+    paying the interpreter startup and the import of the whitelisted modules (see ``properpy serve`` and the
+    ``server`` parameter of :func:`properpy.parse_config`).
+
+    Configurations are parsed by a pool of worker processes, each keeping one warm parser per whitelist and the
+    modules it imported. Results are kept in a :class:`properpy.cache.ResultCache` in the artifact encoding (see
+    :func:`properpy.artifact.dump_artifact`), which is also the form sent to the clients, so a request for an
+    unchanged configuration only reads and hashes its source. A schema or helper module changed on disk is reloaded
+    by the workers before their next parse, unless ``cache`` is created with ``reload_modules=False``: with no
+    worker processes, the modules are reloaded in the server process.
+
+    Results must be storable in an artifact, and receivers of ``config_wrapper`` are called in the worker processes.
+    Requests are not authenticated: the socket is created readable and writable by its owner only.
+
+    Example::
+
+        with ParseServer("/tmp/properpy.sock"):
+            ...
+        # 其他进程中
+        result = parse_config("config.proper.py", ["config_schema"], server="/tmp/properpy.sock")
+
+    :param path: The path of the Unix socket. A stale socket file left by a stopped server is replaced.
+    :param workers: The number of worker processes. Defaults to None (the number of CPUs). With 0, configurations
+                    are parsed in threads of the server process.
+    :param cache: The cache of results. Defaults to None (a new in-memory cache of 1024 results reloading changed
+                  modules).
+    """
+    def __init__(self, path: str|PathLike[str], workers: int = None, cache: ResultCache = None):
+        self.path = os.fspath(path)
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.cache = cache if cache is not None else ResultCache(maxsize=1024, reload_modules=True)
+        self._server: _UnixServer|None = None
+        self._executor: "Executor|None" = None
+        self._executor_lock = threading.Lock()
+        self._thread: threading.Thread|None = None
+        self._serving = False
+
+    def start(self):
+        """Binds the socket and serves requests in a background thread."""
+        if self._server is None:
+            self._bind()
+            self._serving = True
+            self._thread = threading.Thread(target=self._server.serve_forever, name="properpy-server", daemon=True)
+            self._thread.start()
+
+    def serve_forever(self):
+        """Binds the socket and serves requests in the current thread until :meth:`close` is called."""
+        self._bind()
+        self._serving = True
+        self._server.serve_forever()
+
+    def close(self):
+        """Stops serving, stops the worker processes and removes the socket file."""
+        server, self._server = self._server, None
+        if server is None:
+            return
+        if self._serving:
+            # serve_forever 已经因异常退出时立即返回
+            server.shutdown()
+            self._serving = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        server.server_close()
+        server.close_connections()
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def __enter__(self) -> "ParseServer":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _bind(self):
+        if os.path.exists(self.path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+            except OSError:
+                # 已停止的服务留下的套接字文件
+                os.unlink(self.path)
+            else:
+                raise OSError(errno.EADDRINUSE, f"A server is already listening on {self.path}")
+            finally:
+                probe.close()
+        # 创建时即只允许所有者访问，不留下权限更宽的时间窗口
+        umask = os.umask(0o177)
+        try:
+            server = _UnixServer(self.path)
+        finally:
+            os.umask(umask)
+        server.parse_server = self
+        self._server = server
+
+    def _respond(self, data: bytes) -> bytes:
+        request = marshal.loads(data)
+        if request[0] != PROTOCOL:
+            raise ValueError(f"Unsupported request protocol {request[0]!r}, the server speaks {PROTOCOL}")
+        (_, file_path, source, supported_modules, builtin_names, module_paths, static, compact, validate,
+         intern) = request
+        supported_builtin_modules = tuple(ModuleTag[name] for name in builtin_names)
+        if file_path is not None:
+            if not isfile(file_path):
+                raise FileNotFoundError(f"No such configuration file: {file_path!r}")
+            with open(file_path, "rb") as file:
+                source_bytes = file.read()
+        else:
+            source_bytes = source.encode()
+
+        parser = _warm_parser(supported_modules, supported_builtin_modules, module_paths)
+        key = result_key(source_bytes, parser, compact, validate, intern)
+        payload = self.cache.get(key)
+        if payload is not None:
+            return payload
+        args = (file_path, source, supported_modules, supported_builtin_modules, module_paths, static, compact,
+                validate, intern, self.cache.reload_modules)
+        if self.workers == 0:
+            payload, dependencies = _evaluate(*args)
+        else:
+            payload, dependencies = self._submit(args)
+        self.cache.put(key, payload, dependencies)
+        return payload
+
+    def _submit(self, args: tuple) -> tuple[bytes, tuple[Dependency, ...]]:
+        # 进程池只在服务进程中导入
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.workers)
+            executor = self._executor
+        try:
+            return executor.submit(_evaluate, *args).result()
+        except BrokenProcessPool:
+            # 工作进程异常退出（如被操作系统终止）：之后的请求使用新的进程池
+            with self._executor_lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False)
+            raise
+
+
+# 每个线程到每个服务的连接，连同建立连接的进程号（fork 后的子进程不共用父进程的连接）
+_connections = threading.local()
+
+def _connection(path: str) -> tuple[socket.socket, BinaryIO, bool]:
+    """线程到服务的连接、它的读取流，以及它是否是复用的连接"""
+    pool = getattr(_connections, "pool", None)
+    if pool is None or _connections.pid != os.getpid():
+        pool = _connections.pool = {}
+        _connections.pid = os.getpid()
+    connection = pool.get(path)
+    if connection is not None:
+        return *connection, True
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(path)
+    except OSError:
+        client.close()
+        raise
+    connection = pool[path] = (client, client.makefile("rb"))
+    return *connection, False
+
+def _disconnect(path: str):
+    client, reader = _connections.pool.pop(path)
+    reader.close()
+    client.close()
+
+def close_connections(server: str|PathLike[str] = None):
+    """
+    Closes the connections that the current thread keeps open to a server (see :func:`parse_on_server`). The next
+    request of the thread opens a new connection.
+
+    :param server: The path of the Unix socket of the server. Defaults to None (every server).
+    """
+    pool = getattr(_connections, "pool", None)
+    if not pool:
+        return
+    for path in list(pool) if server is None else [os.fspath(server)]:
+        if path in pool:
+            _disconnect(path)
+
+def parse_on_server(
+        server: str|PathLike[str],
+        file_path_or_code: str|PathLike[str],
+        supported_modules: list[str] = None,
+        supported_builtin_modules: list[ModuleTag] = None,
+        module_paths: list[str] = None,
+        static: bool = False,
+        compact: bool = False,
+        validate: str = None,
+        intern: bool = False
+) -> dict:
+    """
+    Parses a configuration with a :class:`ParseServer`, as :func:`properpy.parse_config` does with ``server``.
+
+    File paths and module paths are resolved against the current directory before they are sent. Each thread keeps
+    one connection to each server open between requests (see :func:`close_connections`).
+
+    :param server: The path of the Unix socket of the server.
+    :param file_path_or_code: The configuration file path or the code string to be parsed.
+    :param supported_modules: A list of module names to register with the parser. Defaults to None.
+    :param supported_builtin_modules: A list of built-in module tags to register with the parser. Defaults to None.
+    :param module_paths: A list of additional paths to search for modules during parsing. Defaults to None (the
+                         current directory).
+    :param static: See :func:`properpy.parse_config`. Defaults to False.
+    :param compact: See :func:`properpy.parse_config`. Defaults to False.
+    :param validate: See :func:`properpy.parse_config`. Defaults to None.
+    :param intern: See :func:`properpy.parse_config`. Defaults to False.
+    :return: A dictionary containing the parsed configuration data.
+    :raises OSError: When the server cannot be reached.
+    """
+    if validate not in (None, EAGER, DEFERRED):
+        raise ValueError(f"validate must be None, {EAGER!r} or {DEFERRED!r}, not {validate!r}")
+    is_file = isinstance(file_path_or_code, (str, PathLike)) and isfile(file_path_or_code)
+    request = marshal.dumps((
+        PROTOCOL,
+        os.path.abspath(file_path_or_code) if is_file else None,
+        None if is_file else file_path_or_code,
+        tuple(supported_modules or ()),
+        tuple(tag.name for tag in supported_builtin_modules or ()),
+        tuple(os.path.abspath(path) for path in module_paths or ["."]),
+        static, compact, validate, intern
+    ))
+    message = _LENGTH.pack(len(request)) + request
+    path = os.fspath(server)
+    while True:
+        client, reader, reused = _connection(path)
+        try:
+            client.sendall(message)
+            header = _read_exactly(reader, _RESPONSE.size)
+            if header is None:
+                raise ConnectionError(f"The server on {path} closed the connection")
+            status, length = _RESPONSE.unpack(header)
+            payload = _read_exactly(reader, length) if length else b""
+        except OSError:
+            _disconnect(path)
+            if reused:
+                # 服务重启后，复用的连接已失效：重新连接一次
+                continue
+            raise
+        break
+    if status == _ERROR:
+        raise pickle.loads(payload)
+    return loads_artifact(payload, lazy=False, verify=False)
@@ -0,0 +1,204 @@
+import os
+import struct
+import threading
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any
+
+from properpy.artifact import ArtifactError, _HEADER, _Reader, dump_artifact
+
+SHARED_MAGIC = b"PPYS"
+# 控制段：魔数、保留、当前代数（0 表示尚未发布）
+_CONTROL = struct.Struct("<4sIQ")
+
+_attach_lock = threading.Lock()
+
+
+def _segment_name(name:str, generation:int)->str:
+    return f"{name}.{generation}"
+
+def _attach(name:str)->SharedMemory:
+    """附加到已有的共享内存段，且不登记到 resource_tracker：否则附加的进程退出时会删除发布者的共享内存"""
+    try:
+        return SharedMemory(name, track=False)
+    except TypeError:
+        # Python 3.13 之前没有 track 参数
+        pass
+    with _attach_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args: None
+        try:
+            return SharedMemory(name)
+        finally:
+            resource_tracker.register = register
+
+
+class _Segment:
+    """一代配置所在的共享内存段，在最后一个视图被回收时关闭"""
+    def __init__(self, name:str):
+        memory = _attach(name)
+        length = _HEADER.unpack_from(memory.buf, 0)[-1]
+        # 共享内存的大小可能按页取整，只取产物本身
+        self.buffer = memory.buf[:_HEADER.size + length]
+        self.memory = memory
+
+    def __del__(self):
+        memory = getattr(self, "memory", None)
+        if memory is not None:
+            self.buffer.release()
+            memory.close()
+
+
+class SharedConfig:
+    """
+    Publishes parse results to shared memory, so that every worker process reads one copy of the configuration
+    instead of holding its own.
+
+    Every call to :meth:`publish` writes the value in the artifact encoding (see
+    :func:`properpy.artifact.write_artifact`) to a new shared memory segment, then switches the current generation
+    in a small control segment named ``name``. Workers read it through :class:`SharedConfigReader`, which picks up
+    a new generation without restarting them. A segment is unlinked when the next generation is published; workers
+    still holding views of it keep their mapping until they drop them.
+
+    It lives in :mod:`properpy.shared`, which is not imported by ``import properpy`` so that processes that do
+    not use it do not import :mod:`multiprocessing`.
+
+    Example::
+
+        from properpy.shared import SharedConfig, SharedConfigReader
+
+        # 主进程
+        shared = SharedConfig("app-config")
+        shared.publish(parse_config("config.proper.py", ["config_schema"]))
+
+        # 各工作进程
+        reader = SharedConfigReader("app-config")
+        config = reader.get()  # 当前代的只读视图
+
+    :param name: The name of the control segment, which workers attach to. Defaults to a random name.
+    """
+    def __init__(self, name:str = None):
+        self._control = SharedMemory(name, create=True, size=_CONTROL.size)
+        _CONTROL.pack_into(self._control.buf, 0, SHARED_MAGIC, 0, 0)
+        self._segment: SharedMemory|None = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    @property
+    def name(self)->str:
+        """The name to pass to :class:`SharedConfigReader`."""
+        return self._control.name
+
+    @property
+    def generation(self)->int:
+        """The number of the current generation, 0 before the first :meth:`publish`."""
+        return self._generation
+
+    def publish(self, value:Any)->int:
+        """
+        Publishes a new generation of the configuration.
+
+        :param value: The value to publish, typically a parse result. See
+                      :func:`properpy.artifact.write_artifact` for the supported values.
+        :return: The number of the new generation.
+        :raises TypeError: When the value contains an object that cannot be stored.
+        """
+        data = dump_artifact(value)
+        with self._lock:
+            generation = self._generation + 1
+            segment = SharedMemory(_segment_name(self.name, generation), create=True, size=len(data))
+            segment.buf[:len(data)] = data
+            # 新的一代写入完成后才切换，工作进程看到的总是完整的一代
+            _CONTROL.pack_into(self._control.buf, 0, SHARED_MAGIC, 0, generation)
+            previous, self._segment, self._generation = self._segment, segment, generation
+        if previous is not None:
+            previous.close()
+            previous.unlink()
+        return generation
+
+    def close(self):
+        """Unlinks the control segment and the current generation. Attached workers keep their current views."""
+        if os.getpid() != self._pid:
+            # fork 出的子进程不拥有共享内存
+            return
+        with self._lock:
+            segments = [self._control] + ([self._segment] if self._segment is not None else [])
+            self._segment = None
+        for segment in segments:
+            segment.close()
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self)->"SharedConfig":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class SharedConfigReader:
+    """
+    Reads the configuration published by a :class:`SharedConfig`, typically from a worker process.
+
+    :meth:`get` returns read-only :class:`~collections.abc.Mapping` and :class:`~collections.abc.Sequence` views
+    (see :func:`properpy.artifact.load_artifact`) that decode items directly from the shared memory when they are
+    accessed. Checking for a new generation costs one read of the control segment, so :meth:`get` can be called
+    for every request.
+
+    :param name: The name of the :class:`SharedConfig`.
+    """
+    def __init__(self, name:str):
+        self.name = name
+        self._control = _attach(name)
+        magic, _, _ = _CONTROL.unpack_from(self._control.buf, 0)
+        if magic != SHARED_MAGIC:
+            self._control.close()
+            raise ArtifactError(f"Shared memory {name} is not a properpy configuration")
+        self._generation = 0
+        self._value = None
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self)->int:
+        """The generation currently published, which the next :meth:`get` returns."""
+        return _CONTROL.unpack_from(self._control.buf, 0)[2]
+
+    def get(self)->Any:
+        """
+        Returns the current generation of the configuration, attaching to it when it changed since the last call.
+        Views returned by earlier calls stay valid and keep showing their own generation.
+
+        :return: The published value.
+        :raises LookupError: When nothing has been published yet.
+        """
+        while True:
+            generation = self.generation
+            if generation == 0:
+                raise LookupError(f"No configuration published to {self.name}")
+            if generation == self._generation:
+                return self._value
+            with self._lock:
+                if generation == self._generation:
+                    return self._value
+                try:
+                    segment = _Segment(_segment_name(self.name, generation))
+                except FileNotFoundError:
+                    # 读取代数后又发布了新的一代，旧的一代已被删除
+                    continue
+                reader = _Reader(segment.buffer, verify=False, owner=segment)
+                self._value = reader.value(reader.root)
+                self._generation = generation
+                return self._value
+
+    def close(self):
+        """Detaches from the control segment. Views already returned stay valid."""
+        self._control.close()
+
+    def __enter__(self)->"SharedConfigReader":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
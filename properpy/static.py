@@ -0,0 +1,456 @@
+import ast
+import builtins
+import importlib.util
+import inspect
+import operator
+import os
+import sys
+import textwrap
+from copy import copy
+from functools import lru_cache
+from types import ModuleType
+from typing import Callable, NamedTuple, Any
+from weakref import WeakKeyDictionary
+
+import properpy
+from properpy.budget import uninterruptible
+from properpy.compiler import Collector, RUNTIME_NAME
+from properpy.library import attrs, component
+from properpy.parser import Parser, _current_context, module_search_paths
+from properpy.validation import _validation
+
+# 无法静态确定的值
+_UNKNOWN = object()
+
+class _Callable(NamedTuple):
+    """可以静态调用的函数：attrs，或函数体为空的组件"""
+    function: Callable
+
+_UNARY = {
+    ast.UAdd: operator.pos, ast.USub: operator.neg, ast.Not: operator.not_, ast.Invert: operator.invert,
+}
+_BINARY = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.MatMult: operator.matmul,
+    ast.Div: operator.truediv, ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+    ast.LShift: operator.lshift, ast.RShift: operator.rshift,
+    ast.BitOr: operator.or_, ast.BitXor: operator.xor, ast.BitAnd: operator.and_,
+}
+
+# 出现这些名称的模块可能动态修改自身的命名空间，无法静态扫描
+_DYNAMIC_NAMES = frozenset({"globals", "locals", "vars", "exec", "eval", "setattr", "delattr", "__import__"})
+# 模块执行时由导入系统设置的名称
+_MODULE_NAMES = ("__name__", "__doc__", "__package__", "__loader__", "__spec__", "__file__", "__cached__")
+
+
+class StaticEvaluator:
+    """
+    Evaluates a configuration from its syntax tree, without executing it, as far as the result can be proven.
+
+    Literals, containers, operators, names bound by earlier imports, ``attrs(...)`` and calls of components
+    whose body is empty (only ``pass``, ``...`` or a docstring) are evaluated directly, since the result of such a
+    component only depends on its name, its signature and its arguments. Components of modules that are not
+    imported yet are read from their source (see :func:`scan_module`), so the modules are not imported either.
+    While components are validated (see :func:`properpy.validation.validate_components`), such modules are imported,
+    so that every call is checked against the annotations of the real component.
+
+    Any other subtree, e.g. a call of a function or of a ``config_wrapper`` component, is evaluated in the sandbox
+    like :meth:`Parser.parse` does: the sandbox namespace is created the first time it is needed, and the imports
+    seen so far are replayed into it. The result is the same as the result of :meth:`Parser.parse`.
+
+    Example::
+
+        parser = Parser()
+        parser.register_module("config_schema")
+        result = StaticEvaluator(parser, code).evaluate()  # 等价于 parser.parse(code, static=True)
+
+    :param parser: The parser providing the whitelist, the module paths and the registered variables.
+    :param source: The source code of the configuration.
+    :param names: The free names of the code (see :func:`properpy.parser.free_names`).
+    :param filename: The file name used in tracebacks. Defaults to "<string>".
+    """
+    def __init__(self, parser:Parser, source:str, names:tuple[str, ...], filename:str = "<string>"):
+        self.parser = parser
+        self.source = source
+        self.names = frozenset(names)
+        self.filename = filename
+        self.collector = Collector()
+        self.namespace: dict|None = None  # 沙箱命名空间，首次需要时才创建
+        self._env: dict[str, Any] = {}  # 创建命名空间之前，静态已知的名称
+        self._effects: list[ast.stmt] = []  # 创建命名空间时需要重放的导入
+        self._modules: dict[str, tuple[dict|None, ModuleType|None]] = {}  # 模块名 -> (静态名称, 模块)
+
+    def evaluate(self) -> dict:
+        """
+        Evaluates every top-level statement.
+
+        :return: A dictionary representing the parsed structure of the code.
+        """
+        for node in ast.parse(self.source, self.filename).body:
+            self._statement(node)
+        return self.collector.result()
+
+    def _statement(self, node: ast.stmt):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            self._import(node)
+        elif isinstance(node, (ast.Assign, ast.Expr)):
+            try:
+                value = self._value(node.value)
+            except Collector.Error as e:
+                value = self.collector.error(e)
+            if isinstance(node, ast.Assign):
+                # 与 compile_module 相同：赋值只报告值，不绑定名称
+                self.collector.assign(tuple(target.id for target in node.targets if isinstance(target, ast.Name)),
+                                      value)
+            else:
+                self.collector.expr(value)
+
+    def _value(self, node: ast.expr) -> Any:
+        """求值表达式：能证明结果的部分直接计算，其余子树在沙箱中求值"""
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.Name):
+            value = self._lookup(node.id)
+            if value is not _UNKNOWN and not isinstance(value, _Callable):
+                return value
+        elif isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+            if not any(isinstance(element, ast.Starred) for element in node.elts):
+                values = [self._value(element) for element in node.elts]
+                return values if isinstance(node, ast.List) else tuple(values) if isinstance(node, ast.Tuple) else set(values)
+        elif isinstance(node, ast.Dict):
+            if None not in node.keys:
+                items = [(self._value(key), self._value(value)) for key, value in zip(node.keys, node.values)]
+                return dict(items)
+        elif isinstance(node, ast.UnaryOp):
+            return _UNARY[type(node.op)](self._value(node.operand))
+        elif isinstance(node, ast.BinOp):
+            left = self._value(node.left)
+            return _BINARY[type(node.op)](left, self._value(node.right))
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            function = self._lookup(node.func.id)
+            if (isinstance(function, _Callable)
+                    and not any(isinstance(arg, ast.Starred) for arg in node.args)
+                    and all(keyword.arg is not None for keyword in node.keywords)):
+                args = [self._value(arg) for arg in node.args]
+                kwargs = {keyword.arg: self._value(keyword.value) for keyword in node.keywords}
+                return function.function(*args, **kwargs)
+        # 无法证明结果的子树
+        expression = ast.Expression(body=node)
+        return eval(compile(expression, self.filename, "eval", dont_inherit=True), self._namespace())
+
+    def _lookup(self, name: str) -> Any:
+        """查找名称的值，可调用的组件包装为 _Callable，无法确定时返回 _UNKNOWN"""
+        if self.namespace is not None:
+            return _classify(self.namespace[name]) if name in self.namespace else _UNKNOWN
+        if name not in self._env:
+            # 在绑定之前被引用的名称会在沙箱中引发 NameError
+            self._env[name] = self._resolve_free(name) if name in self.names else _UNKNOWN
+        return self._env[name]
+
+    def _resolve_free(self, name: str) -> Any:
+        """与 Parser._warm_names 相同的查找顺序，但不导入尚未加载的模块"""
+        base = self.parser.sandbox.__dict__
+        if name in base:
+            return _classify(base[name])
+        if hasattr(builtins, name) or name in self.parser.module_registry:
+            return _UNKNOWN
+        for module_name in self.parser._probe_order():
+            bindings = self._module_bindings(module_name, record=False)
+            if bindings is None:
+                # 需要导入模块才能确定
+                if self._find_spec(module_name) is None:
+                    continue
+                return _UNKNOWN
+            if name in bindings:
+                self._module_bindings(module_name)
+                return bindings[name]
+        return _UNKNOWN
+
+    def _import(self, node: ast.Import|ast.ImportFrom):
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        else:
+            modules = [node.module or ""]
+        for name in modules:
+            if name not in self.parser.module_registry:
+                raise ImportError(f"Module {name} is not allowed")
+
+        bindings = [self._module_bindings(name) for name in modules] if self.namespace is None else [None]
+        if isinstance(node, ast.ImportFrom) and (node.level or any(
+                binding is not None and alias.name != "*" and alias.name not in binding
+                for binding in bindings for alias in node.names)):
+            bindings = [None]
+        if isinstance(node, ast.ImportFrom) and bindings[0] is not None and node.names[0].name == "*":
+            bindings = [_star_bindings(bindings[0])]
+        if None in bindings:
+            # 无法静态确定导入的结果，实际执行导入
+            self._exec(node)
+            return
+
+        for alias in node.names:
+            if isinstance(node, ast.Import):
+                self._env[(alias.asname or alias.name).partition(".")[0]] = _UNKNOWN
+            elif alias.name == "*":
+                self._env.update(bindings[0])
+            else:
+                self._env[alias.asname or alias.name] = bindings[0][alias.name]
+        self._effects.append(node)
+
+    def _module_bindings(self, name: str, record: bool = True) -> dict[str, Any]|None:
+        """
+        静态得到模块导入后注入命名空间的名称：已导入的模块直接读取，否则扫描源码。
+        校验组件时（见 properpy.validation）扫描得到的组件没有注解，因此改为导入模块，调用真实的组件。
+        record 为真时将模块记录为本次解析的依赖。
+        """
+        if name not in self._modules:
+            module = sys.modules.get(name)
+            if module is None and _validation.get() is not None:
+                with uninterruptible(), module_search_paths(self.parser.module_paths):
+                    module = self.parser._import(name)
+            if module is not None:
+                bindings = {key: _classify(value) for key, value in module.__dict__.items() if key != "__builtins__"}
+            else:
+                spec = self._find_spec(name)
+                if spec is None or spec.origin is None or not spec.origin.endswith(".py"):
+                    bindings = None
+                else:
+                    bindings = scan_module(spec.origin)
+                    # 未执行的模块对象，仅用于记录依赖的源文件
+                    module = importlib.util.module_from_spec(spec)
+            self._modules[name] = (bindings, module)
+
+        bindings, module = self._modules[name]
+        context = _current_context.get()
+        if record and bindings is not None and context is not None:
+            context.modules[name] = module
+        return bindings
+
+    def _find_spec(self, name: str):
+        if "." in name:
+            return None
+        try:
+            with module_search_paths(self.parser.module_paths):
+                return importlib.util.find_spec(name)
+        except (ImportError, ValueError):
+            return None
+
+    def _exec(self, node: ast.stmt):
+        module = ast.Module(body=[node], type_ignores=[])
+        exec(compile(module, self.filename, "exec", dont_inherit=True), self._namespace())
+
+    def _namespace(self) -> dict:
+        """创建沙箱命名空间，并按顺序重放此前静态处理的导入"""
+        if self.namespace is None:
+            self.namespace = self.parser._warm_names(self.names)
+            self.namespace[RUNTIME_NAME] = self.collector
+            effects, self._effects = self._effects, []
+            for effect in effects:
+                self._exec(effect)
+        return self.namespace
+
+
+def _star_bindings(bindings: dict[str, Any]) -> dict[str, Any]|None:
+    """
+    from m import * 导入的名称：m 定义了 __all__ 时只导入其中列出的名称，否则导入不以下划线开头的名称。
+    __all__ 无法静态确定、或列出了模块中没有的名称（例如未导入的子模块）时返回 None。
+    """
+    if "__all__" not in bindings:
+        return {key: value for key, value in bindings.items() if not key.startswith("_")}
+    names = bindings["__all__"]
+    if not isinstance(names, (list, tuple)) or not all(isinstance(name, str) and name in bindings for name in names):
+        return None
+    return {name: bindings[name] for name in names}
+
+
+# 已检查过的组件 -> 是否可以静态调用
+_pure_components: WeakKeyDictionary[Callable, bool] = WeakKeyDictionary()
+
+def _classify(value: Any) -> Any:
+    """attrs 与函数体为空的组件可以静态调用，其余的值原样使用"""
+    if value is attrs:
+        return _Callable(attrs)
+    if callable(value) and _is_pure_component(value):
+        return _Callable(value)
+    return value
+
+def _is_pure_component(function: Callable) -> bool:
+    """由 component 装饰、且原函数的函数体为空"""
+    if "_call_plan" not in getattr(function, "__dict__", {}) or not hasattr(function, "__wrapped__"):
+        return False
+    try:
+        return _pure_components[function]
+    except (KeyError, TypeError):
+        pass
+    try:
+        source = textwrap.dedent(inspect.getsource(function.__wrapped__))
+        node = ast.parse(source).body[0]
+        pure = isinstance(node, ast.FunctionDef) and _is_pure_body(node.body)
+    except (OSError, TypeError, SyntaxError, IndexError):
+        pure = False
+    try:
+        _pure_components[function] = pure
+    except TypeError:
+        pass
+    return pure
+
+def _is_pure_body(body: list[ast.stmt]) -> bool:
+    return all(isinstance(statement, ast.Pass)
+               or (isinstance(statement, ast.Expr) and isinstance(statement.value, ast.Constant))
+               for statement in body)
+
+
+def scan_module(file_path:str|os.PathLike[str]) -> dict[str, Any]|None:
+    """
+    Statically reads the names a module defines, without importing it. Functions decorated with
+    ``properpy.component`` whose body is empty are replaced by components with the same name and signature, and
+    ``attrs`` imported from properpy is kept; any other name is marked as unknown.
+
+    The result is cached until the file changes.
+
+    :param file_path: The path of the module source file.
+    :return: A dictionary of the names the module defines, or None if the module modifies its namespace
+             dynamically (star imports of other modules, ``globals()``, ``setattr`` ...) and cannot be scanned.
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return _scan_source(os.fspath(file_path), stat.st_mtime_ns, stat.st_size)
+
+@lru_cache(maxsize=256)
+def _scan_source(file_path: str, mtime_ns: int, size: int) -> dict[str, Any]|None:
+    try:
+        with open(file_path, "rb") as file:
+            tree = ast.parse(importlib.util.decode_source(file.read()), file_path)
+    except (OSError, SyntaxError, ValueError):
+        return None
+
+    top_level = {id(node) for node in tree.body}
+    global_names = set()
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Name) and node.id in _DYNAMIC_NAMES
+                or isinstance(node, ast.Attribute) and node.attr == "__dict__"
+                or isinstance(node, ast.FunctionDef) and node.name == "__getattr__"):
+            return None
+        if isinstance(node, ast.ImportFrom) and id(node) not in top_level and any(a.name == "*" for a in node.names):
+            return None
+        if isinstance(node, ast.Global):
+            global_names.update(node.names)
+
+    env: dict[str, Any] = {name: _UNKNOWN for name in _MODULE_NAMES}
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom):
+            source = sys.modules.get(node.module) if node.level == 0 and node.module in ("properpy", "properpy.library") else None
+            for alias in node.names:
+                if alias.name == "*":
+                    names = _star_bindings(vars(source)) if source is not None else None
+                    if names is None:
+                        return None
+                    env.update(names)
+                elif source is not None:
+                    if not hasattr(source, alias.name):
+                        return None
+                    env[alias.asname or alias.name] = getattr(source, alias.name)
+                else:
+                    env[alias.asname or alias.name] = _UNKNOWN
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name == "properpy" and alias.asname is None:
+                    env["properpy"] = properpy
+                else:
+                    env[alias.asname or alias.name.partition(".")[0]] = _UNKNOWN
+        elif isinstance(node, ast.FunctionDef):
+            env[node.name] = _scan_component(node, env, file_path)
+        else:
+            for name in _bound_names(node):
+                env[name] = _UNKNOWN
+            if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                    and isinstance(node.targets[0], ast.Name) and node.targets[0].id == "__all__"):
+                # 记录字面量形式的 __all__，供 from m import * 使用
+                try:
+                    names = ast.literal_eval(node.value)
+                except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+                    names = None
+                if isinstance(names, (list, tuple)) and all(isinstance(name, str) for name in names):
+                    env["__all__"] = list(names)
+    for name in global_names:
+        env[name] = _UNKNOWN
+
+    return {name: value if value is _UNKNOWN or isinstance(value, _Callable) else _classify(value)
+            for name, value in env.items()}
+
+def _scan_component(node: ast.FunctionDef, env: dict[str, Any], filename: str) -> Any:
+    """由 component 装饰、函数体为空、且定义时不会出错的函数，替换为参数签名相同的组件"""
+    if len(node.decorator_list) != 1 or not _is_pure_body(node.body):
+        return _UNKNOWN
+    decorator = node.decorator_list[0]
+    if isinstance(decorator, ast.Name):
+        target = env.get(decorator.id)
+    elif isinstance(decorator, ast.Attribute) and isinstance(decorator.value, ast.Name):
+        module = env.get(decorator.value.id)
+        target = getattr(module, decorator.attr, None) if isinstance(module, ModuleType) else None
+    else:
+        target = None
+    if target is not component:
+        return _UNKNOWN
+
+    # 默认值与注解在定义函数时求值，只允许引用已定义的名称
+    arguments = node.args
+    evaluated = [*arguments.defaults, *filter(None, arguments.kw_defaults), *filter(None, [node.returns])]
+    for arg in [*arguments.posonlyargs, *arguments.args, *arguments.kwonlyargs, arguments.vararg, arguments.kwarg]:
+        if arg is not None and arg.annotation is not None:
+            evaluated.append(arg.annotation)
+    for expression in evaluated:
+        for child in ast.walk(expression):
+            if isinstance(child, (ast.Call, ast.NamedExpr, ast.Await, ast.Yield, ast.YieldFrom)):
+                return _UNKNOWN
+            if isinstance(child, ast.Name) and child.id not in env and not hasattr(builtins, child.id):
+                return _UNKNOWN
+    return _Callable(component(_stub(node, filename)))
+
+def _stub(node: ast.FunctionDef, filename: str) -> Callable:
+    """参数签名与原函数相同、函数体为空的函数，默认值替换为 None，不含注解"""
+    def strip(arg: ast.arg|None) -> ast.arg|None:
+        return ast.arg(arg=arg.arg) if arg is not None else None
+    arguments = node.args
+    stub = copy(node)
+    stub.decorator_list = []
+    stub.returns = None
+    stub.body = [ast.Pass()]
+    stub.args = ast.arguments(
+        posonlyargs=[strip(arg) for arg in arguments.posonlyargs],
+        args=[strip(arg) for arg in arguments.args],
+        vararg=strip(arguments.vararg),
+        kwonlyargs=[strip(arg) for arg in arguments.kwonlyargs],
+        kw_defaults=[ast.Constant(None) if default is not None else None for default in arguments.kw_defaults],
+        kwarg=strip(arguments.kwarg),
+        defaults=[ast.Constant(None) for _ in arguments.defaults],
+    )
+    namespace = {}
+    module = ast.fix_missing_locations(ast.Module(body=[stub], type_ignores=[]))
+    exec(compile(module, filename, "exec", dont_inherit=True), namespace)
+    return namespace[node.name]
+
+def _bound_names(node: ast.stmt) -> set[str]:
+    """语句（包括其中的复合语句）可能绑定或修改的模块级名称"""
+    names = set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name) and isinstance(child.ctx, (ast.Store, ast.Del)):
+            names.add(child.id)
+        elif isinstance(child, (ast.Attribute, ast.Subscript)) and isinstance(child.ctx, (ast.Store, ast.Del)):
+            # html.x = ... 修改了已定义的对象
+            root = child
+            while isinstance(root, (ast.Attribute, ast.Subscript)):
+                root = root.value
+            if isinstance(root, ast.Name):
+                names.add(root.id)
+        elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(child.name)
+        elif isinstance(child, (ast.Import, ast.ImportFrom)):
+            names.update((alias.asname or alias.name).partition(".")[0] for alias in child.names)
+        elif isinstance(child, (ast.MatchAs, ast.MatchStar)) and child.name is not None:
+            names.add(child.name)
+        elif isinstance(child, ast.MatchMapping) and child.rest is not None:
+            names.add(child.rest)
+        elif isinstance(child, ast.ExceptHandler) and child.name is not None:
+            names.add(child.name)
+    return names
@@ -0,0 +1,412 @@
+import operator
+import types
+import typing
+from collections.abc import Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from inspect import Parameter, signature
+from typing import Any, Callable, Iterator, NamedTuple
+
+from properpy.node import Node
+
+# 校验模式
+EAGER = "eager"
+DEFERRED = "deferred"
+
+# 当前线程/任务中启用的校验，未启用时为 None
+_validation: ContextVar["_Session|None"] = ContextVar("properpy_validation", default=None)
+
+
+class ValidationIssue(NamedTuple):
+    """
+    An attribute of a component, or a positional argument bound to one of its parameters, that does not match the
+    annotation of the parameter with the same name.
+
+    - tag: The name of the component.
+    - name: The name of the attribute or parameter.
+    - value: The value of the attribute or argument.
+    - message: What is wrong with the value.
+    - node: The component structure (dictionary or :class:`properpy.node.Node`) holding the attribute.
+    """
+    tag: str
+    name: str
+    value: Any
+    message: str
+    node: Any
+
+    def __str__(self) -> str:
+        return f"{self.tag}.{self.name}: {self.message}"
+
+
+class ComponentValidationError(ValueError):
+    """Raised when component attributes do not match the annotations of the component function."""
+    def __init__(self, issues: list[ValidationIssue]):
+        self.issues = issues
+        lines = "".join(f"\n  {issue}" for issue in issues)
+        super().__init__(f"{len(issues)} invalid component attribute{'s' if len(issues) != 1 else ''}:{lines}")
+
+
+# 内置校验：注解 -> 判断函数（None 表示接受任何值）
+_Check = Callable[[Any], bool]|None
+
+_CONSTRAINTS = (
+    ("gt", operator.gt), ("ge", operator.ge), ("lt", operator.lt), ("le", operator.le),
+    ("multiple_of", lambda value, factor: value % factor == 0),
+    ("min_length", lambda value, bound: len(value) >= bound),
+    ("max_length", lambda value, bound: len(value) <= bound),
+)
+
+def _compile(annotation: Any) -> _Check:
+    """将类型注解编译为判断函数，只编译一次；无法理解的注解接受任何值"""
+    if annotation is Any or annotation is object or annotation is Parameter.empty:
+        return None
+    if annotation is None or annotation is type(None):
+        return lambda value: value is None
+    if isinstance(annotation, (str, typing.ForwardRef, typing.TypeVar)):
+        return None
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+
+    if origin is typing.Annotated:
+        return _annotated(_compile(args[0]), annotation.__metadata__)
+    if origin is typing.Union or origin is types.UnionType:
+        kinds = [_simple_types(arg) for arg in args]
+        if all(kind is not None for kind in kinds):
+            # 只由类组成的联合：合并为一次 isinstance
+            return _instance(tuple(cls for kind in kinds for cls in kind), bool not in args)
+        checks = [_compile(arg) for arg in args]
+        if any(check is None for check in checks):
+            return None
+        return lambda value: any(check(value) for check in checks)
+    if origin is typing.Literal:
+        return lambda value: any(value == arg and type(value) is type(arg) for arg in args)
+    if origin is tuple:
+        if len(args) == 2 and args[1] is Ellipsis:
+            item = _compile(args[0])
+            return _items(tuple, item)
+        if args == ((),):
+            return lambda value: value == ()
+        checks = [_compile(arg) for arg in args]
+        return lambda value: (isinstance(value, tuple) and len(value) == len(checks)
+                              and all(check is None or check(item) for check, item in zip(checks, value)))
+    if isinstance(origin, type):
+        if issubclass(origin, Mapping) and len(args) == 2:
+            key, item = _compile(args[0]), _compile(args[1])
+            kind = _mapping_type(origin)
+            return lambda value: (isinstance(value, kind)
+                                  and all((key is None or key(k)) and (item is None or item(v))
+                                          for k, v in value.items()))
+        if len(args) == 1 and origin not in (type, types.FunctionType):
+            return _items(origin, _compile(args[0]))
+        return _class(origin)
+    if isinstance(annotation, type):
+        return _class(annotation)
+    return None
+
+def _mapping_type(cls: type) -> type|tuple[type, ...]:
+    # 紧凑模式下组件返回 Node，注解为 dict 的参数也接受它
+    return (dict, Node) if cls is dict else cls
+
+def _simple_types(annotation: Any) -> tuple[type, ...]|None:
+    """可以直接用 isinstance 判断的注解对应的类；与类型检查器相同，int 可以用于 float 与 complex"""
+    if annotation is None or annotation is type(None):
+        return (type(None),)
+    if not isinstance(annotation, type) or typing.get_origin(annotation) is not None:
+        return None
+    if annotation is float:
+        return (int, float)
+    if annotation is complex:
+        return (int, float, complex)
+    if annotation is dict:
+        return (dict, Node)
+    return (annotation,)
+
+def _instance(kinds: tuple[type, ...], exclude_bool: bool) -> _Check:
+    if exclude_bool and any(issubclass(bool, kind) for kind in kinds):
+        # bool 是 int 的子类，但不是合法的 int
+        return lambda value: isinstance(value, kinds) and value.__class__ is not bool
+    return lambda value: isinstance(value, kinds)
+
+def _class(cls: type) -> _Check:
+    return _instance(_simple_types(cls), cls is not bool)
+
+def _items(cls: type, item: _Check) -> _Check:
+    if item is None:
+        return lambda value: isinstance(value, cls)
+    return lambda value: isinstance(value, cls) and all(item(element) for element in value)
+
+def _constraints(metadata: tuple) -> list[tuple[str, Callable, Any]]:
+    """Annotated 中的约束：具有 gt、ge、max_length 等属性的对象（annotated_types、pydantic.Field）"""
+    constraints = []
+    pending = list(metadata)
+    while pending:
+        item = pending.pop(0)
+        pending.extend(getattr(item, "metadata", ()))
+        for attribute, compare in _CONSTRAINTS:
+            bound = getattr(item, attribute, None)
+            if bound is not None:
+                constraints.append((attribute, compare, bound))
+    return constraints
+
+def _annotated(base: _Check, metadata: tuple) -> _Check:
+    constraints = [(compare, bound) for _, compare, bound in _constraints(metadata)]
+    if not constraints:
+        return base
+
+    def check(value):
+        if base is not None and not base(value):
+            return False
+        try:
+            return all(compare(value, bound) for compare, bound in constraints)
+        except TypeError:
+            return False
+    return check
+
+def _describe(annotation: Any) -> str:
+    origin = typing.get_origin(annotation)
+    if origin is typing.Annotated:
+        base = _describe(typing.get_args(annotation)[0])
+        constraints = ", ".join(f"{name}={bound!r}" for name, _, bound in _constraints(annotation.__metadata__))
+        return f"{base} with {constraints}" if constraints else base
+    if origin is typing.Union or origin is types.UnionType:
+        return " | ".join(_describe(arg) for arg in typing.get_args(annotation))
+    if isinstance(annotation, type) and origin is None:
+        return "None" if annotation is type(None) else annotation.__name__
+    return repr(annotation).replace("typing.", "")
+
+
+class ComponentValidator:
+    """
+    Checks the attributes of the structures returned by one component, and the positional arguments bound to its
+    parameters, against the annotations of its parameters. Compiled once per component, see :func:`validator_for`.
+
+    With pydantic installed, every annotation is checked by a pydantic ``TypeAdapter`` in strict mode, so constraints
+    such as ``Annotated[int, Field(gt=0)]`` and pydantic models are supported, and a whole batch of structures is
+    checked in a single call. Otherwise built-in checkers handle classes, ``Optional``/``Union``, ``Literal``,
+    generic lists, tuples, sets and dictionaries, and ``Annotated`` constraints such as ``gt`` or ``max_length``.
+    Constraint objects that pydantic ignores (any object with a ``gt``, ``max_length``, ... attribute) are checked by
+    the built-in checkers on both paths, and issues are reported in the same format whichever backend is used.
+
+    :param func: The component function (not the wrapper returned by ``component``).
+    """
+    def __init__(self, func: Callable):
+        self.tag = func.__name__
+        try:
+            hints = typing.get_type_hints(func, include_extras=True)
+        except Exception:
+            # 注解无法解析（引用了未定义的名称）：只使用可以直接得到的注解
+            hints = {name: value for name, value in getattr(func, "__annotations__", {}).items()
+                     if not isinstance(value, str)}
+        annotations = {}
+        for name, parameter in signature(func).parameters.items():
+            # *children 与 **kwargs 不对应属性
+            if parameter.kind in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD) or name not in hints:
+                continue
+            annotation = hints[name]
+            if annotation is Any:
+                continue
+            if parameter.default is None:
+                # name: str = None 视为 Optional[str]
+                annotation = typing.Optional[annotation]
+            annotations[name] = annotation
+        self.annotations: dict[str, Any] = annotations
+        self._adapter = _pydantic_adapter(self.tag, annotations) if annotations else None
+        if self._adapter is None:
+            checks = {name: _compile(annotation) for name, annotation in annotations.items()}
+            self._checks = {name: check for name, check in checks.items() if check is not None}
+            self._extra_checks = {}
+        else:
+            self._checks = dict.fromkeys(annotations)
+            # pydantic 忽略的约束对象：这些属性再由内置校验检查一次
+            checks = {name: _compile(annotation) for name, annotation in annotations.items()
+                      if _ignored_by_pydantic(annotation)}
+            self._extra_checks = {name: check for name, check in checks.items() if check is not None}
+
+    @property
+    def empty(self) -> bool:
+        """Whether no attribute is checked."""
+        return not self._checks
+
+    def valid(self, node: Mapping, arguments: Mapping = None) -> bool:
+        """
+        Whether the attributes of one structure, and the positional arguments of its call, are all valid (faster
+        than :meth:`validate`).
+        """
+        if self._adapter is not None:
+            return not self._validate_pydantic(_rows([node], [arguments]))
+        for values in (arguments, node) if arguments else (node,):
+            for name, check in self._checks.items():
+                value = values.get(name, _MISSING)
+                if value is not _MISSING and not check(value):
+                    return False
+        return True
+
+    def validate(self, nodes: list[Mapping], arguments: list[Mapping|None] = None) -> list[ValidationIssue]:
+        """
+        Checks the attributes of component structures created by this component.
+
+        :param nodes: The structures (dictionaries or nodes).
+        :param arguments: For each structure, the positional arguments of its call bound to the names of the
+                          parameters, or None. Defaults to None (attributes only).
+        :return: The issues found, in the order of ``nodes``; for each structure, the issues of its positional
+                 arguments come first.
+        """
+        rows = _rows(nodes, arguments)
+        if self._adapter is not None:
+            return self._validate_pydantic(rows)
+        issues = []
+        for node, values in rows:
+            for name, check in self._checks.items():
+                if name in values and not check(values[name]):
+                    issues.append(self._issue(node, name, values[name]))
+        return issues
+
+    def _issue(self, node: Mapping, name: str, value: Any) -> ValidationIssue:
+        return ValidationIssue(self.tag, name, value, f"expected {_describe(self.annotations[name])}, got {value!r}",
+                               node)
+
+    def _validate_pydantic(self, rows: list[tuple[Mapping, Mapping]]) -> list[ValidationIssue]:
+        # pydantic 不认识 Node：注解为 dict 的属性中的紧凑节点先转换为字典
+        batch = [{name: values[name].to_dict() if isinstance(values[name], Node) else values[name]
+                  for name in self._checks if name in values} for _, values in rows]
+        invalid = set()
+        try:
+            self._adapter.validate_python(batch, strict=True)
+        except Exception as e:
+            if not hasattr(e, "errors"):
+                raise
+            # 只取出错的结构与属性，消息与内置校验的格式相同
+            invalid.update(tuple(error["loc"][:2]) for error in e.errors() if len(error.get("loc", ())) >= 2)
+        for name, check in self._extra_checks.items():
+            invalid.update((index, name) for index, (_, values) in enumerate(rows)
+                           if name in values and not check(values[name]))
+        if not invalid:
+            return []
+        return [self._issue(node, name, values[name]) for index, (node, values) in enumerate(rows)
+                for name in self._checks if (index, name) in invalid]
+
+def _rows(nodes: list[Mapping], arguments: list[Mapping|None]|None) -> list[tuple[Mapping, Mapping]]:
+    """要检查的值：(结构, 位置参数或结构本身)，每个结构的位置参数在它的属性之前"""
+    if arguments is None:
+        return [(node, node) for node in nodes]
+    rows = []
+    for node, bound in zip(nodes, arguments):
+        if bound:
+            rows.append((node, bound))
+        rows.append((node, node))
+    return rows
+
+def _pydantic_adapter(tag: str, annotations: dict[str, Any]) -> Any:
+    """安装了 pydantic 时，为组件的属性构建批量校验的 TypeAdapter，否则返回 None"""
+    try:
+        from pydantic import TypeAdapter
+        # Python 3.12 之前 pydantic 只接受 typing_extensions 的 TypedDict（pydantic 依赖 typing_extensions）
+        from typing_extensions import TypedDict
+    except ImportError:
+        return None
+    try:
+        fields = TypedDict(f"{tag}_attributes", annotations, total=False)
+        return TypeAdapter(list[fields])
+    except Exception:
+        # pydantic 无法处理的注解：使用内置校验
+        return None
+
+def _ignored_by_pydantic(annotation: Any) -> bool:
+    """注解（包括 Optional、list 等的参数）中是否有 pydantic 不处理的约束对象，如只定义了 gt 属性的普通对象"""
+    from annotated_types import BaseMetadata, GroupedMetadata
+    from pydantic.fields import FieldInfo
+    if typing.get_origin(annotation) is typing.Annotated:
+        if any(not isinstance(item, (BaseMetadata, GroupedMetadata, FieldInfo)) and _constraints((item,))
+               for item in annotation.__metadata__):
+            return True
+        return _ignored_by_pydantic(typing.get_args(annotation)[0])
+    return any(_ignored_by_pydantic(arg) for arg in typing.get_args(annotation))
+
+_MISSING = object()
+
+def validator_for(func: Callable) -> ComponentValidator:
+    """
+    Returns the validator of a component function, compiled on first use and stored on the function.
+
+    :param func: The component, or the function it wraps.
+    :return: The validator.
+    """
+    func = getattr(func, "__wrapped__", func)
+    validator = func.__dict__.get("_validator")
+    if validator is None:
+        validator = func._validator = ComponentValidator(func)
+    return validator
+
+
+class _Session:
+    """一次校验：立即模式下逐个校验，延迟模式下按组件分组，在结束时批量校验"""
+    def __init__(self, deferred: bool):
+        self.deferred = deferred
+        # 校验器 -> (结构, 各自调用的位置参数)
+        self.pending: dict[ComponentValidator, tuple[list[Mapping], list[Mapping|None]]] = {}
+        self.issues: list[ValidationIssue] = []
+
+    def add(self, func: Callable, node: Any, arguments: Mapping = None):
+        """arguments：绑定到参数名称的位置参数"""
+        validator = func.__dict__.get("_validator") or validator_for(func)
+        if validator.empty:
+            return
+        if self.deferred:
+            pending = self.pending.get(validator)
+            if pending is None:
+                pending = self.pending[validator] = ([], [])
+            pending[0].append(node)
+            pending[1].append(arguments)
+            return
+        if not validator.valid(node, arguments):
+            raise ComponentValidationError(validator.validate([node], [arguments]))
+
+    def finish(self) -> list[ValidationIssue]:
+        pending, self.pending = self.pending, {}
+        for validator, (nodes, arguments) in pending.items():
+            self.issues.extend(validator.validate(nodes, arguments))
+        return self.issues
+
+
+class ValidationReport:
+    """
+    The issues found by :func:`validate_components` in deferred mode, available after the block.
+    """
+    def __init__(self):
+        self.issues: list[ValidationIssue] = []
+
+
+@contextmanager
+def validate_components(deferred: bool = False, raise_errors: bool = True) -> Iterator[ValidationReport]:
+    """
+    Context manager. Inside it, the attributes of every component structure, and the positional arguments bound to
+    the parameters of the component function, are checked against the annotations of the component function, in the
+    current thread or task only. Validators are compiled once per component
+    (see :class:`ComponentValidator`).
+
+    By default each component call is checked immediately and raises :class:`ComponentValidationError`; inside a
+    parse, the error is reported like any other evaluation error of its statement. With ``deferred``, structures
+    are only collected while the configuration is built, and checked in one batched pass per component when the
+    block exits, which then raises a single error listing every issue.
+
+    Example::
+
+        with validate_components(deferred=True) as report:
+            result = parser.parse(code)
+        # 退出时若有问题，抛出包含全部问题的 ComponentValidationError
+
+    :param deferred: Whether to check every structure in one pass at the end. Defaults to False.
+    :param raise_errors: Whether the deferred pass raises. When False, the issues are only stored in the
+                         report. Defaults to True.
+    :return: A report whose ``issues`` are filled in when the block exits.
+    """
+    session = _Session(deferred)
+    report = ValidationReport()
+    token = _validation.set(session)
+    try:
+        yield report
+    finally:
+        _validation.reset(token)
+    report.issues = session.finish()
+    if report.issues and raise_errors:
+        raise ComponentValidationError(report.issues)
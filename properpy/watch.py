@@ -0,0 +1,291 @@
+import ctypes
+import importlib
+import logging
+import os
+import select
+import sys
+import threading
+from os import PathLike
+from threading import RLock
+from typing import Callable, Any, NamedTuple
+
+from properpy.cache import Dependency, load_program, module_dependencies
+from properpy.module_guard import ModuleTag
+from properpy.parser import Parser, module_search_paths
+
+_logger = logging.getLogger(__name__)
+
+
+class ConfigChange(NamedTuple):
+    """
+    A new parse result published by :class:`ConfigWatcher`.
+
+    - path: The configuration file.
+    - result: The parsed configuration, None when parsing failed.
+    - error: The exception raised while parsing, None on success.
+    """
+    path: str
+    result: dict|None
+    error: BaseException|None
+
+def _fingerprint(path: str) -> tuple[Dependency, ...]:
+    try:
+        return (Dependency.of(path),)
+    except OSError:
+        # 文件不存在：重新出现时才视为改变
+        return (Dependency(path, -1, -1, b""),)
+
+def _changed(dependency: Dependency) -> bool:
+    if dependency.mtime_ns < 0:
+        return os.path.exists(dependency.path)
+    return dependency.changed()
+
+class _Watched(NamedTuple):
+    """一个配置文件在上次解析时的状态：配置文件与依赖模块的指纹，依赖文件路径 -> 模块名"""
+    dependencies: tuple[Dependency, ...]
+    modules: dict[str, str]
+
+
+# inotify 事件：写入完成、移入（编辑器原子替换）、创建、删除
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+
+class _Inotify:
+    """通过 ctypes 使用 Linux inotify 监听目录，只用于提前唤醒轮询，是否改变仍由指纹判断"""
+    def __init__(self):
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._directories = set()
+
+    @classmethod
+    def create(cls) -> "_Inotify|None":
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            return cls()
+        except (OSError, AttributeError):
+            return None
+
+    def watch(self, directory: str):
+        if directory not in self._directories:
+            if self._libc.inotify_add_watch(self.fd, os.fsencode(directory), _IN_MASK) >= 0:
+                self._directories.add(directory)
+
+    def wait(self, timeout: float) -> bool:
+        """等待事件或超时，返回是否发生了事件"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ConfigWatcher:
+    """
+    Watches configuration files, and every schema or helper module they imported through the sandbox, and
+    reparses a configuration in a background thread when one of them changes.
+
+    Changes are detected by polling the fingerprint of every file (modification time and size, then the content
+    hash, see :class:`properpy.cache.Dependency`), so touching a file without changing it does not reparse it. On
+    Linux, inotify wakes the poller up as soon as a watched directory changes. Changes are debounced: files written
+    several times within ``debounce`` seconds are reparsed once. Changed modules are reloaded before reparsing.
+
+    Every new result, or the error raised while parsing, is published to the subscribed callbacks as a
+    :class:`ConfigChange`, from the watcher thread. An exception raised by a callback is logged to the
+    ``properpy.watch`` logger; the other callbacks still receive the change and the watcher keeps running.
+
+    Example::
+
+        with ConfigWatcher(["config.proper.py"], ["config_schema"]) as watcher:
+            watcher.subscribe(lambda change: apply(change.result))
+            ...
+
+    :param file_paths: The configuration files to watch.
+    :param supported_modules: A list of module names to register with the parser. Defaults to None.
+    :param supported_builtin_modules: A list of built-in module tags to register with the parser. Defaults to None.
+    :param module_paths: A list of additional paths to search for modules during parsing. Defaults to None.
+    :param interval: The number of seconds between two polls. Defaults to 1.0.
+    :param debounce: The number of seconds to wait after a change before reparsing. Defaults to 0.1.
+    :param inotify: Whether to use inotify where available. Defaults to True.
+    """
+    def __init__(
+            self,
+            file_paths:list[str|PathLike[str]],
+            supported_modules:list[str] = None,
+            supported_builtin_modules:list[ModuleTag] = None,
+            module_paths:list[str] = None,
+            interval:float = 1.0,
+            debounce:float = 0.1,
+            inotify:bool = True
+    ):
+        self.file_paths = [os.fspath(path) for path in file_paths]
+        self.interval = interval
+        self.debounce = debounce
+        # 独立的解析器：重新加载模块后需要清除它已加载的名称
+        self.parser = Parser(module_paths)
+        self.parser.register_module(*(supported_modules or ()))
+        self.parser.register_builtin_module(*(supported_builtin_modules or ()))
+        self._use_inotify = inotify
+        self._callbacks: list[Callable[[ConfigChange], Any]] = []
+        self._results: dict[str, ConfigChange] = {}
+        self._watched: dict[str, _Watched] = {}
+        self._lock = RLock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread|None = None
+
+    @property
+    def results(self) -> dict[str, ConfigChange]:
+        """The latest result of every configuration file."""
+        with self._lock:
+            return dict(self._results)
+
+    def subscribe(self, callback:Callable[[ConfigChange], Any]) -> Callable[[ConfigChange], Any]:
+        """
+        Registers a callback receiving every new result. Can be used as a decorator. Exceptions raised by the
+        callback are logged and do not stop the watcher.
+
+        :param callback: The callback.
+        :return: The callback.
+        """
+        with self._lock:
+            self._callbacks.append(callback)
+        return callback
+
+    def unsubscribe(self, callback:Callable[[ConfigChange], Any]):
+        with self._lock:
+            self._callbacks.remove(callback)
+
+    def start(self):
+        """Parses every configuration file, then starts watching them in a background thread."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            for path in self.file_paths:
+                self._parse(path)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="properpy-config-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops watching and waits for the background thread to exit."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "ConfigWatcher":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def check(self) -> list[str]:
+        """
+        Polls once: reloads the modules that changed, reparses the configuration files affected by a change and
+        publishes their new results. Called periodically by the background thread.
+
+        :return: The configuration files that were reparsed.
+        """
+        with self._lock:
+            changed_paths = []
+            changed_modules = {}
+            for path in self.file_paths:
+                watched = self._watched.get(path)
+                if watched is None:
+                    changed_paths.append(path)
+                    continue
+                changed = [dependency.path for dependency in watched.dependencies if _changed(dependency)]
+                if changed:
+                    changed_paths.append(path)
+                    changed_modules.update((watched.modules[file], file) for file in changed if watched.modules.get(file))
+            if not changed_paths:
+                return []
+
+            # 每个改变的模块只重新加载一次，已加载进沙箱的名称随之失效
+            with module_search_paths(self.parser.module_paths):
+                for name in changed_modules:
+                    module = sys.modules.get(name)
+                    if module is not None:
+                        try:
+                            importlib.reload(module)
+                        except Exception:
+                            # 模块本身有错误：重新解析时报告
+                            sys.modules.pop(name, None)
+            if changed_modules:
+                self.parser._forget_warmed_names()
+            changes = [self._parse(path) for path in changed_paths]
+            callbacks = list(self._callbacks)
+
+        for change in changes:
+            for callback in callbacks:
+                try:
+                    callback(change)
+                except Exception:
+                    # 一个订阅者的错误不影响其他订阅者与监视线程
+                    _logger.exception("Callback %r failed on the change of %s", callback, change.path)
+        return changed_paths
+
+    def _parse(self, path: str) -> ConfigChange:
+        previous = self._watched.get(path)
+        try:
+            result, modules = self.parser.parse_with_dependencies(load_program(path, self.parser))
+        except Exception as e:
+            change = ConfigChange(path, None, e)
+            # 保留此前的依赖（重新记录指纹），任一文件再次改变时重试
+            files = previous.modules if previous is not None else {}
+            dependencies = tuple(dependency for file in files for dependency in _fingerprint(file))
+            watched = _Watched(_fingerprint(path) + dependencies, files)
+        else:
+            change = ConfigChange(path, result, None)
+            dependencies = module_dependencies(modules)
+            names = {module.__file__: name for name, module in modules.items() if getattr(module, "__file__", None)}
+            watched = _Watched(_fingerprint(path) + dependencies,
+                               {dependency.path: names[dependency.path] for dependency in dependencies})
+        self._watched[path] = watched
+        self._results[path] = change
+        return change
+
+    def _run(self):
+        notifier = _Inotify.create() if self._use_inotify else None
+        try:
+            while not self._stop.is_set():
+                if notifier is not None:
+                    with self._lock:
+                        files = [dependency.path for watched in self._watched.values()
+                                 for dependency in watched.dependencies]
+                    for file in files:
+                        notifier.watch(os.path.dirname(os.path.abspath(file)))
+                    notifier.wait(self.interval)
+                else:
+                    self._stop.wait(self.interval)
+                if self._stop.is_set() or not self._pending():
+                    continue
+                # 去抖：等待连续的写入结束后再解析
+                if self._stop.wait(self.debounce):
+                    break
+                try:
+                    self.check()
+                except Exception:
+                    # 例如读取指纹时文件被删除：下一次轮询重试，监视线程不退出
+                    _logger.exception("Checking the watched configurations failed")
+        finally:
+            if notifier is not None:
+                notifier.close()
+
+    def _pending(self) -> bool:
+        with self._lock:
+            return any(_changed(dependency) for watched in self._watched.values() for dependency in watched.dependencies)
@@ -0,0 +1,118 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from properpy import compile_config, load_artifact, write_artifact
+from properpy.__main__ import main
+from properpy.artifact import ArtifactDict, ArtifactError, ArtifactList, artifact_path, dump_artifact, loads_artifact
+from properpy.node import Node, to_dict
+
+
+class TestArtifact(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "config.proper.py")
+        with open(os.path.join(self.directory.name, "artifact_schema.py"), "w") as file:
+            file.write("from properpy import component\n"
+                       "@component\n"
+                       "def item(*children, name: str = None): pass\n")
+        with open(self.file_path, "w") as file:
+            file.write("from artifact_schema import item\n"
+                       "root = item(item(name='a'), item(name='b'), name='root')\n"
+                       "size = 2 ** 70\n")
+        self.options = {"supported_modules": ["artifact_schema"], "module_paths": [self.directory.name]}
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def testRoundTrip(self):
+        value = {"tag": "root", "children": [1, -0.0, None, True, "text", b"raw", (1, (2, "text")), [], {}],
+                 "keys": {1: "int", (1, 2): [{"nested": "value"}]},
+                 "node": Node("div", (Node("p"), "text"), {"class": "x"}),
+                 "items": [{"id": index, "name": f"item {index}"} for index in range(200)]}
+        data = dump_artifact(value)
+        eager = loads_artifact(data, lazy=False)
+        self.assertEqual(eager, value)
+        self.assertIsInstance(eager["children"][6], tuple)
+        self.assertEqual(str(eager["children"][1]), "-0.0")
+        self.assertEqual(to_dict(eager["node"]), to_dict(value["node"]))
+
+        lazy = loads_artifact(data)
+        self.assertIsInstance(lazy, ArtifactDict)
+        self.assertIsInstance(lazy["items"], ArtifactList)
+        # 小容器整体解码为普通对象
+        self.assertIsInstance(lazy["children"], list)
+        self.assertEqual(lazy["items"][-1], {"id": 199, "name": "item 199"})
+        self.assertEqual(lazy["items"][2:4], value["items"][2:4])
+        self.assertEqual(lazy, value)
+        self.assertEqual(lazy.materialize(), value)
+
+    def testDeepTree(self):
+        deep = root = []
+        for index in range(10000):
+            deep.append([index])
+            deep = deep[-1]
+        self.assertEqual(loads_artifact(dump_artifact(root), lazy=False)[0][1][1][0], 2)
+
+    def testCompactTrees(self):
+        # 紧凑节点的子元素保持为视图：深层树不会递归解码，很宽的树只解码读取的子元素
+        deep = Node("item", attributes={"i": 3000})
+        for index in reversed(range(3000)):
+            deep = Node("item", (deep,), {"i": index})
+        lazy = loads_artifact(dump_artifact(deep))
+        self.assertIsInstance(lazy.children, ArtifactList)
+        self.assertEqual(lazy["children"][0]["i"], 1)
+        node = lazy
+        for _ in range(3000):
+            node = node.children[0]
+        self.assertEqual((node["i"], node.children), (3000, ()))
+        self.assertEqual(loads_artifact(dump_artifact(deep), lazy=False).children[0]["i"], 1)
+
+        wide = Node("root", tuple(Node("item", attributes={"i": index}) for index in range(50000)))
+        lazy = loads_artifact(dump_artifact(wide))
+        self.assertIsInstance(lazy.children, ArtifactList)
+        self.assertEqual((len(lazy.children), lazy.children[-1]["i"]), (50000, 49999))
+        self.assertEqual(to_dict(loads_artifact(dump_artifact(Node("root", wide.children[:300]))))["children"][5],
+                         {"tag": "item", "children": [], "i": 5})
+
+    def testUnsupported(self):
+        with self.assertRaises(TypeError):
+            dump_artifact({"value": {1, 2}})
+        cyclic = []
+        cyclic.append(cyclic)
+        with self.assertRaises(ValueError):
+            dump_artifact(cyclic)
+
+    def testCorruption(self):
+        data = bytearray(dump_artifact({"name": "value"}))
+        data[-1] ^= 1
+        with self.assertRaises(ArtifactError):
+            loads_artifact(bytes(data))
+        with self.assertRaises(ArtifactError):
+            loads_artifact(b"PPYC" + bytes(data[4:]))
+        with self.assertRaises(ArtifactError):
+            loads_artifact(bytes(data[:-1]))
+
+    def testCompile(self):
+        output = compile_config(self.file_path, **self.options)
+        self.assertEqual(output, artifact_path(self.file_path))
+        self.assertTrue(output.endswith("config.proper.ppya"))
+        config = load_artifact(output)
+        self.assertEqual(config["root"]["children"][1]["name"], "b")
+        self.assertEqual(config["size"], 2 ** 70)
+        self.assertEqual(load_artifact(output, lazy=False)["root"]["children"][0],
+                         {"tag": "item", "children": [], "name": "a"})
+
+    def testCommandLine(self):
+        output = os.path.join(self.directory.name, "out.ppya")
+        main(["compile", self.file_path, "-o", output, "-m", "artifact_schema", "-p", self.directory.name])
+        self.assertEqual(load_artifact(output)["root"]["name"], "root")
+
+    def testWrite(self):
+        output = os.path.join(self.directory.name, "data.ppya")
+        write_artifact([{"a": 1}], output)
+        self.assertEqual(load_artifact(output, lazy=False), [{"a": 1}])
+        # 原子写入不留下临时文件
+        self.assertEqual(sorted(os.listdir(self.directory.name)),
+                         ["artifact_schema.py", "config.proper.py", "data.ppya"])
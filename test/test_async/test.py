@@ -0,0 +1,95 @@
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+import properpy.library
+from properpy import Parser, ResultCache, import_config_async, parse_config, parse_config_async
+
+
+class TestAsync(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "config.proper.py")
+        with open(self.file_path, "w") as file:
+            file.write("name = 'async'\nsize = 1 + 2\n")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    async def testParseAsync(self):
+        result = await Parser().parse_async("a = 1\nb = 1 + 1")
+        self.assertEqual(result, {"children": [], "a": 1, "b": 2})
+
+    async def testCoalesce(self):
+        def slow_parse(*args):
+            time.sleep(0.05)
+            return parse_config(*args)
+
+        with patch("properpy.library.parse_config", side_effect=slow_parse) as counted:
+            results = await asyncio.gather(*(parse_config_async(self.file_path) for _ in range(10)))
+            self.assertEqual(counted.call_count, 1)
+            self.assertEqual(results[0], {"children": [], "name": "async", "size": 3})
+            self.assertTrue(all(result is results[0] for result in results))
+            # 上一次解析结束后重新解析
+            await parse_config_async(self.file_path)
+            self.assertEqual(counted.call_count, 2)
+        self.assertEqual(properpy.library._in_flight, {})
+
+    async def testTimeout(self):
+        def slow_parse(*args):
+            time.sleep(0.2)
+            return parse_config(*args)
+
+        with patch("properpy.library.parse_config", side_effect=slow_parse):
+            waiting = asyncio.ensure_future(parse_config_async(self.file_path))
+            with self.assertRaises(TimeoutError):
+                await parse_config_async(self.file_path, timeout=0.01)
+            # 超时的调用方不会取消共享的解析
+            self.assertEqual((await waiting)["name"], "async")
+
+    async def testCacheProcessPool(self):
+        # 结果缓存在本进程中查找与写入，只有解析交给其他进程
+        cache = ResultCache()
+        with ProcessPoolExecutor(1) as executor:
+            result = await parse_config_async(self.file_path, cache=cache, executor=executor)
+            self.assertEqual(result, {"children": [], "name": "async", "size": 3})
+            self.assertEqual(cache.stats.misses, 1)
+            self.assertEqual(await parse_config_async(self.file_path, cache=cache, executor=executor), result)
+        self.assertEqual(cache.stats.hits, 1)
+
+    async def testCacheOffLoop(self):
+        # 计算键与查找缓存都不在事件循环的线程中进行
+        cache = ResultCache()
+        threads = []
+        get = cache.get
+        def recording_get(key, default=None):
+            threads.append(threading.get_ident())
+            return get(key, default)
+        cache.get = recording_get
+        for _ in range(2):
+            result = await parse_config_async(self.file_path, cache=cache, intern=True)
+        self.assertEqual(result, {"children": [], "name": "async", "size": 3})
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(threading.get_ident(), threads)
+        self.assertEqual((cache.stats.misses, cache.stats.hits), (1, 1))
+
+    async def testOptions(self):
+        # 与 parse_config 相同的选项
+        with patch("properpy.library.parse_config", side_effect=parse_config) as called:
+            await parse_config_async(self.file_path, lazy=True)
+            await parse_config_async(self.file_path, intern=True)
+        self.assertEqual([call.args[9:12] for call in called.call_args_list], [(True, False, None), (False, True, None)])
+        with self.assertRaises(ValueError):
+            await parse_config_async(self.file_path, cache=ResultCache(), lazy=True)
+
+    async def testImportConfig(self):
+        module = await import_config_async(self.file_path, "async_config")
+        sys.modules.pop("async_config", None)
+        self.assertEqual(module.size, 3)
@@ -0,0 +1,38 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from properpy import parse_many
+
+
+class TestBatch(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.paths = []
+        for index in range(4):
+            path = os.path.join(self.directory.name, f"config{index}.proper.py")
+            with open(path, "w") as file:
+                file.write(f"value = factorial({index})\n" if index != 2 else "value = (\n")
+            self.paths.append(path)
+        self.paths.append(os.path.join(self.directory.name, "missing.proper.py"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def check(self, results):
+        self.assertEqual([item.index for item in results], list(range(5)))
+        self.assertEqual([item.path for item in results], self.paths)
+        self.assertEqual([item.result["value"] for item in results if item.error is None], [1, 1, 6])
+        self.assertIsInstance(results[2].error, SyntaxError)
+        self.assertIsInstance(results[4].error, FileNotFoundError)
+
+    def testPool(self):
+        self.check(list(parse_many(self.paths, supported_modules=["math"], workers=2)))
+
+    def testUnordered(self):
+        results = sorted(parse_many(self.paths, supported_modules=["math"], workers=2, ordered=False))
+        self.check(results)
+
+    def testInProcess(self):
+        self.check(list(parse_many(self.paths, supported_modules=["math"], workers=1)))
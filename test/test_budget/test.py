@@ -0,0 +1,156 @@
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+from unittest import TestCase
+
+from properpy import Budget, BudgetExceededError, Parser, iter_parse_config, parse_budget, parse_config
+
+# 需要很长时间、但可以随时中断的语句
+ENDLESS = "x = [i for i in range(10 ** 10)]"
+# 递归调用到 500 为止，{} 为起始值（赋值不绑定名称，递归的函数作为参数传入）
+RECURSIVE = "(lambda f, n: f(f, n))(lambda f, n: f(f, n + 1) if n < 500 else n, {})"
+
+
+class TestBudget(TestCase):
+
+    def setUp(self):
+        self.parser = Parser()
+
+    def parse(self, code: str, **limits) -> dict:
+        with parse_budget(**limits):
+            return self.parser.parse(code)
+
+    def testWithinBudget(self):
+        code = "a = 1\nb = [i for i in range(100)][-1]\n"
+        self.assertEqual(self.parse(code, parse=Budget(wall_time=5, cpu_time=5, memory_blocks=10 ** 6, calls=10 ** 6),
+                                    statement=Budget(wall_time=5, calls=10 ** 5)), self.parser.parse(code))
+        self.assertIsNone(sys.getprofile())
+
+    def testWallTime(self):
+        start = time.perf_counter()
+        with self.assertRaises(BudgetExceededError) as context:
+            self.parse(f"a = 1\n{ENDLESS}\nb = 2\n", parse=Budget(wall_time=0.05))
+        self.assertLess(time.perf_counter() - start, 2)
+        error = context.exception
+        self.assertEqual((error.resource, error.scope, error.limit), ("wall_time", "parse", 0.05))
+        self.assertGreater(error.used, 0.05)
+        self.assertEqual((error.filename, error.line, error.source), ("<string>", 2, ENDLESS))
+        self.assertIn("<string>:2", str(error))
+
+    def testStatement(self):
+        # 每条语句分别计量：两条语句合计超出预算，但各自都在预算之内
+        code = "a = sum(i for i in range(200000))\nb = sum(i for i in range(200000))\n"
+        elapsed = time.thread_time()
+        self.parser.parse(code)
+        elapsed = time.thread_time() - elapsed
+        self.assertEqual(self.parse(code, statement=Budget(cpu_time=elapsed * 5))["b"], 19999900000)
+        with self.assertRaises(BudgetExceededError) as context:
+            self.parse(f"a = 1\n{ENDLESS}\n", statement=Budget(cpu_time=0.05))
+        self.assertEqual((context.exception.resource, context.exception.scope), ("cpu_time", "statement"))
+        self.assertEqual(context.exception.line, 2)
+        # 出错之后继续执行的语句，以及跨越多行的语句
+        with self.assertRaises(BudgetExceededError) as context:
+            self.parse(f"a = 1 / 0\nb = 1\nc = [\n    i for i in range(10 ** 10)\n]\n", statement=Budget(cpu_time=0.05))
+        self.assertEqual((context.exception.line, context.exception.source), (3, "c = ["))
+
+    def testCalls(self):
+        code = f"x = [{RECURSIVE.format(0)} for _ in range(1000)]\n"
+        with self.assertRaises(BudgetExceededError) as context:
+            self.parse(code, statement=Budget(calls=10000))
+        self.assertEqual((context.exception.resource, context.exception.used), ("calls", 10001))
+        self.assertIsNone(sys.getprofile())
+        # 调用计数恢复之前的 profile 函数
+        events = []
+        sys.setprofile(lambda frame, event, arg: events.append(event))
+        try:
+            self.parse(f"x = {RECURSIVE.format(490)}\n", parse=Budget(calls=10000))
+            profile = sys.getprofile()
+        finally:
+            sys.setprofile(None)
+        self.assertIsNotNone(profile)
+        self.assertTrue(events)
+
+    def testMemory(self):
+        with self.assertRaises(BudgetExceededError) as context:
+            self.parse("x = [[i] for i in range(10 ** 8)]", parse=Budget(memory_blocks=100000))
+        self.assertEqual(context.exception.resource, "memory_blocks")
+
+    def testInterruptedParserReusable(self):
+        for _ in range(3):
+            with self.assertRaises(BudgetExceededError):
+                self.parse(ENDLESS, parse=Budget(wall_time=0.02))
+            # 中断后，同一线程中计数调用的解析不受影响
+            self.assertEqual(self.parse(f"x = {RECURSIVE.format(0)}\n", statement=Budget(calls=10 ** 5))["x"], 500)
+        self.assertEqual(self.parser.parse("a = 1")["a"], 1)
+
+    def testThreads(self):
+        errors = []
+        def limited():
+            try:
+                self.parse(ENDLESS, parse=Budget(wall_time=0.05))
+            except BudgetExceededError as e:
+                errors.append(e)
+        thread = threading.Thread(target=limited)
+        thread.start()
+        # 预算只限制设置它的线程
+        result = Parser().parse("x = [i for i in range(10 ** 6)][-1]")
+        thread.join()
+        self.assertEqual(result["x"], 10 ** 6 - 1)
+        self.assertEqual(len(errors), 1)
+
+    def testParseConfig(self):
+        with parse_budget(statement=Budget(wall_time=0.05)):
+            with self.assertRaises(BudgetExceededError):
+                parse_config(f"a = 1\n{ENDLESS}\n")
+            with self.assertRaises(BudgetExceededError) as context:
+                list(iter_parse_config(f"a = 1\n{ENDLESS}\n"))
+        self.assertEqual(context.exception.line, 2)
+
+    def testIterParse(self):
+        # 解析的预算由各条语句共用：每条语句都在预算之内，合计超出预算
+        code = "a = sum(i for i in range(200000))\n"
+        elapsed = time.thread_time()
+        self.parser.parse(code)
+        elapsed = time.thread_time() - elapsed
+        with parse_budget(Budget(cpu_time=elapsed * 5)):
+            with self.assertRaises(BudgetExceededError) as context:
+                list(self.parser.iter_parse(code * 20))
+        self.assertEqual((context.exception.scope, context.exception.resource), ("parse", "cpu_time"))
+        self.assertGreater(context.exception.line, 1)
+        # 语句之间调用者的处理不计入
+        with parse_budget(Budget(wall_time=0.1)):
+            for _ in self.parser.iter_parse("a = 1\nb = 2\n"):
+                time.sleep(0.1)
+            start = time.perf_counter()
+            with self.assertRaises(BudgetExceededError) as context:
+                list(iter_parse_config("a = 1\nx = [i for i in iter(int, 1)]\n"))
+        self.assertLess(time.perf_counter() - start, 2)
+        self.assertEqual((context.exception.scope, context.exception.line), ("parse", 2))
+        self.assertIsNone(sys.getprofile())
+
+    def testImportNotInterrupted(self):
+        # 导入期间超出的预算在导入结束后抛出，模块完整地执行
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with open(os.path.join(directory.name, "budget_slow_module.py"), "w") as f:
+            f.write("import time\ntime.sleep(0.2)\nloaded = True\n")
+        self.addCleanup(sys.modules.pop, "budget_slow_module", None)
+        parser = Parser([directory.name])
+        parser.register_module("budget_slow_module")
+        with parse_budget(Budget(wall_time=0.05)):
+            with self.assertRaises(BudgetExceededError) as context:
+                parser.parse("import budget_slow_module\nb = 2\n")
+        self.assertEqual((context.exception.resource, context.exception.line), ("wall_time", 1))
+        self.assertTrue(sys.modules["budget_slow_module"].loaded)
+        # 解析之前加载代码引用的名称不计入预算
+        sys.modules.pop("budget_slow_module")
+        with parse_budget(Budget(wall_time=0.05)):
+            self.assertEqual(parser.parse("b = budget_slow_module.loaded\n")["b"], True)
+
+    def testPickle(self):
+        error = BudgetExceededError("calls", 10, 11, "statement", "config.proper.py", 3, "x = f()")
+        copy = pickle.loads(pickle.dumps(error))
+        self.assertEqual((copy.resource, copy.line, str(copy)), ("calls", 3, str(error)))
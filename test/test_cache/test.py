@@ -0,0 +1,146 @@
+import os
+import sys
+import tempfile
+from unittest import TestCase
+
+from properpy import Parser, parse_config
+from properpy.cache import ResultCache, cache_from_source, load_program, load_module_code
+
+
+class CountingParser(Parser):
+    def __init__(self):
+        super().__init__()
+        self.compiled = 0
+
+    def compile(self, code, filename="<string>"):
+        self.compiled += 1
+        return super().compile(code, filename)
+
+
+class TestBytecodeCache(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "config.proper.py")
+        with open(self.file_path, "w") as file:
+            file.write("name = 'cached'\nsize = 1 + 2\n")
+        self.dont_write_bytecode = sys.dont_write_bytecode
+        sys.dont_write_bytecode = False
+
+    def tearDown(self):
+        sys.dont_write_bytecode = self.dont_write_bytecode
+        self.directory.cleanup()
+
+    def testCachePath(self):
+        self.assertEqual(
+            cache_from_source(self.file_path),
+            os.path.join(self.directory.name, "__pycache__",
+                         f"config.proper.{sys.implementation.cache_tag}.parse.ppyc")
+        )
+
+    def testReuse(self):
+        parser = CountingParser()
+        first = parser.parse(load_program(self.file_path, parser))
+        second = parser.parse(load_program(self.file_path, parser))
+        self.assertEqual(parser.compiled, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(second, {"children": [], "name": "cached", "size": 3})
+
+    def testSourceChanged(self):
+        parser = CountingParser()
+        load_program(self.file_path, parser)
+        with open(self.file_path, "w") as file:
+            file.write("name = 'changed'\n")
+        self.assertEqual(parser.parse(load_program(self.file_path, parser))["name"], "changed")
+        self.assertEqual(parser.compiled, 2)
+
+    def testCorruption(self):
+        parser = CountingParser()
+        load_program(self.file_path, parser)
+        cache_path = cache_from_source(self.file_path)
+        with open(cache_path, "r+b") as file:
+            data = file.read()
+            file.seek(0)
+            file.write(data[:-5])
+            file.truncate()
+        self.assertEqual(parser.parse(load_program(self.file_path, parser))["name"], "cached")
+        # 版本不符的缓存同样被忽略
+        with open(cache_path, "r+b") as file:
+            file.seek(4)
+            file.write(b"\x00\x00")
+        self.assertEqual(parser.parse(load_program(self.file_path, parser))["name"], "cached")
+        self.assertEqual(parser.compiled, 3)
+
+    def testModuleCode(self):
+        namespace = {}
+        exec(load_module_code(self.file_path), namespace)
+        exec(load_module_code(self.file_path), namespace)
+        self.assertEqual(namespace["size"], 3)
+        self.assertTrue(os.path.isfile(cache_from_source(self.file_path, "module")))
+
+
+class TestResultCache(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.schema_path = os.path.join(self.directory.name, "result_cache_schema.py")
+        with open(self.schema_path, "w") as file:
+            file.write("def value():\n    return 1\n")
+        self.file_path = os.path.join(self.directory.name, "config.proper.py")
+        with open(self.file_path, "w") as file:
+            file.write("from result_cache_schema import value\nresult = value()\n")
+
+    def tearDown(self):
+        sys.modules.pop("result_cache_schema", None)
+        self.directory.cleanup()
+
+    def parse(self, cache):
+        return parse_config(self.file_path, ["result_cache_schema"], module_paths=[self.directory.name], cache=cache)
+
+    def testHit(self):
+        cache = ResultCache()
+        first = self.parse(cache)
+        first["result"] = "modified"
+        second = self.parse(cache)
+        # 每次命中返回独立的副本
+        self.assertEqual(second["result"], 1)
+        self.assertEqual((cache.stats.hits, cache.stats.misses), (1, 1))
+
+    def testDependencyChanged(self):
+        cache = ResultCache()
+        self.assertEqual(self.parse(cache)["result"], 1)
+        module = sys.modules["result_cache_schema"]
+        with open(self.schema_path, "w") as file:
+            file.write("def value():\n    return 2\n")
+        # 默认不重新加载模块：缓存失效，按已加载的模块重新解析，结果不缓存
+        self.assertEqual(self.parse(cache)["result"], 1)
+        self.assertEqual(self.parse(cache)["result"], 1)
+        self.assertIs(sys.modules["result_cache_schema"], module)
+        self.assertEqual((cache.stats.invalidations, cache.stats.misses, cache.stats.hits), (1, 3, 0))
+
+    def testReloadModules(self):
+        cache = ResultCache(reload_modules=True)
+        self.assertEqual(self.parse(cache)["result"], 1)
+        with open(self.schema_path, "w") as file:
+            file.write("def value():\n    return 2\n")
+        # 重新解析之前重新加载改变的模块，新的结果随新的指纹缓存
+        self.assertEqual(self.parse(cache)["result"], 2)
+        self.assertEqual(cache.stats.invalidations, 1)
+        self.assertEqual(cache.stats.misses, 2)
+        self.assertEqual(self.parse(cache)["result"], 2)
+        self.assertEqual(cache.stats.hits, 1)
+
+    def testEviction(self):
+        cache = ResultCache(maxsize=2)
+        for code in ("a = 1", "a = 2", "a = 3", "a = 1"):
+            parse_config(code, cache=cache)
+        self.assertEqual(cache.stats.entries, 2)
+        self.assertEqual(cache.stats.evictions, 2)
+        self.assertEqual(cache.stats.hits, 0)
+
+    def testDisk(self):
+        directory = os.path.join(self.directory.name, "results")
+        self.parse(ResultCache(directory=directory))
+        cache = ResultCache(directory=directory)
+        self.assertEqual(self.parse(cache)["result"], 1)
+        self.assertEqual(cache.stats.disk_hits, 1)
@@ -0,0 +1,52 @@
+from unittest import TestCase
+
+from properpy import IncrementalParser
+
+# 赋值不绑定名称，语句之间只通过导入绑定的名称相互依赖
+CODE = """from math import factorial
+from math import pi as p
+a = factorial(3)
+b = p * 2
+attrs(k=p)
+'child'
+"""
+
+
+class TestIncremental(TestCase):
+
+    def setUp(self):
+        self.incremental = IncrementalParser()
+        self.incremental.parser.register_module("math")
+
+    def check(self, code, evaluated):
+        result, expected = self.incremental.parse(code), self.incremental.parser.parse(code)
+        # lambda 每次求值得到不同的函数对象
+        result.pop("f", None), expected.pop("f", None)
+        self.assertEqual(result, expected)
+        self.assertEqual(self.incremental.evaluated, evaluated)
+
+    def testDependents(self):
+        self.check(CODE, [0, 1, 2, 3, 4, 5])
+        self.check(CODE, [])
+        # 修改的语句与读取其绑定的名称的语句
+        self.check(CODE.replace("pi as p", "tau as p"), [1, 3, 4])
+        self.check(CODE.replace("pi as p", "tau as p").replace("factorial(3)", "factorial(4)"), [2])
+        # 插入的语句不影响其后的语句
+        self.check("x = 0\n" + CODE.replace("pi as p", "tau as p").replace("factorial(3)", "factorial(4)"), [0])
+
+    def testRemoved(self):
+        self.check("from math import pi\ny = pi\nz = 3", [0, 1, 2])
+        self.check("y = pi\nz = 3", [0])
+        self.check("from math import tau as pi\ny = pi\nz = 3", [0, 1])
+
+    def testLateReads(self):
+        code = "f = lambda: p\n" + CODE + "g = (lambda: p)()\n"
+        self.check(code, list(range(8)))
+        # lambda 中读取的名称被重新绑定时全部重新求值
+        self.check(code.replace("pi as p", "tau as p"), list(range(8)))
+        self.check(code.replace("pi as p", "tau as p").replace("factorial(3)", "factorial(4)"), [3])
+
+    def testImports(self):
+        code = "from math import factorial\nvalue = factorial(4)\nother = 1"
+        self.check(code, [0, 1, 2])
+        self.check(code.replace("other = 1", "other = 2"), [2])
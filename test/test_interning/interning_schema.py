@@ -0,0 +1,10 @@
+from properpy import component
+
+
+@component
+def leaf(text, weight=1):
+    pass
+
+@component
+def box(*children, name=None, style: dict = None):
+    pass
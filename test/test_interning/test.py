@@ -0,0 +1,97 @@
+import pickle
+import sys
+import unittest
+from unittest import TestCase
+
+from properpy import Parser, attrs, compact_nodes, parse_config, to_dict
+from properpy.interning import FrozenDict, InternTable, intern_nodes
+from properpy.lazy import materialize
+from properpy.node import Node
+from interning_schema import box, leaf
+
+CONFIG = "from interning_schema import box, leaf\n" + "\n".join(
+    f"item{i} = box(leaf('text'), attrs(style={{'color': 'red', 'tags': ['a']}}), name='n')" for i in range(50))
+
+
+class TestInterning(TestCase):
+
+    def build(self) -> list:
+        return [box(leaf("text", weight=2), attrs(style={"color": "red", "tags": ["a"]}), name="n") for _ in range(3)]
+
+    def testShared(self):
+        with intern_nodes() as table:
+            first, second, third = self.build()
+        self.assertIs(first, second)
+        self.assertIs(second, third)
+        self.assertIsInstance(first, FrozenDict)
+        self.assertEqual(first["children"], ({"tag": "leaf", "children": ("text",), "weight": 2},))
+        self.assertEqual(first["style"], {"color": "red", "tags": ("a",)})
+        stats = table.stats
+        self.assertEqual(stats.values, 3 * stats.distinct)
+        self.assertEqual(stats.ratio, 3.0)
+        self.assertGreater(stats.bytes_saved, 0)
+
+    def testCompact(self):
+        with compact_nodes(), intern_nodes():
+            first, second, _ = self.build()
+        self.assertIs(first, second)
+        self.assertIsInstance(first, Node)
+        self.assertIs(first["style"], second["style"])
+        self.assertEqual(to_dict(first), {"tag": "box", "children": [{"tag": "leaf", "children": ["text"], "weight": 2}],
+                                          "style": {"color": "red", "tags": ("a",)}, "name": "n"})
+
+    def testReadOnly(self):
+        with intern_nodes():
+            style = attrs(color="red")
+        with self.assertRaises(TypeError):
+            style["color"] = "blue"
+        with self.assertRaises(TypeError):
+            style.update(color="blue")
+        copy = style.copy()
+        copy["color"] = "blue"
+        self.assertEqual(style, {"color": "red"})
+        self.assertEqual(pickle.loads(pickle.dumps(style)), style)
+        self.assertIsInstance(pickle.loads(pickle.dumps(style)), FrozenDict)
+
+    def testMaterialize(self):
+        # 去重的结果不含惰性节点：materialize 不修改只读的字典与其中的元组
+        result = parse_config(CONFIG, ["interning_schema"], intern=True)
+        item = result["item0"]
+        self.assertIs(materialize(result), result)
+        self.assertIs(result["item0"], item)
+        self.assertEqual(item["children"][0]["children"], ("text",))
+
+    def testTypes(self):
+        table = InternTable()
+        values = table.intern([1, 1.0, True, 0.0, -0.0, (1,), (True,), [1], {"a": 1}, {"a": True}])
+        self.assertEqual([type(value) for value in values[:5]], [int, float, bool, float, float])
+        self.assertEqual(repr(values[4]), "-0.0")
+        self.assertIsNot(values[5], values[6])
+        self.assertIs(values[5], values[7])
+        self.assertIsNot(values[8], values[9])
+        # 不可去重的对象按 id 比较，保持原样
+        marker = {1, 2}
+        self.assertIs(table.intern((marker,))[0], marker)
+        self.assertIs(table.intern(marker), marker)
+
+    def testDeep(self):
+        value = "leaf"
+        for _ in range(sys.getrecursionlimit() * 2):
+            value = [value]
+        table = InternTable()
+        self.assertIsInstance(table.intern(value), tuple)
+
+    def testParse(self):
+        parser = Parser()
+        parser.register_module("interning_schema")
+        with intern_nodes() as table:
+            result = parser.parse(CONFIG)
+        self.assertIs(result["item0"], result["item49"])
+        self.assertEqual(table.stats.ratio, 50.0)
+        result = parse_config(CONFIG, ["interning_schema"], intern=True)
+        self.assertIs(result["item0"], result["item49"])
+        self.assertEqual(result["item0"]["style"], {"color": "red", "tags": ("a",)})
+
+
+if __name__ == '__main__':
+    unittest.main()
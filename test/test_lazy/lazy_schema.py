@@ -0,0 +1,30 @@
+from properpy import component, config_wrapper
+
+# 被调用的组件名称，按调用顺序
+calls = []
+received = []
+
+PORT = 5432
+FALLBACK_PORT = 1
+
+
+@component
+def database(host: str = None, port: int = 0):
+    calls.append("database")
+
+@component
+def page(*children, title: str = None):
+    calls.append("page")
+
+@component
+def div(*children, cls: str = None):
+    calls.append("div")
+
+@component
+def broken(value=None):
+    calls.append("broken")
+    raise ValueError("broken component")
+
+@config_wrapper(received.append)
+def service(name: str = None):
+    calls.append("service")
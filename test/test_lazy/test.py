@@ -0,0 +1,118 @@
+import pickle
+import unittest
+from threading import Thread
+from unittest import TestCase
+
+from properpy import Parser, parse_config
+from properpy.lazy import LazyNode, materialize
+from properpy.node import Node, compact_nodes
+from lazy_schema import calls, received
+
+CONFIG = ("from lazy_schema import database, page, div, service, broken\n"
+          "from lazy_schema import PORT as port\n"
+          "db = database(host='localhost', port=port)\n"
+          "from lazy_schema import FALLBACK_PORT as port\n"
+          "page(div('a', cls='x'), div(*[div(str(i)) for i in range(2)]), {'lang': 'en'}, title='t')\n"
+          "service(name='api')\n"
+          "failed = broken(port)\n")
+
+
+class TestLazy(TestCase):
+
+    def setUp(self):
+        calls.clear()
+        received.clear()
+        self.parser = Parser()
+        self.parser.register_module("lazy_schema")
+
+    def testDeferred(self):
+        result = self.parser.parse(CONFIG, lazy=True)
+        self.assertEqual(calls, [])
+        self.assertIsInstance(result["db"], LazyNode)
+        self.assertEqual(result["db"].tag, "database")
+        self.assertFalse(result["db"].materialized)
+
+        # 只求值被读取的子树，参数读取的名称在语句执行时绑定
+        self.assertEqual(result["db"]["port"], 5432)
+        self.assertEqual(calls, ["database"])
+        self.assertEqual(result["db"]["host"], "localhost")
+        self.assertEqual(calls, ["database"])
+
+        page = result["children"][0]
+        self.assertEqual(page["lang"], "en")
+        self.assertEqual(calls, ["database", "page"])
+        self.assertEqual(page["children"][0]["cls"], "x")
+        self.assertEqual(calls, ["database", "page", "div"])
+
+    def testMaterialize(self):
+        expected = self.parser.parse(CONFIG)
+        del expected["failed"]
+        calls.clear()
+        result = self.parser.parse(CONFIG, lazy=True)
+        del result["failed"]
+        self.assertIs(materialize(result), result)
+        self.assertEqual(result, expected)
+        self.assertEqual(sorted(calls), ["database", "div", "div", "div", "div", "page", "service"])
+        # 已求值的节点不再求值
+        materialize(result)
+        self.assertEqual(len(calls), 7)
+
+    def testErrors(self):
+        result = self.parser.parse(CONFIG, lazy=True)
+        with self.assertRaisesRegex(ValueError, "broken component"):
+            result["failed"]["value"]
+        self.assertFalse(result["failed"].materialized)
+        # 参数中的名称未定义时，语句求值失败，与立即求值相同
+        self.assertTrue(self.parser.parse("x = div(missing)", lazy=True)["x"].startswith("<Evaluation Error:"))
+
+    def testConfigWrapper(self):
+        result = self.parser.parse(CONFIG, lazy=True)
+        self.assertEqual(len(received), 1)
+        self.assertIs(received[0], result["children"][1])
+        self.assertNotIn("service", calls)
+        self.assertEqual(received[0]["name"], "api")
+        self.assertEqual(calls, ["service"])
+
+    def testCompactAndPickle(self):
+        with compact_nodes():
+            result = self.parser.parse(CONFIG, lazy=True)
+        del result["failed"]
+        # 求值时沿用解析时的上下文
+        self.assertIsInstance(result["db"].materialize(), Node)
+        page = materialize(result)["children"][0]
+        self.assertIsInstance(page.children[1].children[0], Node)
+
+        result = self.parser.parse(CONFIG, lazy=True)
+        del result["failed"]
+        self.assertEqual(pickle.loads(pickle.dumps(result))["db"]["port"], 5432)
+
+    def testThreads(self):
+        node = self.parser.parse(CONFIG, lazy=True)["children"][0]
+        results = []
+        threads = [Thread(target=lambda: results.append(node["title"])) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ["t"] * 8)
+
+    def testCompiled(self):
+        # 编译产物与求值方式不符时重新编译
+        self.assertIsInstance(self.parser.parse(self.parser.compile(CONFIG), lazy=True)["db"], LazyNode)
+        program = self.parser.compile(CONFIG, lazy=True)
+        self.assertTrue(program.lazy)
+        self.assertIsInstance(self.parser.parse(program, lazy=True)["db"], LazyNode)
+        self.assertEqual(self.parser.parse(program)["db"]["port"], 5432)
+
+    def testParseConfig(self):
+        result = parse_config(CONFIG, ["lazy_schema"], lazy=True)
+        self.assertEqual(result["db"]["port"], 5432)
+        with self.assertRaises(ValueError):
+            parse_config(CONFIG, ["lazy_schema"], lazy=True, static=True)
+        # 惰性节点在解析之后才求值，不能在解析期间去重
+        with self.assertRaises(ValueError):
+            parse_config(CONFIG, ["lazy_schema"], lazy=True, intern=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
+from inspect import signature
 from unittest import TestCase
+from unittest.mock import patch
 
-from properpy import attrs
+from properpy import attrs, component, config_wrapper
 
 
 class TestLibrary(TestCase):
@@ -24,3 +26,31 @@ class TestLibrary(TestCase):
         self.assertEqual(attrs(123),{}) # 抛出 TypeError
         self.assertEqual(attrs({"a": 1}, "invalid"),{"a": 1}) # 抛出 TypeError
 
+
+    def testComponent(self):
+        @component
+        def card(title, size=1):
+            return {"area": size * size}
+
+        child = {"tag": "icon", "children": []}
+        self.assertEqual(card(child, {"color": "red"}, size=2, extra=3),
+                         {"tag": "card", "children": [child], "color": "red", "size": 2, "extra": 3, "area": 4})
+        # 位置参数与关键字参数冲突时，位置参数不传给原函数，但仍是子元素
+        self.assertEqual(card("ignored", title="t"), {"tag": "card", "children": ["ignored"], "title": "t", "area": 1})
+        # 多余的位置参数不传给原函数
+        self.assertEqual(card("a", 2, "b")["children"], ["a", 2, "b"])
+        with self.assertRaises(TypeError):
+            card()
+
+    def testConfigWrapper(self):
+        received = []
+        with patch("properpy.library.signature", wraps=signature) as counted:
+            @config_wrapper(received.append)
+            def define_config(title: str):
+                return "body"
+            define_config("a")
+            define_config(title="b")
+        # 调用计划只在装饰时计算一次
+        self.assertEqual(counted.call_count, 1)
+        self.assertEqual(received, [{"tag": "define_config", "children": ["a", "body"]},
+                                    {"tag": "define_config", "children": ["body"], "title": "b"}])
@@ -0,0 +1,76 @@
+import pickle
+import sys
+from unittest import TestCase
+
+from properpy import Node, attrs, compact_nodes, component, config_wrapper, parse_config, to_dict
+
+
+@component
+def div(content=None, style: dict = None):
+    pass
+
+@component
+def card(title, size=1):
+    return {"area": size * size}
+
+@component
+def label(text):
+    return text.upper()
+
+
+class TestNode(TestCase):
+
+    def build(self) -> list:
+        return [
+            div(attrs(style={"color": "red"}), "text", div()),
+            div(children="overridden", tag="renamed"),
+            card("ignored", div(), title="t", size=3),
+            label("a", {"tag": "raw", "children": []}),
+        ]
+
+    def testSameAsDict(self):
+        expected = self.build()
+        with compact_nodes():
+            nodes = self.build()
+        self.assertTrue(all(isinstance(node, Node) for node in nodes))
+        self.assertEqual(to_dict(nodes), expected)
+
+    def testMapping(self):
+        with compact_nodes():
+            node = div(attrs(style={"color": "red"}), "text")
+        self.assertEqual(node["tag"], "div")
+        self.assertEqual(node["children"], ("text",))
+        self.assertEqual(node["style"], {"color": "red"})
+        self.assertEqual(list(node), ["tag", "children", "style"])
+        self.assertNotIn("size", node)
+        # 没有子元素与属性的节点共享同一个空元组
+        with compact_nodes():
+            self.assertIs(div()["children"], div()["children"])
+        self.assertEqual(pickle.loads(pickle.dumps(node)).to_dict(), node.to_dict())
+
+    def testDeepTree(self):
+        with compact_nodes():
+            node = div("leaf")
+            for _ in range(sys.getrecursionlimit() * 2):
+                node = div(node)
+        plain = node.to_dict()
+        self.assertEqual(plain["children"][0]["tag"], "div")
+
+    def testReceiver(self):
+        received = {}
+
+        @config_wrapper(received)
+        def define_config(html_component, title: str):
+            pass
+
+        with compact_nodes():
+            result = define_config(div("x"), title="app")
+        self.assertIsInstance(result, Node)
+        # 字典接收者通过 Mapping 接口更新
+        self.assertEqual(received["title"], "app")
+        self.assertEqual(received["children"], result["children"])
+        self.assertEqual(result.to_dict(), define_config(div("x"), title="app"))
+
+    def testParseConfig(self):
+        code = "from properpy import attrs\nx = attrs(a=1)\nattrs(b=2)\n"
+        self.assertEqual(parse_config(code, compact=True), parse_config(code))
@@ -0,0 +1,169 @@
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from properpy import ModuleTag, Parser, iter_parse_config, Node
+from properpy.parser import free_names
+
+
+class TestParser(TestCase):
+
+    def testLazyModules(self):
+        parser = Parser()
+        parser.register_builtin_module(ModuleTag.NORMAL)
+        result = parser.parse("value = factorial(5)\npi_value = math.pi")
+        self.assertEqual(result["value"], 120)
+        self.assertEqual(result["pi_value"], 3.141592653589793)
+        # 在新的解释器中检查：未被引用的白名单模块不会被导入，未定义的名称也不会导入全部白名单模块
+        script = ("import sys\nfrom properpy import ModuleTag, Parser\nparser = Parser()\n"
+                  "parser.register_builtin_module(ModuleTag.NORMAL)\nbefore = set(sys.modules)\n"
+                  "result = parser.parse('value = factorial(5)\\nx = undefined_name')\n"
+                  "print(result['value'], sorted(set(sys.modules) - before))")
+        output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True,
+                                env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))).stdout
+        value, imported = output.split(" ", 1)
+        self.assertEqual(value, "120")
+        for name in ("turtle", "tkinter", "unittest", "pydoc", "pydantic"):
+            self.assertNotIn(f"'{name}'", imported)
+
+    def testSharedAcrossThreads(self):
+        # 一个线程反复改变白名单（丢弃已加载的名称），其他线程同时用同一个解析器解析
+        parser = Parser()
+        parser.register_builtin_module(ModuleTag.NORMAL)
+        stop = threading.Event()
+        def register():
+            while not stop.is_set():
+                parser.register_module("math")
+        thread = threading.Thread(target=register)
+        thread.start()
+        try:
+            with ThreadPoolExecutor(4) as executor:
+                results = list(executor.map(lambda _: parser.parse("value = factorial(5)\npi_value = pi"), range(400)))
+        finally:
+            stop.set()
+            thread.join()
+        self.assertEqual({(result["value"], result["pi_value"]) for result in results}, {(120, math.pi)})
+
+    def testReuse(self):
+        import builtins
+        parser = Parser()
+        parser.register_builtin_module(ModuleTag.NORMAL)
+        first = parser.parse("from string import capwords\nvalue = capwords('a b')\nname = __name__")
+        self.assertEqual(first["value"], "A B")
+        # 导入只绑定请求的名称，不会注入模块的其他名称
+        self.assertEqual(first["name"], "__sandbox__")
+        # 上一次解析的导入不会泄漏到下一次解析
+        second = parser.parse("name = __name__")
+        self.assertEqual(second["name"], "__sandbox__")
+        self.assertNotIn("capwords", parser.sandbox.__dict__)
+        # 全局 builtins 不受沙箱影响
+        self.assertIs(builtins.__import__, __import__)
+        self.assertIsNotNone(builtins.ValueError)
+
+    def testStatements(self):
+        result = Parser().parse("a = 1\nb = a + 1\nc = undefined\n{'k': 3}\n'child'\nNone\nyield 5")
+        # 赋值只报告值，不绑定名称：之后的语句读取的是沙箱中的名称
+        self.assertEqual(result["b"], "<Evaluation Error: name 'a' is not defined>")
+        self.assertEqual(result["c"], "<Evaluation Error: name 'undefined' is not defined>")
+        self.assertEqual(result["k"], 3)
+        self.assertEqual(result["children"][0], "child")
+        self.assertTrue(result["children"][1].startswith("<Evaluation Error: 'yield' outside function"))
+
+    def testImportBindings(self):
+        parser = Parser()
+        parser.register_module("os", "os.path", "string")
+        result = parser.parse(
+            "import os.path\nimport string as text\nfrom string import capwords as cap, digits\n"
+            "sep = os.path.sep\nletters = text.ascii_lowercase\nvalue = cap('a b') + digits\n"
+            "leaked = [name for name in ('path', 'string', 'capwords', 'ascii_letters') if name in globals()]"
+        )
+        self.assertEqual(result["sep"], "/")
+        self.assertEqual(result["letters"], "abcdefghijklmnopqrstuvwxyz")
+        self.assertEqual(result["value"], "A B0123456789")
+        self.assertEqual(result["leaked"], [])
+
+    def testImportSubmodules(self):
+        with tempfile.TemporaryDirectory() as directory:
+            package = os.path.join(directory, "fromlist_package")
+            os.mkdir(package)
+            for name, content in (("__init__", "__all__ = ['starred']\n"), ("sub", "value = 1\n"),
+                                  ("starred", "value = 2\n"), ("hidden", "value = 3\n")):
+                with open(os.path.join(package, f"{name}.py"), "w") as file:
+                    file.write(content)
+            parser = Parser([directory])
+            parser.register_module("fromlist_package", "fromlist_package.sub", "fromlist_package.starred")
+            try:
+                # from a import b 导入尚未导入的子模块
+                self.assertEqual(parser.parse("from fromlist_package import sub\nvalue = sub.value")["value"], 1)
+                self.assertEqual(parser.parse("from fromlist_package import *\nvalue = starred.value")["value"], 2)
+                # 不在白名单中的子模块不会被导入
+                with self.assertRaises(ImportError):
+                    parser.parse("from fromlist_package import hidden")
+                self.assertNotIn("fromlist_package.hidden", sys.modules)
+            finally:
+                for name in [name for name in sys.modules if name.startswith("fromlist_package")]:
+                    del sys.modules[name]
+
+    def testIterParse(self):
+        code = "a = 1\nb = a + 1\nattrs(k=3)\n'child'\nc = undefined\nd = [i for i in range(2)]"
+        events = list(Parser().iter_parse(code))
+        self.assertEqual(events[:4], [("assign", "a", 1), ("assign", "b", "<Evaluation Error: name 'a' is not defined>"),
+                                      ("attribute", "k", 3), ("child", None, "child")])
+        self.assertEqual(events[4].value, "<Evaluation Error: name 'undefined' is not defined>")
+        self.assertEqual(events[5], ("assign", "d", [0, 1]))
+
+    def testIterParseLazy(self):
+        events = Parser().iter_parse("a = 1\nb = 1 / 0\nc = 3")
+        self.assertEqual(next(events), ("assign", "a", 1))
+        self.assertEqual(next(events).value, "<Evaluation Error: division by zero>")
+        events.close()
+
+    def testCompiledNames(self):
+        # 由字节码得到的名称与 free_names 相同，包括超过 256 个名称（需要 EXTENDED_ARG）的代码
+        code = ("import os.path as p\nfrom string import digits\na = 1\nb = a + undefined\n"
+                "c = lambda n: [x + y for x in n]\nd = lambda n: n + digits + z\nf'{w!r}'\n(q := 2)\n"
+                + "\n".join(f"name_{i} = value_{i}.attribute_{i}" for i in range(300)))
+        self.assertEqual(set(Parser().compile(code).names), free_names(code))
+        self.assertEqual(set(Parser().compile(code, lazy=True).names), free_names(code))
+        self.assertIn("value_299", free_names(code))
+        self.assertNotIn("attribute_299", free_names(code))
+
+    def testIterParseConfig(self):
+        code = "from properpy import component\nname = 'div'\ncomponent(lambda content=None: None)('x')"
+        events = list(iter_parse_config(code, ["properpy"], compact=True))
+        self.assertEqual([kind for kind, _, _ in events], ["assign", "child"])
+        self.assertIsInstance(events[-1].value, Node)
+        self.assertEqual(events[-1].value["children"], ("x",))
+
+    def testModulePaths(self):
+        with tempfile.TemporaryDirectory() as first, tempfile.TemporaryDirectory() as second:
+            names = ("paths_first", "paths_second")
+            parsers = []
+            for directory, name in zip((first, second), names):
+                with open(os.path.join(directory, f"{name}.py"), "w") as file:
+                    file.write(f"origin = {name!r}\n")
+                parser = Parser([directory])
+                parser.register_module(*names)
+                parser.register_var("search_path", lambda: list(sys.path))
+                parsers.append(parser)
+            codes = [f"import {name}\norigin = {name}.origin\npath = search_path()" for name in names]
+            original = list(sys.path)
+            try:
+                # 解析器不能从其他解析器的路径导入
+                with self.assertRaises(ImportError):
+                    parsers[0].parse(codes[1])
+                with ThreadPoolExecutor(4) as executor:
+                    results = list(executor.map(lambda index: parsers[index % 2].parse(codes[index % 2]), range(8)))
+            finally:
+                for name in names:
+                    sys.modules.pop(name, None)
+        # 全局 sys.path 不被修改
+        for index, result in enumerate(results):
+            self.assertEqual(result["origin"], names[index % 2])
+            self.assertEqual(result["path"], original)
+        self.assertEqual(sys.path, original)
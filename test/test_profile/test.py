@@ -0,0 +1,54 @@
+import json
+import os
+import pstats
+import tempfile
+from unittest import TestCase
+
+from properpy import ParseProfile, Parser, component
+
+
+@component
+def item(name):
+    pass
+
+@component
+def group(title):
+    # 组件函数中调用的组件计入外层的总耗时，不计入自身耗时
+    return {"first": item("first")}
+
+
+class TestProfile(TestCase):
+
+    def setUp(self):
+        self.parser = Parser()
+        self.parser.register_module("math")
+        self.parser.register_var("item", item)
+        self.parser.register_var("group", group)
+
+    def testProfile(self):
+        code = "import math\nvalue = math.sqrt(4)\ngroup(item('a'), item('b'), title='t')\nbroken = missing"
+        profile = ParseProfile()
+        result = self.parser.parse(code, profile=profile)
+        self.assertEqual(result, self.parser.parse(code))
+
+        data = json.loads(profile.to_json())
+        self.assertEqual([statement["line"] for statement in data["statements"]], [1, 2, 3, 4])
+        self.assertEqual(data["statements"][2]["source"], "group(item('a'), item('b'), title='t')")
+        self.assertEqual(data["imports"]["math"]["calls"], 1)
+        self.assertEqual(data["components"]["item"]["calls"], 3)
+        self.assertEqual(data["components"]["group"]["calls"], 1)
+        components = profile.components
+        self.assertLess(components["group"].self_ns, components["group"].total_ns)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "parse.prof")
+            profile.dump_stats(path)
+            stats = pstats.Stats(path).stats
+        self.assertIn((__file__, item.__wrapped__.__code__.co_firstlineno, "item"), stats)
+        self.assertEqual(sum(1 for key in stats if key[2] == "<statement>"), 4)
+
+    def testDisabled(self):
+        with ParseProfile() as profile:
+            pass
+        self.parser.parse("group(title='t')")
+        self.assertEqual(profile.to_dict(), {"statements": [], "imports": {}, "components": {}})
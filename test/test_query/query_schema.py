@@ -0,0 +1,14 @@
+from properpy import component
+
+
+@component
+def html(*children, title: str = None):
+    pass
+
+@component
+def div(*children, class_: str = None, size: int = 0):
+    pass
+
+@component
+def span(text: str = None):
+    pass
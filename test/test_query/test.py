@@ -0,0 +1,121 @@
+import sys
+from unittest import TestCase
+
+from properpy import TreeIndex, attrs, compact_nodes, intern_nodes, parse_config, to_dict
+from query_schema import div, html, span
+
+
+def build() -> dict:
+    return {
+        "page": html(
+            div(span(text="a"), div(span(text="b"), class_="inner"), class_="container", size=2),
+            div(span(text="c"), attrs(footer=span(text="d"))),
+            title="home",
+        ),
+        "extra": [div(span(text="e"), class_="container")],
+    }
+
+
+class TestQuery(TestCase):
+
+    def tags(self, nodes) -> list:
+        return [node["tag"] for node in nodes]
+
+    def texts(self, nodes) -> list:
+        return [node["text"] for node in nodes]
+
+    def testIndex(self):
+        index = TreeIndex(build())
+        self.assertEqual(len(index), 10)
+        self.assertEqual(self.texts(index.by_tag("span")), ["a", "b", "c", "d", "e"])
+        node = index.get(("page", "children", 0, "children", 1))
+        self.assertEqual(node["class_"], "inner")
+        self.assertEqual(index.path_of(node), ("page", "children", 0, "children", 1))
+        self.assertEqual(index.parent(node)["class_"], "container")
+        self.assertIsNone(index.parent(("page",)))
+        # 属性中的节点的父节点为包含该属性的节点
+        footer = index.get(("page", "children", 1, "footer"))
+        self.assertEqual(index.parent(footer)["tag"], "div")
+        self.assertEqual(self.tags(index.children()), ["html", "div"])
+        with self.assertRaises(KeyError):
+            index.get(("page", "title"))
+
+    def testSelect(self):
+        index = TreeIndex(build())
+        self.assertEqual(self.texts(index.select("html span")), ["a", "b", "c", "d"])
+        self.assertEqual(self.texts(index.select("html > div > span")), ["a", "c", "d"])
+        self.assertEqual(self.texts(index.select("div[class_=container] span")), ["a", "b", "e"])
+        self.assertEqual(self.texts(index.select("html > div[class_=container] > span")), ["a"])
+        self.assertEqual(self.texts(index.select("div[class_='inner']>span")), ["b"])
+        self.assertEqual(len(list(index.select("div[size=2]"))), 1)
+        self.assertEqual(len(list(index.select("div[class_]"))), 3)
+        self.assertEqual(len(list(index.select("*"))), 10)
+        self.assertEqual(list(index.select_paths("html > div > div")), [("page", "children", 0, "children", 1)])
+        # 需要回溯：最近的 div 祖先不是 html 的子节点
+        self.assertEqual(self.texts(index.select("html > div span")), ["a", "b", "c", "d"])
+        self.assertEqual(list(index.select("table")), [])
+        for selector in ("", "div >", "div[", "> div", "div ~ span"):
+            with self.assertRaises(ValueError):
+                index.select(selector)
+
+    def testReplace(self):
+        result = build()
+        index = TreeIndex(result)
+        old = index.replace(("page", "children", 0), div(span(text="x"), span(text="y"), class_="container"))
+        self.assertEqual(old["size"], 2)
+        self.assertEqual(result["page"]["children"][0]["children"][1]["text"], "y")
+        self.assertEqual(self.texts(index.select("html > div[class_=container] > span")), ["x", "y"])
+        self.assertEqual(len(list(index.select("div[class_=inner]"))), 0)
+        self.assertEqual(len(index), 9)
+        # 替换非节点的值：子元素列表与顶层变量
+        index.replace(("page", "children", 1, "children"), [])
+        self.assertEqual(self.texts(index.select("html span")), ["d", "x", "y"])
+        index.replace(("extra",), [])
+        self.assertEqual(self.texts(index.by_tag("span")), ["d", "x", "y"])
+        # 替换属性与标签时，按属性值与标签的索引随之更新
+        index.replace(("page", "children", 0, "children", 0, "text"), "z")
+        self.assertEqual(self.texts(index.select("span[text=z]")), ["z"])
+        self.assertEqual(list(index.select("span[text=x]")), [])
+        index.replace(("page", "tag"), "body")
+        self.assertEqual(self.texts(index.select("body > div > span")), ["d", "y", "z"])
+        self.assertEqual(to_dict(index.root), result)
+
+    def testCompact(self):
+        expected = TreeIndex(build())
+        with compact_nodes():
+            result = build()
+        index = TreeIndex(result)
+        self.assertEqual(list(index.select_paths("div span")), list(expected.select_paths("div span")))
+        # 紧凑节点的子元素为元组，替换时逐级创建新的元组
+        with compact_nodes():
+            index.replace(("page", "children", 0, "children", 0), span(text="z"))
+        self.assertEqual(result["page"]["children"][0]["children"][0]["text"], "z")
+        # 替换的子树中的节点排在索引的最后
+        self.assertEqual(self.texts(index.select("div[class_=container] > span")), ["e", "z"])
+        index.replace(("page", "children", 1, "footer"), div())
+        self.assertEqual(self.texts(index.select("html > div > span")), ["c", "z"])
+
+    def testShared(self):
+        with intern_nodes():
+            result = {"page": html(div(span(text="x")), div(span(text="x")))}
+        index = TreeIndex(result)
+        # 共享的节点在每个路径各索引一次
+        first, second = index.select("html > div")
+        self.assertIs(first, second)
+        self.assertEqual(index.path_of(first), ("page", "children", 0))
+        self.assertEqual(list(index.select_paths("div > span")),
+                         [("page", "children", 0, "children", 0), ("page", "children", 1, "children", 0)])
+
+    def testDeepTree(self):
+        with compact_nodes():
+            node = span(text="leaf")
+            for _ in range(sys.getrecursionlimit() * 2):
+                node = div(node)
+        index = TreeIndex({"root": node})
+        self.assertEqual(len(index), sys.getrecursionlimit() * 2 + 1)
+        self.assertEqual(self.texts(index.select("div > div > span")), ["leaf"])
+
+    def testParseConfig(self):
+        code = "from query_schema import html, div\napp = html(div(class_='container'), div(), title='t')\n"
+        index = TreeIndex(parse_config(code, ["query_schema"]))
+        self.assertEqual(index.path_of(next(index.select("html > div[class_=container]"))), ("app", "children", 0))
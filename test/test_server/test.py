@@ -0,0 +1,101 @@
+import os
+import stat
+import sys
+import tempfile
+from unittest import TestCase
+
+from properpy import Node, parse_config
+from properpy.server import ParseServer, close_connections
+
+
+class TestServer(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.socket = os.path.join(self.directory.name, "properpy.sock")
+        self.schema_path = os.path.join(self.directory.name, "server_schema.py")
+        self.file_path = os.path.join(self.directory.name, "config.proper.py")
+        self.write(self.schema_path, "from properpy import component\n\n@component\ndef item(name: str, size: int = 1):"
+                                     "\n    pass\n\ndef value():\n    return 1\n")
+        self.write(self.file_path, "from server_schema import item, value\nfirst = item(name='a', size=value())\n"
+                                   "item(name='b')\n")
+        self.server = None
+
+    def tearDown(self):
+        close_connections()
+        if self.server is not None:
+            self.server.close()
+        sys.modules.pop("server_schema", None)
+        self.directory.cleanup()
+
+    @staticmethod
+    def write(path, content):
+        with open(path, "w") as file:
+            file.write(content)
+
+    def start(self, workers: int) -> ParseServer:
+        self.server = ParseServer(self.socket, workers)
+        self.server.start()
+        return self.server
+
+    def parse(self, code=None, **options) -> dict:
+        return parse_config(code or self.file_path, ["server_schema"], module_paths=[self.directory.name],
+                            server=self.socket, **options)
+
+    def testInProcess(self):
+        server = self.start(0)
+        self.assertEqual(stat.S_IMODE(os.stat(self.socket).st_mode), 0o600)
+        expected = parse_config(self.file_path, ["server_schema"], module_paths=[self.directory.name])
+        self.assertEqual(self.parse(), expected)
+        # 未改变的配置由缓存返回
+        self.assertEqual(self.parse(), expected)
+        self.assertEqual((server.cache.stats.hits, server.cache.stats.misses), (1, 1))
+        # 关闭本线程的连接后，下一次请求重新连接
+        close_connections(self.socket)
+        self.assertEqual(self.parse(), expected)
+        # 代码字符串与紧凑节点
+        result = self.parse("x = [1, 2]\ny = {'a': (1, 2)}\n")
+        self.assertEqual((result["x"], result["y"]), ([1, 2], {"a": (1, 2)}))
+        first = self.parse(compact=True)["first"]
+        self.assertIsInstance(first, Node)
+        self.assertEqual((first["name"], first["size"]), ("a", 1))
+        # 配置改变后重新解析
+        self.write(self.file_path, "from server_schema import item\nfirst = item(name='changed')\n")
+        self.assertEqual(self.parse()["first"]["name"], "changed")
+
+    def testErrors(self):
+        self.start(0)
+        with self.assertRaises(SyntaxError):
+            self.parse("x = (\n")
+        with self.assertRaises(ValueError):
+            self.parse(lazy=True)
+        # 结果无法编码时报告错误，连接仍可继续使用
+        with self.assertRaises(TypeError):
+            self.parse("f = lambda: 1\n")
+        self.assertEqual(self.parse("x = 1\n")["x"], 1)
+
+    def testWorkers(self):
+        self.start(1)
+        self.assertEqual(self.parse()["first"]["size"], 1)
+        # 工作进程在下一次解析前重新加载改变的模块
+        self.write(self.schema_path, "from properpy import component\n\n@component\ndef item(name: str, size: int = 1):"
+                                     "\n    pass\n\ndef value():\n    return 22\n")
+        self.assertEqual(self.parse()["first"]["size"], 22)
+        self.assertNotIn("server_schema", sys.modules)
+
+    def testRestart(self):
+        self.start(0)
+        self.assertEqual(self.parse("x = 1\n")["x"], 1)
+        # 服务重启后，客户端重新连接
+        self.server.close()
+        self.assertFalse(os.path.exists(self.socket))
+        self.start(0)
+        self.assertEqual(self.parse("x = 2\n")["x"], 2)
+        self.server.close()
+        with self.assertRaises(OSError):
+            self.parse("x = 3\n")
+        # 已停止的服务留下的套接字文件被替换，正在运行的服务不能被替换
+        self.write(self.socket, "")
+        self.start(0)
+        with self.assertRaises(OSError):
+            ParseServer(self.socket, 0).start()
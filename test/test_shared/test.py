@@ -0,0 +1,70 @@
+import gc
+import multiprocessing
+from unittest import TestCase
+
+from properpy.shared import SharedConfig, SharedConfigReader
+from properpy.artifact import ArtifactDict
+from properpy.node import Node
+
+
+def read_in_worker(name, queue):
+    with SharedConfigReader(name) as reader:
+        config = reader.get()
+        queue.put((reader.generation, config["items"][5]["id"], config["node"]["tag"]))
+
+
+class TestShared(TestCase):
+
+    def config(self, version):
+        return {"version": version, "items": [{"id": version * index} for index in range(300)],
+                "node": Node("root", (Node("child"),), {"version": version})}
+
+    def testPublish(self):
+        with SharedConfig() as shared, SharedConfigReader(shared.name) as reader:
+            with self.assertRaises(LookupError):
+                reader.get()
+            self.assertEqual(shared.publish(self.config(1)), 1)
+            first = reader.get()
+            self.assertIsInstance(first, ArtifactDict)
+            self.assertIs(reader.get(), first)
+            self.assertEqual(first["items"][3], {"id": 3})
+            self.assertEqual(first["node"]["version"], 1)
+            self.assertEqual(first["node"]["children"][0].tag, "child")
+
+            # 新的一代替换旧的一代，已取得的视图仍然有效
+            self.assertEqual(shared.publish(self.config(2)), 2)
+            self.assertEqual(reader.generation, 2)
+            second = reader.get()
+            self.assertEqual(second["version"], 2)
+            self.assertEqual(first["items"][4], {"id": 4})
+            self.assertEqual(second["items"][4], {"id": 8})
+            del first, second
+            gc.collect()
+
+    def testDeepNodes(self):
+        deep = Node("item", attributes={"i": 3000})
+        for index in reversed(range(3000)):
+            deep = Node("item", (deep,), {"i": index})
+        with SharedConfig() as shared, SharedConfigReader(shared.name) as reader:
+            shared.publish({"root": deep})
+            self.assertEqual(reader.get()["root"]["children"][0]["i"], 1)
+
+    def testWorkers(self):
+        with SharedConfig() as shared:
+            shared.publish(self.config(3))
+            for method in ("fork", "spawn"):
+                context = multiprocessing.get_context(method)
+                queue = context.Queue()
+                process = context.Process(target=read_in_worker, args=(shared.name, queue))
+                process.start()
+                self.assertEqual(queue.get(timeout=30), (1, 15, "root"))
+                process.join()
+            # 工作进程退出不会删除发布者的共享内存
+            with SharedConfigReader(shared.name) as reader:
+                self.assertEqual(reader.get()["version"], 3)
+
+    def testUnsupported(self):
+        with SharedConfig() as shared:
+            with self.assertRaises(TypeError):
+                shared.publish({"value": object()})
+            self.assertEqual(shared.generation, 0)
@@ -0,0 +1,10 @@
+from properpy import component
+
+__all__ = ["html"]
+
+
+@component
+def html(title: str):
+    pass
+
+size = 7
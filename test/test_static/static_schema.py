@@ -0,0 +1,19 @@
+from properpy import component, config_wrapper
+
+
+@component
+def html(title: str, class_: str = ""):
+    """页面"""
+
+@component
+def div(*content, style: dict = None):
+    pass
+
+@component
+def upper(text: str):
+    return {"text": text.upper()}
+
+RESULT = {}
+@config_wrapper(RESULT)
+def define_config(html_component, title: str):
+    pass
@@ -0,0 +1,79 @@
+import sys
+from unittest import TestCase
+
+from properpy import Parser, parse_config
+from properpy.static import scan_module
+from properpy.validation import ComponentValidationError
+
+
+class TestStatic(TestCase):
+
+    def setUp(self):
+        sys.modules.pop("static_schema", None)
+        self.parser = Parser()
+        self.parser.register_module("static_schema")
+
+    def testNoImport(self):
+        code = ("from static_schema import html, div\n"
+                "from properpy import attrs\n"
+                "size = -2 * 3\n"
+                "page = html(div(attrs(style={'color': 'red'}), 'Hello ' + 'world', [-2 * 3]), class_='container')\n"
+                "html(title='t')\n")
+        result, modules = self.parser.parse_with_dependencies(code, static=True)
+        # 静态求值不会导入定义组件的模块，但仍记录为依赖
+        self.assertNotIn("static_schema", sys.modules)
+        self.assertIn("static_schema", modules)
+        self.assertEqual(result, self.parser.parse(code))
+        self.assertEqual(result["page"]["children"][0]["children"], ["Hello world", [-6]])
+
+    def testValidate(self):
+        code = "from static_schema import html\npage = html(title=1)\n"
+        # 扫描得到的组件没有注解：校验时导入模块，按真实的注解检查
+        with self.assertRaises(ComponentValidationError) as context:
+            parse_config(code, ["static_schema"], static=True, validate="deferred")
+        self.assertEqual([str(issue) for issue in context.exception.issues], ["html.title: expected str, got 1"])
+        self.assertIn("static_schema", sys.modules)
+
+    def testFallback(self):
+        code = ("from static_schema import html, div, upper\n"
+                "a = html(div(str(1 + 2), upper('x')))\n"
+                "b = html()\n"
+                "c = div(undefined)\n")
+        result = self.parser.parse(code, static=True)
+        self.assertEqual(result, self._parse(code))
+        self.assertEqual(result["a"]["children"][0]["children"], ["3", {"tag": "upper", "children": ["x"], "text": "X"}])
+        self.assertEqual(result["b"], "<Evaluation Error: html() missing 1 required positional argument: 'title'>")
+        self.assertEqual(result["c"], "<Evaluation Error: name 'undefined' is not defined>")
+
+    def testReceiver(self):
+        result = parse_config("from static_schema import html, define_config\n"
+                              "define_config(html(title='t'), title='app')",
+                              ["static_schema"], static=True)
+        from static_schema import RESULT
+        self.assertEqual(RESULT, result["children"][0])
+
+    def testScanModule(self):
+        bindings = scan_module("static_schema.py")
+        components = {name for name, value in bindings.items() if hasattr(value, "function")}
+        # 函数体不为空的组件与 config_wrapper 组件需要实际执行
+        self.assertEqual(components, {"html", "div"})
+        self.assertEqual(bindings["html"].function(title="t"), {"tag": "html", "children": [], "title": "t"})
+
+    def testStarImport(self):
+        sys.modules.pop("star_schema", None)
+        self.parser.register_module("star_schema")
+        self.parser.register_var("size", 1)
+        code = "from star_schema import *\npage = html(title='t')\nvalue = size\n"
+        # 只导入 __all__ 中列出的名称，size 仍是沙箱中注册的变量
+        self.assertEqual(scan_module("star_schema.py")["__all__"], ["html"])
+        expected = {"children": [], "page": {"tag": "html", "children": [], "title": "t"}, "value": 1}
+        self.assertEqual(self.parser.parse(code, static=True), expected)
+        self.assertNotIn("star_schema", sys.modules)
+        self.assertEqual(self.parser.parse(code), expected)
+        # 模块已导入时读取模块的 __all__
+        self.assertEqual(self.parser.parse(code, static=True), expected)
+
+    def _parse(self, code: str) -> dict:
+        parser = Parser()
+        parser.register_module("static_schema")
+        return parser.parse(code)
@@ -0,0 +1,122 @@
+import importlib.util
+import unittest
+from unittest import TestCase
+from unittest.mock import patch
+
+from properpy import parse_config
+from properpy.node import compact_nodes
+from properpy.validation import ComponentValidationError, ComponentValidator, validate_components, validator_for
+from validation_schema import heading, panel, text
+
+CONFIG = ("from validation_schema import panel, text\n"
+          "ok = panel(text('a', bold=True), title='t', width=10, tags=['x'], ratio=2)\n"
+          "bad = panel(text('b', bold=1), width=0, align='center')\n"
+          "other = panel(tags=['x', 2], style=text('c'))\n")
+
+
+class TestValidation(TestCase):
+
+    def testDisabled(self):
+        self.assertEqual(panel(width="wide")["width"], "wide")
+
+    def testEager(self):
+        with validate_components():
+            self.assertEqual(panel(title=None, width=5, style={"a": 1})["width"], 5)
+            with self.assertRaises(ComponentValidationError) as context:
+                panel(title=1, ratio=True)
+        self.assertEqual([(issue.tag, issue.name) for issue in context.exception.issues],
+                         [("panel", "title"), ("panel", "ratio")])
+
+    def testDeferred(self):
+        with self.assertRaises(ComponentValidationError) as context:
+            with validate_components(deferred=True):
+                node = panel(text("a", bold="yes"), width=-1)
+                # 延迟模式下构建过程不会中断
+                self.assertEqual(node["width"], -1)
+        issues = context.exception.issues
+        self.assertEqual(sorted(str(issue) for issue in issues),
+                         ["panel.width: expected int with gt=0, got -1", "text.bold: expected bool, got 'yes'"])
+        self.assertIs(next(issue.node for issue in issues if issue.tag == "panel"), node)
+
+    def testReport(self):
+        with validate_components(deferred=True, raise_errors=False) as report:
+            panel(align="up")
+            panel(align="right")
+        self.assertEqual([issue.value for issue in report.issues], ["up"])
+
+    def testCompact(self):
+        with compact_nodes(), validate_components():
+            # 注解为 dict 的属性接受紧凑节点
+            self.assertEqual(panel(style=text("a"))["style"]["tag"], "text")
+
+    def testParseConfig(self):
+        result = parse_config(CONFIG, ["validation_schema"], validate="eager")
+        self.assertEqual(result["ok"]["width"], 10)
+        self.assertTrue(result["bad"].startswith("<Evaluation Error: 1 invalid component attribute:"))
+        self.assertTrue(result["other"].startswith("<Evaluation Error:"))
+
+        with self.assertRaises(ComponentValidationError) as context:
+            parse_config(CONFIG, ["validation_schema"], validate="deferred")
+        self.assertEqual(sorted(str(issue) for issue in context.exception.issues), [
+            "panel.align: expected Literal['left', 'right'], got 'center'",
+            "panel.tags: expected list[str] | None, got ['x', 2]",
+            "panel.width: expected int with gt=0, got 0",
+            "text.bold: expected bool, got 1",
+        ])
+        # 静态模式同样按组件的真实注解校验（未导入的模块见 test_static）
+        with self.assertRaises(ComponentValidationError):
+            parse_config(CONFIG, ["validation_schema"], static=True, validate="deferred")
+        with self.assertRaises(ValueError):
+            parse_config(CONFIG, ["validation_schema"], validate="lazy")
+
+    def testPositional(self):
+        # 绑定到带注解参数的位置参数同样被校验
+        with validate_components():
+            self.assertEqual(heading("a", 2)["children"], ["a", 2])
+            with self.assertRaises(ComponentValidationError) as context:
+                heading(123)
+            # 被关键字参数取代的位置参数不传给组件，不校验
+            heading(123, title="a")
+        issue = context.exception.issues[0]
+        self.assertEqual((str(issue), issue.value, issue.node["children"]), ("heading.title: expected str, got 123", 123,
+                                                                            [123]))
+        with validate_components(deferred=True, raise_errors=False) as report:
+            heading("a", "2", level=3)
+            heading("b", "2")
+        self.assertEqual([str(issue) for issue in report.issues], ["heading.level: expected int, got '2'"])
+
+    def testCompiledOnce(self):
+        self.assertIs(validator_for(panel), validator_for(panel))
+        self.assertEqual(set(validator_for(panel).annotations), {"title", "width", "align", "tags", "style", "ratio"})
+
+    @unittest.skipUnless(importlib.util.find_spec("pydantic"), "pydantic is not installed")
+    def testPydantic(self):
+        from pydantic import Field
+        from typing import Annotated
+        from properpy import component
+
+        @component
+        def item(*children, count: Annotated[int, Field(ge=1)] = 1, name: str = None):
+            pass
+
+        with validate_components(deferred=True, raise_errors=False) as report:
+            item(count=0)
+            item(count=2, name=3)
+            item(count=3)
+        self.assertEqual([str(issue) for issue in report.issues],
+                         ["item.count: expected int with ge=1, got 0", "item.name: expected str | None, got 3"])
+
+    @unittest.skipUnless(importlib.util.find_spec("pydantic"), "pydantic is not installed")
+    def testBackendsAgree(self):
+        # pydantic 忽略的约束对象（Positive）同样被检查，两种校验方式报告相同的问题
+        nodes = [panel(width=0, align="up", tags=["x", 2]), text("a", bold=1), panel(width=5, ratio=True)]
+        issues = []
+        for func in (panel, text):
+            validator = ComponentValidator(func.__wrapped__)
+            with patch("properpy.validation._pydantic_adapter", return_value=None):
+                builtin = ComponentValidator(func.__wrapped__)
+            self.assertIsNotNone(validator._adapter)
+            own = [node for node in nodes if node["tag"] == func.__name__]
+            issues.append([str(issue) for issue in validator.validate(own)])
+            self.assertEqual(issues[-1], [str(issue) for issue in builtin.validate(own)])
+        self.assertIn("panel.width: expected int with gt=0, got 0", issues[0])
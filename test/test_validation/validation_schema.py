@@ -0,0 +1,21 @@
+from typing import Annotated, Literal
+
+from properpy import component
+
+
+class Positive:
+    gt = 0
+
+
+@component
+def panel(*children, title: str = None, width: Annotated[int, Positive()] = 100, align: Literal["left", "right"] = "left",
+          tags: list[str] = None, style: dict = None, ratio: float = 1.0):
+    pass
+
+@component
+def text(content, bold: bool = False):
+    pass
+
+@component
+def heading(title: str, level: int = 1):
+    pass
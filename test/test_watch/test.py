@@ -0,0 +1,75 @@
+import os
+import queue
+import sys
+import tempfile
+from unittest import TestCase
+
+from properpy import ConfigWatcher
+
+
+class TestWatch(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.schema_path = os.path.join(self.directory.name, "watch_schema.py")
+        self.file_path = os.path.join(self.directory.name, "config.proper.py")
+        self.write(self.schema_path, "def value():\n    return 1\n")
+        self.write(self.file_path, "from watch_schema import value\nresult = value()\n")
+        self.watcher = ConfigWatcher([self.file_path], ["watch_schema"], module_paths=[self.directory.name],
+                                     interval=0.05, debounce=0.01)
+
+    def tearDown(self):
+        self.watcher.stop()
+        sys.modules.pop("watch_schema", None)
+        self.directory.cleanup()
+
+    @staticmethod
+    def write(path, content):
+        with open(path, "w") as file:
+            file.write(content)
+
+    def result(self):
+        return self.watcher.results[self.file_path].result["result"]
+
+    def testCheck(self):
+        changes = []
+        self.watcher.subscribe(changes.append)
+        self.assertEqual(self.watcher.check(), [self.file_path])
+        self.assertEqual(self.result(), 1)
+        # 未改变的文件不重新解析
+        os.utime(self.schema_path)
+        self.assertEqual(self.watcher.check(), [])
+        # 依赖模块改变：重新加载模块并重新解析
+        self.write(self.schema_path, "def value():\n    return 22\n")
+        self.assertEqual(self.watcher.check(), [self.file_path])
+        self.assertEqual(self.result(), 22)
+        # 解析错误被发布，修复后恢复
+        self.write(self.file_path, "from watch_schema import missing\n")
+        self.watcher.check()
+        self.assertIsInstance(changes[-1].error, ImportError)
+        self.write(self.file_path, "from watch_schema import value\nresult = value() + 1\n")
+        self.watcher.check()
+        self.assertEqual(changes[-1].result["result"], 23)
+        self.assertEqual(len(changes), 4)
+
+    def testBackground(self):
+        changes = queue.Queue()
+        self.watcher.subscribe(changes.put)
+        with self.watcher:
+            self.assertEqual(self.result(), 1)
+            self.write(self.file_path, "from watch_schema import value\nresult = value() * 10\n")
+            self.assertEqual(changes.get(timeout=5).result["result"], 10)
+
+    def testFailingCallback(self):
+        def failing(change):
+            raise ValueError("subscriber bug")
+        changes = queue.Queue()
+        self.watcher.subscribe(failing)
+        self.watcher.subscribe(changes.put)
+        with self.watcher, self.assertLogs("properpy.watch") as logs:
+            # 出错的订阅者不影响之后的订阅者，监视线程继续运行
+            for factor in (10, 20):
+                self.write(self.file_path, f"from watch_schema import value\nresult = value() * {factor}\n")
+                self.assertEqual(changes.get(timeout=5).result["result"], factor)
+            self.assertTrue(self.watcher._thread.is_alive())
+        self.assertIn("subscriber bug", "\n".join(logs.output))